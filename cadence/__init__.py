@@ -1,7 +1,10 @@
-from .api.functions import (
-    play as play,
-    save_project as save_project,
-    load_project as load_project,
-)
 from .api.config import Config as Config
+from .api.events import EventTable as EventTable
+from .api.functions import load_project as load_project
+from .api.functions import play as play
+from .api.functions import render_song as render_song
+from .api.functions import save_project as save_project
+from .api.functions import save_song as save_song
+from .api.song import Arrangement as Arrangement
+from .api.song import Pattern as Pattern
 from .api.track import Track as Track
@@ -0,0 +1,165 @@
+import collections
+from pathlib import Path
+
+import numpy as np
+
+from cadence.api.cache import SampleCache, file_key
+from cadence.api.constants import (
+    AUDITION_BLOCK_SIZE,
+    AUDITION_CACHE_MAX_BYTES,
+    AUDITION_MAX_VOICES,
+    AUDITION_SAMPLE_RATE,
+    MASTER_VOLUME,
+)
+from cadence.api.output import OutputBackend, get_output_backend
+from cadence.api.samples import read_conformed
+
+
+class AuditionMixer:
+    """
+    Plays previews of sounds, several at once, on a single long-lived stream.
+
+    Sounds are decoded, converted to the mixer's format and normalized by
+    load(), ahead of time. trigger() only queues the preloaded sound; the
+    audio callback starts it at the next block and mixes all ringing voices
+    in place into the output buffer, so a preview starts within a block and
+    needs no thread, decoding or array allocation. When all voices are busy,
+    a new preview replaces the one that has played longest. Preloaded sounds
+    are kept in an LRU cache of AUDITION_CACHE_MAX_BYTES, keyed by file_key(),
+    so a sound is loaded again if its file changes.
+
+    The output stream is opened by the first trigger() and kept open (playing
+    silence between previews) until close().
+
+    Args:
+        sample_rate (int): Sample rate of the previews.
+            Defaults to AUDITION_SAMPLE_RATE.
+        n_channels (int): Number of channels of the previews. Defaults to 2.
+        max_voices (int): Number of previews that can play at once.
+            Defaults to AUDITION_MAX_VOICES.
+        blocksize (int): Frames per audio block. Defaults to AUDITION_BLOCK_SIZE.
+        backend (OutputBackend): Where the audio is played. Defaults to None
+            (the default backend, see get_output_backend()).
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = AUDITION_SAMPLE_RATE,
+        n_channels: int = 2,
+        max_voices: int = AUDITION_MAX_VOICES,
+        blocksize: int = AUDITION_BLOCK_SIZE,
+        backend: OutputBackend = None,
+    ):
+        self.sample_rate = sample_rate
+        self.n_channels = n_channels
+        self.max_voices = max_voices
+        self.blocksize = blocksize
+        self.backend = backend
+
+        # Preloaded sounds, normalized, in the mixer's format
+        self._sounds = SampleCache(AUDITION_CACHE_MAX_BYTES)
+        self._stream = None
+
+        # Sounds triggered but not started yet; deque appends and pops are
+        # thread-safe, so trigger() never waits for the audio thread
+        self._triggers: collections.deque[np.ndarray] = collections.deque()
+        self._silence = False
+
+        # Voice slots, only touched by the audio callback
+        self._voices: list[np.ndarray] = [None] * max_voices
+        self._positions: list[int] = [0] * max_voices
+
+    def load(self, file_path: str | Path) -> np.ndarray:
+        """
+        Preload a sound, so that triggering it does not read the file.
+
+        Args:
+            file_path (str or Path): The path to the WAV file.
+
+        Returns:
+            np.ndarray: The read-only, normalized sound in the mixer's format.
+        """
+
+        def _load():
+            data = read_conformed(file_path, self.sample_rate, self.n_channels)
+            # Normalize to a max of 1.0, like play_sound_file()
+            max_amplitude = np.max(np.abs(data), initial=0)
+            gain = MASTER_VOLUME / max_amplitude if max_amplitude != 0 else 1.0
+            return data * np.float32(gain)
+
+        return self._sounds.get(file_key(file_path), _load)
+
+    def trigger(self, file_path: str | Path):
+        """
+        Start playing a sound, over any previews still playing.
+
+        Sounds that were not preloaded (or were evicted) are loaded first.
+
+        Args:
+            file_path (str or Path): The path to the WAV file.
+
+        Returns: None
+        """
+        self._triggers.append(self.load(file_path))
+        if self._stream is None:
+            backend = self.backend or get_output_backend()
+            self._stream = backend.open_stream(
+                self.sample_rate,
+                self.n_channels,
+                blocksize=self.blocksize,
+                callback=self._callback,
+            )
+            self._stream.start()
+
+    def stop(self):
+        """
+        Silence all previews, keeping the stream open.
+
+        Returns: None
+        """
+        self._triggers.clear()
+        self._silence = True
+
+    def close(self):
+        """
+        Stop the previews and close the output stream.
+
+        Returns: None
+        """
+        self.stop()
+        if self._stream is not None:
+            self._stream.abort()
+            self._stream.close()
+            self._stream = None
+
+    def _callback(self, outdata, frames, time_info, status):
+        # Runs on the audio thread: mix in place, never allocate arrays
+        voices, positions = self._voices, self._positions
+        if self._silence:
+            self._silence = False
+            for i in range(self.max_voices):
+                voices[i] = None
+        while self._triggers:
+            sound = self._triggers.popleft()
+            free = [i for i in range(self.max_voices) if voices[i] is None]
+            slot = (
+                free[0]
+                if free
+                else max(range(self.max_voices), key=positions.__getitem__)
+            )
+            voices[slot] = sound
+            positions[slot] = 0
+
+        outdata.fill(0)
+        for i in range(self.max_voices):
+            sound = voices[i]
+            if sound is None:
+                continue
+            position = positions[i]
+            n_frames = min(frames, len(sound) - position)
+            out = outdata[:n_frames]
+            np.add(out, sound[position : position + n_frames], out=out)
+            positions[i] = position + n_frames
+            if positions[i] >= len(sound):
+                voices[i] = None
+        np.clip(outdata, -1.0, 1.0, out=outdata)
@@ -0,0 +1,210 @@
+import glob
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import ceil
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from cadence.api.functions import load_arrangement, load_project, save_song, save_sound
+from cadence.api.wavfile import ExportStats
+
+
+class RenderResult(NamedTuple):
+    """
+    Outcome of rendering one project to a WAV file.
+
+    Attributes:
+        project_path (str): Path to the .cadence project.
+        output_path (str): Path to the rendered WAV file.
+        stats (ExportStats): Export statistics, or None if rendering failed.
+        error (str): Error message, or None if rendering succeeded.
+    """
+
+    project_path: str
+    output_path: str
+    stats: ExportStats | None = None
+    error: str | None = None
+
+
+def expand_project_paths(patterns: list[str]) -> list[Path]:
+    """
+    Expand a list of project paths and glob patterns into project paths.
+
+    Args:
+        patterns (list[str]): Paths to .cadence projects, or glob patterns matching them.
+
+    Returns:
+        list[Path]: The matching project paths, without duplicates, in order.
+    """
+    paths = {}
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for match in matches:
+            paths.setdefault(Path(match), None)
+    return list(paths)
+
+
+def _sample_paths(project_path: Path) -> tuple[str, ...]:
+    """Return the sample files a project uses, for grouping related projects."""
+    try:
+        with open(project_path / "project.json", "r") as f:
+            project_data = json.load(f)
+        track_dicts = list(project_data["tracks"])
+        arrangement_data = project_data.get("arrangement") or {}
+        for pattern_data in arrangement_data.get("patterns", {}).values():
+            track_dicts.extend(pattern_data.get("tracks", []))
+        return tuple(
+            sorted(Path(track["path"]).name for track in track_dicts if track["path"])
+        )
+    except (OSError, ValueError, KeyError):
+        return ()
+
+
+def _render_batch(
+    jobs: list[tuple[str, str]], sample_format: str, dither: bool
+) -> list[RenderResult]:
+    """
+    Render a batch of projects in the current process.
+
+    Projects in a batch share the process-wide sample cache, which is keyed by
+    file contents, so samples used by several of them are decoded once even
+    though each project keeps its own copy of the file.
+    """
+    results = []
+    for project_path, output_path in jobs:
+        try:
+            tracks, config = load_project(project_path)
+            arrangement = load_arrangement(project_path)
+            if arrangement is not None:
+                # Projects with a song arrangement are rendered as the song
+                stats = save_song(
+                    output_path,
+                    arrangement,
+                    config,
+                    sample_format=sample_format,
+                    dither=dither,
+                )
+            else:
+                stats = save_sound(
+                    output_path,
+                    tracks,
+                    config,
+                    sample_format=sample_format,
+                    dither=dither,
+                )
+            results.append(RenderResult(project_path, output_path, stats))
+        except Exception as e:
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            results.append(RenderResult(project_path, output_path, error=error))
+    return results
+
+
+def render_projects(
+    project_paths: list[str | Path],
+    output_dir: str | Path,
+    jobs: int = None,
+    sample_format: str = "float32",
+    dither: bool = False,
+) -> Iterator[RenderResult]:
+    """
+    Render many .cadence projects to WAV files in parallel.
+
+    Each project is written to output_dir/<project name>.wav. Projects are
+    sorted by the names of the samples they use and split into batches, so
+    projects sharing samples tend to be rendered by the same worker process
+    and reuse its decoded samples.
+
+    Args:
+        project_paths (list[str or Path]): Paths to the .cadence projects.
+        output_dir (str or Path): Directory for the rendered WAV files (created if needed).
+        jobs (int): Number of worker processes. Defaults to the number of CPUs.
+            With 1, projects are rendered in the current process.
+        sample_format (str): "float32", "int16" or "int24". Defaults to "float32".
+        dither (bool): If True, dither when quantizing to an integer format.
+            Defaults to False.
+
+    Yields:
+        RenderResult: One result per project, in order of completion.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+
+    project_paths = [Path(project_path) for project_path in project_paths]
+    output_names = [project_path.stem + ".wav" for project_path in project_paths]
+    duplicates = {name for name in output_names if output_names.count(name) > 1}
+    assert not duplicates, f"Several projects would be rendered to {sorted(duplicates)}"
+
+    # Keep projects that use the same samples next to each other
+    render_jobs = sorted(
+        (
+            (str(project_path), str(output_dir / name))
+            for project_path, name in zip(project_paths, output_names)
+        ),
+        key=lambda job: (_sample_paths(Path(job[0])), job[0]),
+    )
+
+    if jobs == 1:
+        for job in render_jobs:
+            yield from _render_batch([job], sample_format, dither)
+        return
+
+    # A few batches per worker keeps the pool balanced while still grouping
+    batch_size = max(1, ceil(len(render_jobs) / (jobs * 4)))
+    batches = [
+        render_jobs[i : i + batch_size] for i in range(0, len(render_jobs), batch_size)
+    ]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(_render_batch, batch, sample_format, dither)
+            for batch in batches
+        ]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+class BatchSummary(NamedTuple):
+    """
+    Totals for a batch render.
+
+    Attributes:
+        n_projects (int): Number of projects rendered successfully.
+        n_failed (int): Number of projects that failed to render.
+        audio_seconds (float): Total duration of the rendered audio.
+        elapsed_seconds (float): Wall-clock time for the whole batch.
+    """
+
+    n_projects: int
+    n_failed: int
+    audio_seconds: float
+    elapsed_seconds: float
+
+    @property
+    def realtime_factor(self) -> float:
+        """Seconds of audio rendered per second of wall-clock time."""
+        return (
+            self.audio_seconds / self.elapsed_seconds if self.elapsed_seconds else 0.0
+        )
+
+
+def summarize(results: list[RenderResult], start_time: float) -> BatchSummary:
+    """
+    Summarize the results of a batch render.
+
+    Args:
+        results (list[RenderResult]): Results returned by render_projects().
+        start_time (float): time.perf_counter() value when the batch started.
+
+    Returns:
+        BatchSummary: Totals for the batch.
+    """
+    succeeded = [result for result in results if result.error is None]
+    return BatchSummary(
+        n_projects=len(succeeded),
+        n_failed=len(results) - len(succeeded),
+        audio_seconds=sum(result.stats.audio_seconds for result in succeeded),
+        elapsed_seconds=time.perf_counter() - start_time,
+    )
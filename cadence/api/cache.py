@@ -0,0 +1,283 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Hashable, NamedTuple
+
+import numpy as np
+
+from cadence.api.constants import SAMPLE_CACHE_MAX_BYTES
+
+DIGEST_SIZE = 16  # Size in bytes of the content digests from file_digest()
+
+
+class CacheStats(NamedTuple):
+    """
+    Snapshot of a SampleCache's counters.
+
+    Attributes:
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to call the loader.
+        evictions (int): Number of entries evicted to stay within budget.
+        entries (int): Number of entries currently cached.
+        size_bytes (int): Total size of the cached arrays in bytes.
+        max_bytes (int): Memory budget of the cache in bytes.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+
+def file_key(file_path: str | Path) -> tuple[str, int, int, int]:
+    """
+    Build a cache key identifying the current contents of a file.
+
+    The key changes whenever the file is modified or replaced, so stale
+    entries are never returned; checking it costs a single stat() call and
+    no reads.
+
+    Args:
+        file_path (str or Path): The path to the file.
+
+    Returns:
+        tuple[str, int, int, int]: (resolved path, mtime in nanoseconds,
+        size in bytes, inode number)
+    """
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    return (str(path), stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def content_key(digest: str, *parts: Hashable) -> tuple:
+    """
+    Build a cache key for data derived from file contents with the given digest.
+
+    Files with identical contents share these entries, whatever their path.
+
+    Args:
+        digest (str): Content digest, from file_digest().
+        *parts (Hashable): Further key parts, e.g. the kind of derived data.
+
+    Returns:
+        tuple: The cache key.
+    """
+    return ("content", digest, *parts)
+
+
+def _nbytes(value) -> int:
+    """Return the number of bytes held by a cached value."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, tuple):
+        return sum(_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _freeze(value):
+    """Mark the arrays in a cached value read-only, since they are shared."""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, tuple):
+        for item in value:
+            _freeze(item)
+    return value
+
+
+class SampleCache:
+    """
+    Thread-safe LRU cache of decoded sample data with a memory budget.
+
+    Keys are tuples. Entries tied to a file path start with the resolved path
+    (see file_key()), so that they can be invalidated together; entries tied
+    to file contents use content_key(), so that identical files in different
+    places (e.g. the same sample copied into several projects) share them.
+    The digests of each path are recorded (see add_digest()), so that
+    invalidating a path also removes the entries derived from its contents.
+    Cached arrays are shared between callers and are therefore read-only.
+
+    Attributes:
+        max_bytes (int): Memory budget in bytes. Least recently used entries
+            are evicted when the budget is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = SAMPLE_CACHE_MAX_BYTES):
+        self._entries: OrderedDict[Hashable, tuple[object, int]] = OrderedDict()
+        self._loading: dict[Hashable, threading.Event] = {}
+        # Resolved path -> digests of its contents, for invalidate()
+        self._digests: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    def get(self, key: Hashable, load: Callable[[], object]):
+        """
+        Return the cached value for key, calling load() to create it on a miss.
+
+        Concurrent lookups of the same key wait for a single call to load().
+
+        Args:
+            key (Hashable): Cache key, e.g. from file_key().
+            load (Callable): Function returning the value to cache.
+
+        Returns:
+            The cached value.
+        """
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return self._entries[key][0]
+                loading = self._loading.get(key)
+                if loading is None:
+                    self._misses += 1
+                    loading = self._loading[key] = threading.Event()
+                    break
+            # Another thread is loading this key; wait for it and look again
+            loading.wait()
+
+        try:
+            value = _freeze(load())
+            size = _nbytes(value)
+            with self._lock:
+                if size <= self._max_bytes:
+                    self._entries[key] = (value, size)
+                    self._size_bytes += size
+                    self._evict()
+            return value
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+    def peek(self, key: Hashable):
+        """
+        Return the cached value for key, or None if it is not cached.
+
+        Unlike get(), this does not count as a use of the entry.
+
+        Args:
+            key (Hashable): Cache key.
+
+        Returns:
+            The cached value, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def add_digest(self, file_path: str | Path, digest: str):
+        """
+        Record that a file has contents with the given digest.
+
+        Args:
+            file_path (str or Path): The path to the file.
+            digest (str): Content digest of the file, from file_digest().
+
+        Returns: None
+        """
+        resolved = str(Path(file_path).resolve())
+        with self._lock:
+            self._digests.setdefault(resolved, set()).add(digest)
+
+    def invalidate(self, file_path: str | Path = None):
+        """
+        Remove entries from the cache.
+
+        Removing the entries of a file also removes the content_key() entries
+        of every digest recorded for it, which other files with the same
+        contents were sharing.
+
+        Args:
+            file_path (str or Path): Only remove entries derived from this file.
+                If None, remove all entries. Defaults to None.
+
+        Returns: None
+        """
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                self._digests.clear()
+                self._size_bytes = 0
+                return
+            resolved = str(Path(file_path).resolve())
+            digests = self._digests.pop(resolved, set())
+            stale = [
+                k
+                for k in self._entries
+                if k[0] == resolved or (k[0] == "content" and k[1] in digests)
+            ]
+            for key in stale:
+                self._size_bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> CacheStats:
+        """
+        Return a snapshot of the cache counters.
+
+        Returns:
+            CacheStats: Hit/miss/eviction counters and current memory usage.
+        """
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                size_bytes=self._size_bytes,
+                max_bytes=self._max_bytes,
+            )
+
+    def _evict(self):
+        # Caller must hold self._lock
+        while self._size_bytes > self._max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._size_bytes -= size
+            self._evictions += 1
+
+
+# Process-wide cache shared by read_wav() and the rest of the engine
+sample_cache = SampleCache()
+
+
+def file_digest(file_path: str | Path) -> str:
+    """
+    Return a hash of a file's contents.
+
+    The digest is cached per file_key(), so a file is only hashed again
+    after it changes on disk.
+
+    Args:
+        file_path (str or Path): The path to the file.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+
+    def _hash():
+        digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        with open(file_path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    digest = sample_cache.get(file_key(file_path) + ("digest",), _hash)
+    sample_cache.add_digest(file_path, digest)
+    return digest
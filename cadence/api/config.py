@@ -8,7 +8,8 @@ class Config(NamedTuple):
     Attributes:
         bpm (int): Tempo in beats per minute. Defaults to 120.
         beats_per_measure (int): Number of beats per measure. Defaults to 4.
-        measures (int): Total number of measures. Defaults to None.
+        measures (int): Length of the pattern in measures; hits after it are
+            ignored. Defaults to None (long enough for the last hit).
         repeat (int): Number of times to repeat the sequence. Defaults to 1.
     """
 
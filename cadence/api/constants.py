@@ -3,3 +3,14 @@
 
 TIMING_UNITS_PER_BEAT = 12  # Number of timing units per beat
 MASTER_VOLUME = 1.0  # Master volume of the full mix
+SAMPLE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Memory budget for decoded samples
+STEM_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Memory budget for rendered track stems
+STEM_LINEAGES_MAX = 1024  # Number of tracks whose latest stem is kept for patching
+BLOCK_SIZE = 4096  # Number of frames per block when streaming audio
+PLAYER_BLOCK_SIZE = 512  # Number of frames per audio callback in the looping player
+PLAYER_LOOKAHEAD_BLOCKS = 8  # Number of blocks the looping player mixes ahead
+PRERENDER_DELAY = 0.15  # Seconds without edits before the UI pre-renders the pattern
+AUDITION_SAMPLE_RATE = 44100  # Sample rate of the sound previews
+AUDITION_BLOCK_SIZE = 256  # Number of frames per audio callback of the sound previews
+AUDITION_MAX_VOICES = 16  # Number of sound previews that can play at once
+AUDITION_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Memory budget for preloaded previews
@@ -0,0 +1,313 @@
+import base64
+import hashlib
+from typing import Iterable, Iterator
+
+import numpy as np
+
+# Tables with more events than this are saved in the compact JSON encoding
+COMPACT_JSON_MIN_EVENTS = 256
+COMPACT_JSON_ENCODING = "base64-delta"
+
+
+def _frozen(values: np.ndarray) -> np.ndarray:
+    values.flags.writeable = False
+    return values
+
+
+def _encode(values: np.ndarray) -> str:
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def _decode(text: str, dtype: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(text), dtype=dtype)
+
+
+class EventTable:
+    """
+    The hits of a track, stored as NumPy arrays.
+
+    Hits are kept sorted by tick (in timing units, 1/12ths of a beat), with an
+    optional per-hit velocity that scales the track volume. Tables are
+    immutable and hashable by content, so they can be used as cache keys, and
+    compare equal to lists of ticks for backward compatibility.
+
+    Args:
+        ticks (Iterable[int]): The tick of each hit, in any order.
+        velocity (Iterable[float]): The velocity of each hit (0.0 to 1.0), in the
+            same order as ticks. Defaults to None (all hits at full velocity).
+
+    Attributes:
+        ticks (np.ndarray): Read-only sorted int64 ticks.
+        velocity (np.ndarray): Read-only float32 velocities matching ticks,
+            or None if all hits are at full velocity.
+    """
+
+    __slots__ = ("_digest", "ticks", "velocity")
+
+    def __init__(
+        self, ticks: Iterable[int] = (), velocity: Iterable[float] | None = None
+    ):
+        ticks = np.array(ticks, dtype=np.int64).reshape(-1)
+        order = np.argsort(ticks, kind="stable")
+        self.ticks: np.ndarray = _frozen(ticks[order])
+
+        if velocity is not None:
+            velocity = np.array(velocity, dtype=np.float32).reshape(-1)
+            if len(velocity) != len(ticks):
+                raise ValueError(
+                    f"Got {len(velocity)} velocities for {len(ticks)} ticks"
+                )
+            velocity = None if np.all(velocity == 1) else _frozen(velocity[order])
+        self.velocity: np.ndarray | None = velocity
+        self._digest: str = None
+
+    @classmethod
+    def coerce(cls, value) -> "EventTable":
+        """
+        Convert a list of ticks or a JSON value to an EventTable.
+
+        Args:
+            value: An EventTable (returned as is), an iterable of ticks, or a
+                value returned by to_json().
+
+        Returns:
+            EventTable: The table.
+        """
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            return cls.from_json(value)
+        return cls(value if value is not None else ())
+
+    @classmethod
+    def _from_sorted(
+        cls, ticks: np.ndarray, velocity: np.ndarray | None
+    ) -> "EventTable":
+        """Create a table from arrays that are already sorted and converted."""
+        table = object.__new__(cls)
+        table.ticks = _frozen(ticks)
+        table.velocity = _frozen(velocity) if velocity is not None else None
+        table._digest = None
+        return table
+
+    def insert(self, tick: int, velocity: float = 1.0) -> "EventTable":
+        """
+        Return a copy of the table with one more hit.
+
+        The hit is inserted at its sorted position with a binary search, so
+        adding a hit to a track costs O(n) copying and no sorting.
+
+        Args:
+            tick (int): The tick of the new hit.
+            velocity (float): The velocity of the new hit. Defaults to 1.0.
+
+        Returns:
+            EventTable: The new table.
+        """
+        position = np.searchsorted(self.ticks, tick, side="right")
+        ticks = np.insert(self.ticks, position, tick)
+        if self.velocity is None and velocity == 1:
+            return self._from_sorted(ticks, None)
+        old_velocity = self.velocity
+        if old_velocity is None:
+            old_velocity = np.ones(len(self), dtype=np.float32)
+        return self._from_sorted(
+            ticks, np.insert(old_velocity, position, np.float32(velocity))
+        )
+
+    def remove(self, tick: int) -> "EventTable":
+        """
+        Return a copy of the table without one hit at tick.
+
+        Args:
+            tick (int): The tick of the hit to remove. If several hits share
+                it, only one is removed.
+
+        Returns:
+            EventTable: The new table, or this table if it has no hit at tick.
+        """
+        position = np.searchsorted(self.ticks, tick, side="left")
+        if position == len(self) or self.ticks[position] != tick:
+            return self
+        ticks = np.delete(self.ticks, position)
+        if self.velocity is None:
+            return self._from_sorted(ticks, None)
+        velocity = np.delete(self.velocity, position)
+        return self._from_sorted(ticks, None if np.all(velocity == 1) else velocity)
+
+    @property
+    def digest(self) -> str:
+        """Hex digest of the table contents, stable across runs."""
+        if self._digest is None:
+            digest = hashlib.blake2b(self.ticks.astype("<i8").tobytes(), digest_size=16)
+            if self.velocity is not None:
+                digest.update(self.velocity.astype("<f4").tobytes())
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    def __len__(self) -> int:
+        return len(self.ticks)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ticks.tolist())
+
+    def __getitem__(self, index):
+        return self.ticks[index].tolist()
+
+    def __array__(self, dtype=None, copy=None):
+        return self.ticks if dtype is None else self.ticks.astype(dtype)
+
+    def __hash__(self) -> int:
+        return int(self.digest[:16], 16)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, EventTable):
+            if not isinstance(other, (list, tuple, range, np.ndarray)):
+                return NotImplemented
+            other = EventTable(other)
+        if not np.array_equal(self.ticks, other.ticks):
+            return False
+        if self.velocity is None or other.velocity is None:
+            return self.velocity is None and other.velocity is None
+        return np.array_equal(self.velocity, other.velocity)
+
+    def __repr__(self) -> str:
+        if len(self) > 8:
+            ticks = ", ".join(map(str, self.ticks[:8].tolist())) + ", ..."
+        else:
+            ticks = ", ".join(map(str, self.ticks.tolist()))
+        velocity = ", velocity=..." if self.velocity is not None else ""
+        return f"EventTable([{ticks}]{velocity})"
+
+    def to_json(self) -> list[int] | dict:
+        """
+        Return a JSON-serializable representation of the table.
+
+        Small tables without velocities are a plain list of ticks, as in older
+        projects. Tables with velocities are a dict of lists, and large tables
+        store the first tick, then the deltas between ticks and the velocities
+        as base64-encoded binary.
+
+        Returns:
+            list[int] or dict: The encoded table, readable by from_json().
+        """
+        if len(self) >= COMPACT_JSON_MIN_EVENTS:
+            # Sorted ticks have small non-negative deltas; store them in the
+            # narrowest unsigned type that fits
+            deltas = np.diff(self.ticks)
+            dtype = np.dtype(np.min_scalar_type(int(deltas.max(initial=0))))
+            dtype = dtype.newbyteorder("<")
+            data = {
+                "encoding": COMPACT_JSON_ENCODING,
+                "start": int(self.ticks[0]),
+                "dtype": dtype.str,
+                "ticks": _encode(deltas.astype(dtype)),
+            }
+            if self.velocity is not None:
+                data["velocity"] = _encode(self.velocity.astype("<f4"))
+            return data
+        if self.velocity is None:
+            return self.ticks.tolist()
+        return {"ticks": self.ticks.tolist(), "velocity": self.velocity.tolist()}
+
+    @classmethod
+    def from_json(cls, data: list[int] | dict) -> "EventTable":
+        """
+        Create a table from the output of to_json().
+
+        Args:
+            data (list[int] or dict): The encoded table.
+
+        Returns:
+            EventTable: The decoded table.
+        """
+        if not isinstance(data, dict):
+            return cls(data)
+        if data.get("encoding") == COMPACT_JSON_ENCODING:
+            deltas = _decode(data["ticks"], data["dtype"])
+            ticks = np.concatenate(([0], np.cumsum(deltas, dtype=np.int64)))
+            ticks += data["start"]
+            velocity = data.get("velocity")
+            return cls(ticks, _decode(velocity, "<f4") if velocity else None)
+        if "encoding" in data:
+            raise ValueError(f"Unknown event encoding {data['encoding']!r}")
+        return cls(data.get("ticks", ()), data.get("velocity"))
+
+
+class HitIndex:
+    """
+    The hits of several tracks as sample positions, indexed for window queries.
+
+    Each track's hit starts are kept sorted, so finding the hits audible in a
+    range of samples takes two binary searches per track: O(log n + k) for k
+    hits, however long the timeline is.
+
+    Args:
+        starts (list[np.ndarray]): Start frame of each hit, per track.
+        lengths (list[int]): Length in frames of each track's sound.
+        velocities (list[np.ndarray]): Velocity of each hit, per track, or None
+            for tracks at full velocity. Defaults to None (all at full velocity).
+
+    Attributes:
+        starts (list[np.ndarray]): Sorted int64 hit starts, per track.
+        lengths (list[int]): Length in frames of each track's sound.
+        velocities (list[np.ndarray]): Velocities matching starts, or None, per track.
+    """
+
+    def __init__(
+        self,
+        starts: list[np.ndarray],
+        lengths: list[int],
+        velocities: list[np.ndarray | None] | None = None,
+    ):
+        velocities = velocities or [None] * len(starts)
+        self.starts: list[np.ndarray] = []
+        self.lengths: list[int] = list(lengths)
+        self.velocities: list[np.ndarray | None] = []
+        for track_starts, velocity in zip(starts, velocities):
+            track_starts = np.asarray(track_starts, dtype=np.int64)
+            if np.any(track_starts[1:] < track_starts[:-1]):
+                order = np.argsort(track_starts, kind="stable")
+                track_starts = track_starts[order]
+                velocity = velocity[order] if velocity is not None else None
+            self.starts.append(track_starts)
+            self.velocities.append(velocity)
+
+    @property
+    def first_frame(self) -> int:
+        """First frame reached by any hit (0 if there are no hits)."""
+        return min([int(s[0]) for s in self.starts if len(s)], default=0)
+
+    @property
+    def end_frame(self) -> int:
+        """Frame after the last frame reached by any hit (0 if there are no hits)."""
+        return max(
+            [int(s[-1]) + n for s, n in zip(self.starts, self.lengths) if len(s)],
+            default=0,
+        )
+
+    def query(
+        self, start: int, stop: int
+    ) -> tuple[list[np.ndarray], list[np.ndarray | None]]:
+        """
+        Return the hits audible in frames [start, stop), per track.
+
+        Args:
+            start (int): First frame of the range.
+            stop (int): Frame after the last frame of the range.
+
+        Returns:
+            list[np.ndarray]: Start frames of the audible hits, per track.
+            list[np.ndarray]: Their velocities (or None), per track.
+        """
+        all_starts = []
+        all_velocities = []
+        for starts, length, velocity in zip(self.starts, self.lengths, self.velocities):
+            # A hit is audible if it starts before stop and ends after start
+            first = np.searchsorted(starts, start - length, side="right")
+            last = np.searchsorted(starts, stop, side="left")
+            all_starts.append(starts[first:last])
+            all_velocities.append(
+                velocity[first:last] if velocity is not None else None
+            )
+        return all_starts, all_velocities
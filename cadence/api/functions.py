@@ -1,143 +1,716 @@
+import contextlib
+import itertools
 import json
+import os
+import threading
+import time
 from math import ceil
 from pathlib import Path
+from typing import Iterator
 
-import sounddevice as sd
-import scipy.io.wavfile as wav
 import numpy as np
 
 from cadence.api.constants import (
+    BLOCK_SIZE,
     TIMING_UNITS_PER_BEAT,
     MASTER_VOLUME,
 )
 from cadence.api.config import Config
+from cadence.api.events import HitIndex
+from cadence.api.loop import LoopedBuffer
+from cadence.api.mixing import resolve_mix_backend
+from cadence.api.output import OutputBackend, get_output_backend
+from cadence.api.parallel import (
+    make_executor,
+    mix_tracks,
+    read_loop,
+    resolve_workers,
+)
+from cadence.api.samples import SampleBank, read_format
+from cadence.api.song import Arrangement, Pattern, SongBuffer
+from cadence.api.stems import render_stem
+from cadence.api.store import (
+    PROJECT_CACHE_DIR,
+    remove_orphan_cache_files,
+    remove_orphan_samples,
+    sample_digest,
+    store_sample,
+)
 from cadence.api.track import Track
 from cadence.api.utils import is_valid_track, read_wav
+from cadence.api.wavfile import ExportStats, write_wav_blocks
 
 
-def sequence(
-    tracks: list[Track], config: Config | dict = Config()
-) -> tuple[np.ndarray, int]:
+def render_loop(
+    tracks: list[Track],
+    config: Config | dict = Config(),
+    mix_mode: str = "auto",
+    sample_rate: int = None,
+    n_channels: int = None,
+    workers: int = 1,
+    backend: str = "thread",
+    mix_backend: str = "auto",
+    normalize: bool = True,
+    stems: bool = True,
+) -> tuple[LoopedBuffer | None, int]:
     """
-    Create a full audio sequence from a list of Tracks.
+    Render a list of Tracks once, as a normalized LoopedBuffer.
+
+    The buffer holds a single repeat of the pattern (plus the pre-roll and tail
+    that hits push outside of it) and produces all config.repeat repeats on
+    demand, so its memory use does not depend on the number of repeats.
 
     Args:
         tracks (list[Track]): List of Track objects defining the sounds and their timings
         config (Config or dict): Configuration options for the sequence
+        mix_mode (str): Mixing strategy, see sequence(). Defaults to "auto".
+        sample_rate (int): Sample rate to render at. Defaults to None (the
+            highest sample rate of the sounds).
+        n_channels (int): Number of channels to render. Defaults to None
+            (stereo if any sound is stereo, else mono).
+        workers (int): Number of workers mixing time slices of the pattern in
+            parallel; 0 or None means one per CPU. Defaults to 1.
+        backend (str): "thread" or "process", see mix_tracks(). Defaults to "thread".
+        mix_backend (str): "numpy", "numba", or "auto" to use the compiled numba
+            kernel when numba is installed. Defaults to "auto".
+        normalize (bool): If True, normalize the loop to MASTER_VOLUME.
+            Defaults to True.
+        stems (bool): If True, render each track to a stem kept in the stem
+            cache and sum the stems, so that after an edit only the changed
+            tracks (and only around the changed hits) are mixed again, see
+            render_stem(). Defaults to True.
 
     Returns:
-        np.ndarray: The full audio sequence as a NumPy array
+        LoopedBuffer or None: The rendered loop, or None if no track has a sound
         int: The sample rate of the audio
     """
     # Filter out tracks with no path
     filtered_tracks = [track for track in tracks if track.path is not None]
 
     if not filtered_tracks:
-        return np.array([]), 44100  # Default sample rate
+        return None, 44100  # Default sample rate
 
     if isinstance(config, dict):
         config = Config(**config)
 
-    # Load sound data for each track
-    sample_rates, sounds = zip(*[read_wav(track.path) for track in filtered_tracks])
-
-    # Validate sample rates and number of channels
-    assert len(set(sample_rates)) == 1, f"Sample rate mismatch: {set(sample_rates)}"
-    sample_rate = sample_rates[0]
-    assert sample_rate is not None, "Sample rate could not be determined"
-    n_channels = 0
-
-    # TODO: below logic is busted; it throws an error at the elif
-    # if some sounds are mono and some are stereo
-    if set([sound.ndim for sound in sounds]) == {1}:
-        n_channels = 1
-    elif len(set([sound.shape[1] for sound in sounds])) == 1:
-        n_channels = sounds[0].shape[1]
+    bank, index, pattern_length = _index_hits(
+        filtered_tracks, config, sample_rate, n_channels
+    )
+
+    # Find how far hits reach before the start and past the end of the pattern
+    pre_roll = max(0, -index.first_frame)
+    tail = max(0, index.end_frame - pattern_length)
+
+    # Create the blank render of a single repeat, including pre-roll and tail
+    dry = np.zeros(
+        (pre_roll + pattern_length + tail, bank.n_channels), dtype=np.float32
+    )
+
+    # Add each track to the render
+    if stems:
+        mix_backend = resolve_mix_backend(mix_backend)
+        workers = resolve_workers(workers)
+        # One pool for all the stems of the render, rather than one per stem
+        pool = (
+            make_executor(workers, backend) if workers > 1 else contextlib.nullcontext()
+        )
+        with pool as executor:
+            for i, track in enumerate(filtered_tracks):
+                # The stem depends on the sound, format and tempo, and on which
+                # hits fall in the pattern; the hits themselves are the timing
+                lineage = (
+                    "stem",
+                    sample_digest(track.path),
+                    bank.sample_rate,
+                    bank.n_channels,
+                    track.volume,
+                    track.attack,
+                    config.bpm,
+                    config.beats_per_measure,
+                    config.measures,
+                    mix_mode,
+                    mix_backend,
+                )
+                stem = render_stem(
+                    bank,
+                    i,
+                    index.starts[i],
+                    index.velocities[i],
+                    key=lineage + (track.timing.digest,),
+                    lineage=lineage,
+                    mix_mode=mix_mode,
+                    workers=workers,
+                    backend=backend,
+                    mix_backend=mix_backend,
+                    executor=executor,
+                )
+                start = stem.offset + pre_roll
+                dry[start : start + len(stem.data)] += stem.data
     else:
-        raise ValueError(
-            f"Sounds have different numbers of channels: {[sound.shape for sound in sounds]}"
+        mix_tracks(
+            dry,
+            bank,
+            [starts + pre_roll for starts in index.starts],
+            index.velocities,
+            mix_mode=mix_mode,
+            workers=workers,
+            backend=backend,
+            mix_backend=mix_backend,
         )
 
-    # Determine the length (in number of beats) of the timing pattern by
-    # looking at the maximum timing value in the tracks, then rounding up to nearest measure
-    # TODO: make pattern length configurable (to allow a silence at the end of a pattern)
-    max_timing = max(
-        [max(track.timing) if track.timing else 0 for track in filtered_tracks]
-    )
-    pattern_length_beats = (
-        ceil((max_timing + 1) / (TIMING_UNITS_PER_BEAT * config.beats_per_measure))
-        * config.beats_per_measure
+    # Same number of samples per beat as the hits (see _index_hits())
+    beat_length = int((60 / config.bpm) * bank.sample_rate)
+    loop = LoopedBuffer(
+        dry, pre_roll, pattern_length, config.repeat, bank.sample_rate, beat_length
     )
+    if normalize:
+        loop.normalize(MASTER_VOLUME)
+    return loop, bank.sample_rate
+
+
+def render_song(
+    arrangement: Arrangement,
+    config: Config | dict = Config(),
+    mix_mode: str = "auto",
+    workers: int = 1,
+    backend: str = "thread",
+    mix_backend: str = "auto",
+) -> tuple[SongBuffer | None, int]:
+    """
+    Render an arrangement of patterns as a normalized SongBuffer.
+
+    Each distinct pattern is rendered once, however many times it is played,
+    and the song is assembled from those renders on demand, so render time
+    depends on the number of distinct patterns rather than on the length of
+    the song. The song order is played config.repeat times.
+
+    Args:
+        arrangement (Arrangement): The patterns and song order.
+        config (Config or dict): Configuration options shared by all patterns.
+            config.measures is overridden by the measures of each pattern.
+        mix_mode (str): Mixing strategy, see sequence(). Defaults to "auto".
+        workers (int): Number of workers rendering each pattern, see render_loop().
+            Defaults to 1.
+        backend (str): "thread" or "process". Defaults to "thread".
+        mix_backend (str): "numpy", "numba" or "auto", see render_loop().
+            Defaults to "auto".
+
+    Returns:
+        SongBuffer or None: The rendered song, or None if no pattern has a sound
+        int: The sample rate of the audio
+    """
+    arrangement.validate()
+    if isinstance(config, dict):
+        config = Config(**config)
+
+    # Render every pattern in the same format
+    paths = {
+        track.path
+        for name in set(arrangement.order)
+        for track in arrangement.patterns[name].tracks
+        if track.path is not None
+    }
+    if not paths:
+        return None, 44100  # Default sample rate
+    formats = [read_format(path) for path in paths]
+    sample_rate = max(rate for rate, _ in formats)
+    n_channels = max(channels for _, channels in formats)
+
+    rendered = {}
+    segments = []
+    offset = 0
+    for name in arrangement.order * config.repeat:
+        if name not in rendered:
+            pattern = arrangement.patterns[name]
+            rendered[name], _ = render_loop(
+                pattern.tracks,
+                config._replace(measures=pattern.measures, repeat=1),
+                mix_mode=mix_mode,
+                sample_rate=sample_rate,
+                n_channels=n_channels,
+                workers=workers,
+                backend=backend,
+                mix_backend=mix_backend,
+                normalize=False,
+            )
+        loop = rendered[name]
+        if loop is None:
+            # A pattern without sounds is a silent gap of its length
+            measures = arrangement.patterns[name].measures or 1
+            samples_per_beat = int((60 / config.bpm) * sample_rate)
+            offset += measures * config.beats_per_measure * samples_per_beat
+            continue
+        segments.append((offset, loop))
+        offset += loop.length
+
+    if not segments:
+        return None, sample_rate
+    song = SongBuffer(segments, sample_rate)
+    song.normalize(MASTER_VOLUME)
+    return song, sample_rate
+
+
+def _index_hits(
+    tracks: list[Track], config: Config, sample_rate: int, n_channels: int
+) -> tuple[SampleBank, HitIndex, int]:
+    """
+    Load the sounds of tracks and place their hits in a single pattern.
+
+    Args:
+        tracks (list[Track]): Tracks with a sound.
+        config (Config): Configuration options for the sequence.
+        sample_rate (int): Sample rate to render at, or None (see SampleBank).
+        n_channels (int): Number of channels to render, or None (see SampleBank).
+
+    Returns:
+        SampleBank: The sounds of the tracks.
+        HitIndex: The start frame of every hit in the pattern.
+        int: The length of the pattern in frames.
+    """
+    # Load each track's sound as float32, with the track volume applied
+    bank = SampleBank(tracks, sample_rate, n_channels)
+    sample_rate = bank.sample_rate
+
+    # Determine the length (in number of beats) of the timing pattern: config.measures
+    # if set, otherwise the maximum timing value in the tracks rounded up to nearest measure
+    units_per_measure = TIMING_UNITS_PER_BEAT * config.beats_per_measure
+    if config.measures:
+        n_measures = config.measures
+    else:
+        max_timing = max(
+            [int(track.timing.ticks[-1]) if track.timing else 0 for track in tracks]
+        )
+        n_measures = ceil((max_timing + 1) / units_per_measure)
+    pattern_length_beats = n_measures * config.beats_per_measure
 
     # Calculate the number of samples per timing unit and per beat
     samples_per_beat = int((60 / config.bpm) * sample_rate)  # integer
     samples_per_timing_unit = (
         samples_per_beat / TIMING_UNITS_PER_BEAT
     )  # float: very important!
+    pattern_length = pattern_length_beats * samples_per_beat
+
+    # Calculate the start of each hit, relative to the start of the pattern.
+    # Hits past the end of the pattern (if config.measures is set) are dropped.
+    all_starts = []
+    all_velocities = []
+    for track in tracks:
+        ticks, velocity = track.timing.ticks, track.timing.velocity
+        in_pattern = ticks < n_measures * units_per_measure
+        if not np.all(in_pattern):
+            ticks = ticks[in_pattern]
+            velocity = velocity[in_pattern] if velocity is not None else None
+        attack_samples = int(track.attack * sample_rate)
+        starts = (ticks * samples_per_timing_unit).astype(np.int64) - attack_samples
+        all_starts.append(starts)
+        all_velocities.append(velocity)
+
+    lengths = [len(sound) for sound in bank.sources]
+    return bank, HitIndex(all_starts, lengths, all_velocities), pattern_length
+
+
+def render_window(
+    tracks: list[Track],
+    start: int,
+    stop: int,
+    config: Config | dict = Config(),
+    gain: float = None,
+    mix_mode: str = "auto",
+    sample_rate: int = None,
+    n_channels: int = None,
+    mix_backend: str = "auto",
+) -> tuple[np.ndarray, int]:
+    """
+    Render frames [start, stop) of a sequence, without rendering the rest.
+
+    Only the hits audible in the window are mixed, found with a sorted index
+    of the hits in each repeat, so the cost depends on the window and not on
+    the length of the song. Useful for seeking, partial exports or looping a
+    region of a long song (see Config.measures).
+
+    The window is not normalized, since that needs the peak of the whole
+    sequence; pass the gain of a full render (LoopedBuffer.gain, from
+    render_loop()) to match sequence() exactly.
+
+    Args:
+        tracks (list[Track]): List of Track objects defining the sounds and their timings
+        start (int): First frame of the window, in frames from the start of the sequence.
+        stop (int): Frame after the last frame of the window.
+        config (Config or dict): Configuration options for the sequence
+        gain (float): Gain applied to the mix. Defaults to None (MASTER_VOLUME).
+        mix_mode (str): Mixing strategy, see sequence(). Defaults to "auto".
+        sample_rate (int): Sample rate to render at, see render_loop().
+        n_channels (int): Number of channels to render, see render_loop().
+        mix_backend (str): "numpy", "numba" or "auto", see render_loop().
+            Defaults to "auto".
+
+    Returns:
+        np.ndarray: float32 audio of shape (stop - start, n_channels); frames
+            outside the sequence are silent
+        int: The sample rate of the audio
+    """
+    assert stop >= start, f"Window ends before it starts: [{start}, {stop})"
+    filtered_tracks = [track for track in tracks if track.path is not None]
+    if not filtered_tracks:
+        return np.zeros((stop - start, n_channels or 1), dtype=np.float32), 44100
 
-    # Create the initial blank sequence (for a single repeat)
-    pattern = np.zeros(
-        (pattern_length_beats * samples_per_beat, n_channels), dtype=np.float32
+    if isinstance(config, dict):
+        config = Config(**config)
+
+    bank, index, pattern_length = _index_hits(
+        filtered_tracks, config, sample_rate, n_channels
+    )
+    out = _mix_window(
+        bank,
+        index,
+        pattern_length,
+        config.repeat,
+        start,
+        stop,
+        MASTER_VOLUME if gain is None else gain,
+        mix_mode=mix_mode,
+        mix_backend=mix_backend,
     )
+    return out, bank.sample_rate
+
+
+def _mix_window(
+    bank: SampleBank,
+    index: HitIndex,
+    pattern_length: int,
+    repeat: int,
+    start: int,
+    stop: int,
+    gain: float,
+    mix_mode: str = "auto",
+    mix_backend: str = "auto",
+) -> np.ndarray:
+    """
+    Mix frames [start, stop) of a sequence from its indexed hits.
 
-    # Add each track to pattern
-    for _, (track, sound) in enumerate(zip(tracks, sounds)):
-        attack_samples = int(track.attack * sample_rate)
+    Args:
+        bank (SampleBank): The sounds of the tracks.
+        index (HitIndex): The start frame of every hit in the pattern.
+        pattern_length (int): The length of the pattern in frames.
+        repeat (int): Number of times the pattern is repeated.
+        start (int): First frame of the window.
+        stop (int): Frame after the last frame of the window.
+        gain (float): Gain applied to the mix.
+        mix_mode (str): Mixing strategy, see sequence(). Defaults to "auto".
+        mix_backend (str): "numpy", "numba" or "auto". Defaults to "auto".
 
-        for t in track.timing:
-            start = int(t * samples_per_timing_unit) - attack_samples
-            end = start + len(sound)
+    Returns:
+        np.ndarray: float32 audio of shape (stop - start, n_channels)
+    """
+    # Repeats whose hits can reach the window; the sequence starts at frame 0,
+    # so hits of the first repeat that start before it are cut off
+    start_clipped = max(start, 0)
+    first_repeat = max(0, (start_clipped - index.end_frame) // pattern_length)
+    last_repeat = min(repeat, ceil((stop - index.first_frame) / pattern_length))
+
+    window_starts = [[] for _ in index.starts]
+    window_velocities = [[] for _ in index.starts]
+    for r in range(first_repeat, last_repeat):
+        offset = r * pattern_length
+        all_starts, all_velocities = index.query(start_clipped - offset, stop - offset)
+        for i, (starts, velocity) in enumerate(zip(all_starts, all_velocities)):
+            window_starts[i].append(starts + offset - start)
+            if velocity is not None:
+                window_velocities[i].append(velocity)
+
+    out = np.zeros((stop - start, bank.n_channels), dtype=np.float32)
+    mix_tracks(
+        out[start_clipped - start :],
+        bank,
+        [
+            np.concatenate(starts) - (start_clipped - start)
+            if starts
+            else np.zeros(0, np.int64)
+            for starts in window_starts
+        ],
+        [
+            np.concatenate(velocities) if velocities else None
+            for velocities in window_velocities
+        ],
+        mix_mode=mix_mode,
+        mix_backend=mix_backend,
+    )
+    out *= np.float32(gain)
+    return out
 
-            # Check how much to clip from each end (if any)
-            # to ensure sound is within bounds of pattern
-            clip_from_start = max(0, -start)
-            clip_from_end = max(0, end - len(pattern))
 
-            # Add sound into pattern
-            scaled_sound = sound * track.volume
-            pattern[start + clip_from_start : end - clip_from_end] += scaled_sound[
-                clip_from_start : len(sound) - clip_from_end
-            ]
+def sequence(
+    tracks: list[Track],
+    config: Config | dict = Config(),
+    mix_mode: str = "auto",
+    workers: int = 1,
+    backend: str = "thread",
+    mix_backend: str = "auto",
+) -> tuple[np.ndarray, int]:
+    """
+    Create a full audio sequence from a list of Tracks.
 
-    # Normalize amplitude
-    max_amplitude = np.max(np.abs(pattern))
-    if max_amplitude != 0:
-        normalized_pattern = (pattern / max_amplitude) * MASTER_VOLUME
-    else:
-        normalized_pattern = pattern
+    Args:
+        tracks (list[Track]): List of Track objects defining the sounds and their timings
+        config (Config or dict): Configuration options for the sequence
+        mix_mode (str): How each track's hits are mixed: "direct" adds the sound
+            once per hit, "convolve" convolves the sound with an impulse train of
+            the hits (faster for dense tracks), and "auto" picks per track.
+            Defaults to "auto".
+        workers (int): Number of workers rendering in parallel; 0 or None means
+            one per CPU. Defaults to 1.
+        backend (str): "thread" or "process", used to render the pattern.
+            The repeats are always expanded with threads. Defaults to "thread".
+        mix_backend (str): "numpy", "numba" or "auto", see render_loop().
+            Defaults to "auto".
 
-    # Repeat the pattern the specified number of times to get the full sequence
-    sequence = np.tile(normalized_pattern, (config.repeat, 1))
+    Returns:
+        np.ndarray: The full audio sequence as a NumPy array
+        int: The sample rate of the audio
+    """
+    loop, sample_rate = render_loop(
+        tracks,
+        config,
+        mix_mode=mix_mode,
+        workers=workers,
+        backend=backend,
+        mix_backend=mix_backend,
+    )
+    if loop is None:
+        return np.array([]), sample_rate
+
+    # Expand the repeats of the pattern (and its final tail) into the full sequence
+    out = np.empty((loop.n_frames, loop.n_channels), dtype=np.float32)
+    return read_loop(loop, out, workers=workers), sample_rate
+
+
+def sequence_blocks(
+    tracks: list[Track],
+    config: Config | dict = Config(),
+    block_size: int = BLOCK_SIZE,
+    mix_mode: str = "auto",
+    workers: int = 1,
+    backend: str = "thread",
+    mix_backend: str = "auto",
+    gain: float = None,
+) -> tuple[Iterator[np.ndarray], int]:
+    """
+    Create an audio sequence from a list of Tracks as a stream of blocks.
+
+    Covers the same audio as sequence(), but only a single repeat of the
+    pattern is rendered (see render_loop()); the repeats are streamed from it
+    block by block, so memory use does not grow with config.repeat. That
+    repeat is rendered before the first block, since normalizing needs its peak.
+
+    If the gain is known up front (e.g. LoopedBuffer.gain of an earlier render
+    of the same tracks and config), nothing is rendered ahead: each block is
+    mixed when it is consumed, from the hits audible in it (see
+    render_window()), so the first block is ready after mixing one block and
+    memory use does not depend on the length of the pattern either.
+
+    Args:
+        tracks (list[Track]): List of Track objects defining the sounds and their timings
+        config (Config or dict): Configuration options for the sequence
+        block_size (int): Number of frames per block. The last block may be shorter.
+            Defaults to BLOCK_SIZE.
+        mix_mode (str): Mixing strategy, see sequence(). Defaults to "auto".
+        workers (int): Number of workers rendering the pattern, see render_loop().
+            Defaults to 1.
+        backend (str): "thread" or "process". Defaults to "thread".
+        mix_backend (str): "numpy", "numba" or "auto", see render_loop().
+            Defaults to "auto".
+        gain (float): Gain applied to the mix instead of normalizing it, which
+            streams the blocks without rendering the pattern first. Defaults
+            to None (normalize).
+
+    Returns:
+        Iterator[np.ndarray]: Read-only float32 blocks of shape (n_frames, n_channels)
+        int: The sample rate of the audio
+    """
+    if gain is not None:
+        return _window_blocks(tracks, config, block_size, gain, mix_mode, mix_backend)
+
+    loop, sample_rate = render_loop(
+        tracks,
+        config,
+        mix_mode=mix_mode,
+        workers=workers,
+        backend=backend,
+        mix_backend=mix_backend,
+    )
+    if loop is None:
+        return iter(()), sample_rate
+
+    return loop.blocks(block_size), sample_rate
 
-    return sequence, sample_rate
+
+def _window_blocks(
+    tracks: list[Track],
+    config: Config | dict,
+    block_size: int,
+    gain: float,
+    mix_mode: str = "auto",
+    mix_backend: str = "auto",
+) -> tuple[Iterator[np.ndarray], int]:
+    """
+    Stream a sequence in blocks mixed one at a time, see sequence_blocks().
+
+    Returns:
+        Iterator[np.ndarray]: float32 blocks of shape (n_frames, n_channels)
+        int: The sample rate of the audio
+    """
+    filtered_tracks = [track for track in tracks if track.path is not None]
+    if not filtered_tracks:
+        return iter(()), 44100  # Default sample rate
+
+    if isinstance(config, dict):
+        config = Config(**config)
+
+    # Only the sounds are loaded and the hits indexed ahead of the first block
+    bank, index, pattern_length = _index_hits(filtered_tracks, config, None, None)
+    tail = max(0, index.end_frame - pattern_length)
+    n_frames = pattern_length * config.repeat + tail
+
+    def _blocks():
+        for start in range(0, n_frames, block_size):
+            stop = min(start + block_size, n_frames)
+            yield _mix_window(
+                bank,
+                index,
+                pattern_length,
+                config.repeat,
+                start,
+                stop,
+                gain,
+                mix_mode=mix_mode,
+                mix_backend=mix_backend,
+            )
+
+    return _blocks(), bank.sample_rate
+
+
+def sequence_song(
+    arrangement: Arrangement,
+    config: Config | dict = Config(),
+    mix_mode: str = "auto",
+    workers: int = 1,
+    backend: str = "thread",
+    mix_backend: str = "auto",
+) -> tuple[np.ndarray, int]:
+    """
+    Create a full audio sequence from an arrangement of patterns.
+
+    Args:
+        arrangement (Arrangement): The patterns and song order.
+        config (Config or dict): Configuration options shared by all patterns.
+        mix_mode (str): Mixing strategy, see sequence(). Defaults to "auto".
+        workers (int): Number of workers rendering each pattern, see render_loop().
+            Defaults to 1.
+        backend (str): "thread" or "process". Defaults to "thread".
+        mix_backend (str): "numpy", "numba" or "auto", see render_loop().
+            Defaults to "auto".
+
+    Returns:
+        np.ndarray: The full audio sequence as a NumPy array
+        int: The sample rate of the audio
+    """
+    song, sample_rate = render_song(
+        arrangement,
+        config,
+        mix_mode=mix_mode,
+        workers=workers,
+        backend=backend,
+        mix_backend=mix_backend,
+    )
+    if song is None:
+        return np.array([]), sample_rate
+    return song.to_array(), sample_rate
+
+
+# Stop flags of the playbacks started by play(); set by stop()
+_active_playbacks: set[threading.Event] = set()
+
+
+def _play_blocks(
+    blocks: Iterator[np.ndarray],
+    sample_rate: int,
+    wait: bool,
+    backend: OutputBackend = None,
+):
+    """
+    Stream audio blocks to an output backend as they are produced.
+
+    Args:
+        blocks (Iterator[np.ndarray]): float32 blocks of shape (n_frames, n_channels)
+        sample_rate (int): The sample rate of the audio
+        wait (bool): If True, block until playback is finished.
+        backend (OutputBackend): Where the audio is played. Defaults to None
+            (the default backend, see get_output_backend()).
+
+    Returns: None
+    """
+    first = next(blocks, None)
+    if first is None:
+        return
+    backend = backend or get_output_backend()
+
+    stop_event = threading.Event()
+    _active_playbacks.add(stop_event)
+
+    def _stream():
+        try:
+            stream = backend.open_stream(sample_rate, first.shape[1])
+            try:
+                for block in itertools.chain([first], blocks):
+                    if stop_event.is_set():
+                        break
+                    stream.write(block)
+            finally:
+                backend.release(stream, abort=stop_event.is_set())
+        finally:
+            _active_playbacks.discard(stop_event)
+
+    if wait:
+        _stream()
+    else:
+        threading.Thread(target=_stream, daemon=True).start()
 
 
 def play(
     tracks: list[Track],
     config: Config | dict = Config(),
     wait: bool = True,
+    backend: OutputBackend = None,
+    gain: float = None,
 ):
     """
     Play a list of Tracks as an audio file.
 
+    Audio is streamed block by block, so playback starts as soon as the first
+    block is ready. A single repeat of the pattern is rendered first, to
+    normalize it, unless gain is given; then each block is mixed just before
+    it plays (see sequence_blocks()).
+
     Args:
         tracks (list[Track]): List of Track objects defining the sounds and their timings
         config (Config or dict): Configuration options for playback
         wait (bool): If True, block until playback is finished. Defaults to True.
+        backend (OutputBackend): Where the audio is played. Defaults to None
+            (the default backend, see get_output_backend()).
+        gain (float): Gain applied to the mix instead of normalizing it, e.g.
+            LoopedBuffer.gain from render_loop(). Defaults to None (normalize).
 
     Returns: None
     """
-    audio_data, sample_rate = sequence(tracks, config=config)
-
-    sd.play(audio_data, sample_rate)
-    if wait:
-        sd.wait()  # Wait until sound has finished playing
+    blocks, sample_rate = sequence_blocks(tracks, config=config, gain=gain)
+    _play_blocks(blocks, sample_rate, wait=wait, backend=backend)
     return
 
 
 def play_sound_file(
     file_path: str | Path,
     wait: bool = True,
+    backend: OutputBackend = None,
 ):
     """
     Play a WAV sound file.
@@ -146,6 +719,8 @@ def play_sound_file(
         file_path (str or Path): The path to the WAV file to play.
         wait (bool): If True, block until playback is finished.
             (default: True)
+        backend (OutputBackend): Where the audio is played. Defaults to None
+            (the default backend, see get_output_backend()).
 
     Returns: None
     """
@@ -153,16 +728,22 @@ def play_sound_file(
         file_path = Path(file_path)
 
     assert file_path.suffix == ".wav", "File must be a WAV file"
-    sample_rate, audio_data = wav.read(file_path)
+    sample_rate, audio_data = read_wav(file_path)
+
+    audio_data = audio_data.astype(np.float32)
+    if audio_data.ndim == 1:
+        audio_data = audio_data[:, np.newaxis]
 
     # Normalize to a max of 1.0
-    max_amplitude = np.max(np.abs(audio_data))
+    max_amplitude = np.max(np.abs(audio_data), initial=0)
     if max_amplitude != 0:
-        audio_data = (audio_data / max_amplitude) * MASTER_VOLUME
+        audio_data *= MASTER_VOLUME / max_amplitude
 
-    sd.play(audio_data, sample_rate)
-    if wait:
-        sd.wait()  # Wait until sound has finished playing
+    blocks = (
+        audio_data[start : start + BLOCK_SIZE]
+        for start in range(0, len(audio_data), BLOCK_SIZE)
+    )
+    _play_blocks(blocks, sample_rate, wait=wait, backend=backend)
     return
 
 
@@ -172,25 +753,58 @@ def stop():
 
     Returns: None
     """
-    sd.stop()
+    for stop_event in list(_active_playbacks):
+        stop_event.set()
+
+
+def _tracks_to_dicts(tracks: list[Track]) -> list[dict]:
+    return [
+        {**track._asdict(), "timing": track.timing.to_json()}
+        for track in tracks
+        if is_valid_track(track)
+    ]
+
 
+def _dicts_to_tracks(data: list[dict]) -> list[Track]:
+    tracks = [Track(**track_data) for track_data in data]
+    return [track for track in tracks if is_valid_track(track)]
 
-def project_to_dict(tracks: list[Track], config: Config | dict = Config()) -> dict:
+
+def project_to_dict(
+    tracks: list[Track],
+    config: Config | dict = Config(),
+    arrangement: Arrangement = None,
+) -> dict:
     """
     Convert a list of Track objects and a Config object to a dictionary.
 
     Args:
         tracks (list[Track]): List of Track objects to convert.
         config (Config or dict): Configuration options for the project.
+        arrangement (Arrangement): The song arrangement of the project, if any.
+            Defaults to None.
 
     Returns:
         dict: Dictionary representation of the project.
     """
     config = config if isinstance(config, Config) else Config(**config)
-    return {
-        "tracks": [track._asdict() for track in tracks if is_valid_track(track)],
+    data = {
+        "tracks": _tracks_to_dicts(tracks),
         "config": config._asdict(),
     }
+    if arrangement is not None:
+        arrangement.validate()
+        data["arrangement"] = {
+            "patterns": {
+                name: {
+                    "tracks": _tracks_to_dicts(pattern.tracks),
+                    "measures": pattern.measures,
+                }
+                for name, pattern in arrangement.patterns.items()
+            },
+            "order": list(arrangement.order),
+        }
+    return data
 
 
 def dict_to_project(data: dict) -> tuple[list[Track], Config]:
@@ -203,66 +817,140 @@ def dict_to_project(data: dict) -> tuple[list[Track], Config]:
     Returns:
         tuple[list[Track], Config]: A tuple containing a list of Track objects and a Config object.
     """
-    tracks = [Track(**track_data) for track_data in data.get("tracks", [])]
-    filtered_tracks = [track for track in tracks if is_valid_track(track)]
+    filtered_tracks = _dicts_to_tracks(data.get("tracks", []))
     config_data = data.get("config", {})
     config = Config(**config_data) if isinstance(config_data, dict) else Config()
     return filtered_tracks, config
 
 
+def dict_to_arrangement(data: dict) -> Arrangement | None:
+    """
+    Read the song arrangement from a dictionary representation of a project.
+
+    Args:
+        data (dict): Dictionary representation of the project.
+
+    Returns:
+        Arrangement or None: The arrangement, or None if the project has none.
+    """
+    arrangement_data = data.get("arrangement")
+    if not arrangement_data:
+        return None
+    arrangement = Arrangement(
+        patterns={
+            name: Pattern(
+                tracks=_dicts_to_tracks(pattern_data.get("tracks", [])),
+                measures=pattern_data.get("measures"),
+            )
+            for name, pattern_data in arrangement_data.get("patterns", {}).items()
+        },
+        order=list(arrangement_data.get("order", [])),
+    )
+    arrangement.validate()
+    return arrangement
+
+
 def save_project(
     save_path: str | Path,
     tracks: list[Track],
     config: Config | dict = Config(),
-):
+    link: bool = False,
+    overwrite: bool = False,
+    cache: bool = True,
+    arrangement: Arrangement = None,
+) -> list[Track]:
     """
     Saves the current state of the project to a .cadence file.
     PROJ_NAME.cadence is actually a directory with the following structure:
     PROJ_NAME.cadence/
         project.json  # JSON file with project data (tracks, config, etc)
         sounds/
-            sound1.wav  # WAV files for each sound used in the project
+            <hash>.wav  # WAV files for each sound used in the project
+        cache/          # Optional: sounds converted for playback (see read_conformed())
+
+    Sounds are stored under a hash of their contents, so a sound used by
+    several tracks is stored once, and different sounds with the same file
+    name do not overwrite each other.
+
+    With overwrite=True, an existing project is updated in place: only sounds
+    that are not already in the project are copied, sounds no longer used are
+    removed, and project.json is replaced atomically.
 
     Args:
         save_path (str or Path): The path to the .cadence file to save.
         tracks (list[Track]): List of Track objects defining the sounds and their timings
         config (Config or dict): Configuration options for the project
+        link (bool): If True, hardlink sounds into the project instead of copying
+            them when possible, see copy_file(). Defaults to False.
+        overwrite (bool): If True, update the project if it already exists.
+            Defaults to False.
+        cache (bool): If True, create the cache/ directory, where sounds are
+            kept as float32 .npy files once converted for playback, so that
+            later loads need no decoding. Defaults to True.
+        arrangement (Arrangement): Patterns and song order to save with the
+            project (see render_song()), read back by load_arrangement().
+            Defaults to None.
 
-    Returns: None
+    Returns:
+        list[Track]: The tracks, with paths pointing to the saved sounds.
     """
     if isinstance(save_path, str):
         save_path = Path(save_path)
 
     assert save_path.suffix == ".cadence", "Project path must end with .cadence"
-    assert not save_path.exists(), f"Project already exists at {save_path}"
-
-    # Create project directory
-    save_path.mkdir(parents=True, exist_ok=False)
+    if overwrite and save_path.exists():
+        assert (save_path / "project.json").is_file(), (
+            f"Not a project, refusing to overwrite: {save_path}"
+        )
+    else:
+        assert not save_path.exists(), f"Project already exists at {save_path}"
 
-    # Create sounds directory
+    # Create project and sounds directories
     sounds_path = save_path / "sounds"
-    sounds_path.mkdir(parents=True, exist_ok=False)
-
-    # Copy sound files to sounds directory (keep original filenames)
-    for track in tracks:
-        if not track.path:
+    sounds_path.mkdir(parents=True, exist_ok=True)
+
+    # Store sound files in the sounds directory, named by content.
+    # Sounds already in the project are not copied again.
+    all_tracks = list(tracks)
+    if arrangement is not None:
+        for pattern in arrangement.patterns.values():
+            all_tracks.extend(pattern.tracks)
+    stored_paths = {}
+    for track in all_tracks:
+        if not track.path or track.path in stored_paths:
             continue
-        track_filename = Path(track.path).name
-        track_sound_dest = sounds_path / track_filename
-        track_sound_dest.write_bytes(Path(track.path).read_bytes())
+        stored_paths[track.path] = store_sample(sounds_path, track.path, link=link)
 
     # Save project data to project.json
-    project_data = project_to_dict(tracks, config)
+    project_data = project_to_dict(tracks, config, arrangement)
 
     # Update track paths to point to sounds/ directory
-    for track in project_data["tracks"]:
+    for track in _project_track_dicts(project_data):
         if not track["path"]:
             continue
-        track_sound_path = Path(track["path"]).name
-        track["path"] = str(Path("sounds") / track_sound_path)
-    # Write to project.json
-    with open(save_path / "project.json", "w") as f:
+        track["path"] = str(Path("sounds") / stored_paths[track["path"]].name)
+
+    # Write to project.json, replacing any previous version in one step
+    tmp_path = save_path / ".project.json.tmp"
+    with open(tmp_path, "w") as f:
         json.dump(project_data, f, indent=4)
+    os.replace(tmp_path, save_path / "project.json")
+
+    # Remove sounds that are no longer used, and their converted copies
+    used = {stored_path.name for stored_path in stored_paths.values()}
+    remove_orphan_samples(sounds_path, used)
+    cache_path = save_path / PROJECT_CACHE_DIR
+    if cache:
+        cache_path.mkdir(exist_ok=True)
+    if cache_path.is_dir():
+        remove_orphan_cache_files(cache_path, {Path(name).stem for name in used})
+
+    return [
+        track._replace(path=str(stored_paths[track.path].absolute()))
+        if track.path
+        else track
+        for track in tracks
+    ]
 
 
 def load_project(load_path: str | Path) -> tuple[list[Track], Config]:
@@ -286,36 +974,155 @@ def load_project(load_path: str | Path) -> tuple[list[Track], Config]:
     with open(load_path / "project.json", "r") as f:
         project_data = json.load(f)
 
-    # Update track paths to be absolute paths
-    for track in project_data["tracks"]:
+    tracks, config = dict_to_project(_resolve_sound_paths(load_path, project_data))
+    return tracks, config
+
+
+def load_arrangement(load_path: str | Path) -> Arrangement | None:
+    """
+    Loads the song arrangement of a project saved by save_project().
+
+    Args:
+        load_path (str or Path): The path to the .cadence file to load.
+
+    Returns:
+        Arrangement or None: The arrangement, or None if the project has none.
+    """
+    load_path = Path(load_path)
+    assert load_path.suffix == ".cadence", "Project path must end with .cadence"
+    with open(load_path / "project.json", "r") as f:
+        project_data = json.load(f)
+    return dict_to_arrangement(_resolve_sound_paths(load_path, project_data))
+
+
+def _project_track_dicts(project_data: dict) -> Iterator[dict]:
+    """Yield the track dicts of a project, including those of its patterns."""
+    yield from project_data["tracks"]
+    arrangement_data = project_data.get("arrangement") or {}
+    for pattern_data in arrangement_data.get("patterns", {}).values():
+        yield from pattern_data.get("tracks", [])
+
+
+def _resolve_sound_paths(load_path: Path, project_data: dict) -> dict:
+    """Point the track paths of loaded project data at the project's sounds."""
+    for track in _project_track_dicts(project_data):
         if not track["path"]:
             continue
         track_sound_path = Path(track["path"]).name
         track["path"] = str(load_path.absolute() / "sounds" / track_sound_path)
-
-    tracks, config = dict_to_project(project_data)
-    return tracks, config
+    return project_data
 
 
 def save_sound(
     file_path: str | Path,
     tracks: list[Track],
     config: Config | dict = Config(),
-):
+    sample_format: str = "float32",
+    dither: bool = False,
+    block_size: int = BLOCK_SIZE,
+    workers: int = 1,
+    backend: str = "thread",
+    mix_backend: str = "auto",
+    gain: float = None,
+) -> ExportStats:
     """
     Sequences the given tracks using the given config, and saves it as a WAV file.
 
+    The audio is written block by block as it is rendered, so memory use does
+    not grow with config.repeat. To be normalized, a single repeat of the
+    pattern is rendered and held while it is written; pass gain (e.g.
+    LoopedBuffer.gain from render_loop()) to mix each block as it is written
+    instead, so memory use is bounded by the block size whatever the length
+    of the pattern (see sequence_blocks()).
+
     Args:
         file_path (str or Path): The path to the WAV file to save.
         tracks (list[Track]): List of Track objects defining the sounds and their timings
         config (Config or dict): Configuration options for playback
+        sample_format (str): "float32", "int16" or "int24". Defaults to "float32".
+        dither (bool): If True, dither when quantizing to an integer format.
+            Defaults to False.
+        block_size (int): Number of frames rendered and written at a time.
+            Defaults to BLOCK_SIZE.
+        workers (int): Number of workers rendering the pattern, see render_loop().
+            Defaults to 1.
+        backend (str): "thread" or "process". Defaults to "thread".
+        mix_backend (str): "numpy", "numba" or "auto", see render_loop().
+            Defaults to "auto".
+        gain (float): Gain applied to the mix instead of normalizing it.
+            Defaults to None (normalize).
 
-    Returns: None
+    Returns:
+        ExportStats: Number of frames written and export throughput.
+    """
+    if isinstance(file_path, str):
+        file_path = Path(file_path)
+
+    assert file_path.suffix == ".wav", "File must be a WAV file"
+    start_time = time.perf_counter()
+    blocks, sample_rate = sequence_blocks(
+        tracks,
+        config,
+        block_size=block_size,
+        workers=workers,
+        backend=backend,
+        mix_backend=mix_backend,
+        gain=gain,
+    )
+
+    stats = write_wav_blocks(
+        file_path, blocks, sample_rate, sample_format=sample_format, dither=dither
+    )
+    return stats._replace(elapsed_seconds=time.perf_counter() - start_time)
+
+
+def save_song(
+    file_path: str | Path,
+    arrangement: Arrangement,
+    config: Config | dict = Config(),
+    sample_format: str = "float32",
+    dither: bool = False,
+    block_size: int = BLOCK_SIZE,
+    workers: int = 1,
+    backend: str = "thread",
+    mix_backend: str = "auto",
+) -> ExportStats:
+    """
+    Renders an arrangement of patterns (see render_song()) and saves it as a WAV file.
+
+    Args:
+        file_path (str or Path): The path to the WAV file to save.
+        arrangement (Arrangement): The patterns and song order.
+        config (Config or dict): Configuration options shared by all patterns.
+        sample_format (str): "float32", "int16" or "int24". Defaults to "float32".
+        dither (bool): If True, dither when quantizing to an integer format.
+            Defaults to False.
+        block_size (int): Number of frames assembled and written at a time.
+            Defaults to BLOCK_SIZE.
+        workers (int): Number of workers rendering each pattern, see render_loop().
+            Defaults to 1.
+        backend (str): "thread" or "process". Defaults to "thread".
+        mix_backend (str): "numpy", "numba" or "auto", see render_loop().
+            Defaults to "auto".
+
+    Returns:
+        ExportStats: Number of frames written and export throughput.
     """
     if isinstance(file_path, str):
         file_path = Path(file_path)
 
     assert file_path.suffix == ".wav", "File must be a WAV file"
-    sound_data, sample_rate = sequence(tracks, config)
+    start_time = time.perf_counter()
+    song, sample_rate = render_song(
+        arrangement,
+        config,
+        workers=workers,
+        backend=backend,
+        mix_backend=mix_backend,
+    )
+    blocks = song.blocks(block_size) if song is not None else iter(())
 
-    wav.write(file_path, sample_rate, sound_data)
+    stats = write_wav_blocks(
+        file_path, blocks, sample_rate, sample_format=sample_format, dither=dither
+    )
+    return stats._replace(elapsed_seconds=time.perf_counter() - start_time)
@@ -0,0 +1,193 @@
+from math import ceil
+from typing import Iterator
+
+import numpy as np
+
+from cadence.api.mixing import add_sound
+
+
+class LoopedBuffer:
+    """
+    A pattern repeated a number of times, stored as a single rendered repeat.
+
+    The rendered repeat ("dry" buffer) covers the pattern plus any audio that
+    hits push outside of it: a pre-roll before the pattern start (hits with an
+    attack) and a tail after its end (sounds ringing past the last beat).
+    Output frames are computed on demand by overlap-adding the dry buffer at
+    every repeat, so tails ring into the next repeat instead of being cut off,
+    and memory does not depend on the number of repeats.
+
+    Attributes:
+        dry (np.ndarray): float32 render of one repeat, including pre-roll
+            and tail, with shape (pre_roll + length + tail, n_channels).
+            It becomes read-only once the buffer is normalized.
+        pre_roll (int): Number of frames in dry before the pattern start.
+        length (int): Length of the pattern in frames (the loop period).
+        repeat (int): Number of times the pattern is repeated.
+        sample_rate (int): Sample rate of the audio.
+        beat_length (int): Length of a beat in frames, or None if unknown.
+        gain (float): Gain applied to the dry buffer by normalize(), 1.0 before.
+    """
+
+    def __init__(
+        self,
+        dry: np.ndarray,
+        pre_roll: int,
+        length: int,
+        repeat: int,
+        sample_rate: int,
+        beat_length: int | None = None,
+    ):
+        self.dry = dry
+        self.pre_roll = pre_roll
+        self.length = length
+        self.repeat = repeat
+        self.sample_rate = sample_rate
+        self.beat_length = beat_length
+        self.gain = 1.0
+
+    @property
+    def tail(self) -> int:
+        """Number of frames in dry after the end of the pattern."""
+        return len(self.dry) - self.pre_roll - self.length
+
+    @property
+    def n_channels(self) -> int:
+        """Number of audio channels."""
+        return self.dry.shape[1]
+
+    @property
+    def n_frames(self) -> int:
+        """Total number of output frames, including the final tail."""
+        return self.length * self.repeat + self.tail
+
+    def _repeats(self, start: int, stop: int) -> range:
+        """Return the repeats whose dry buffer overlaps frames [start, stop)."""
+        first = max(0, (start + self.pre_roll - len(self.dry)) // self.length + 1)
+        last = min(self.repeat, ceil((stop + self.pre_roll) / self.length))
+        return range(first, last)
+
+    def add(self, start: int, out: np.ndarray, stop_repeat: int = None) -> np.ndarray:
+        """
+        Add the output frames starting at frame `start` into out.
+
+        Args:
+            start (int): Index of the first output frame to add.
+            out (np.ndarray): float32 array of shape (n_frames, n_channels) to add into.
+            stop_repeat (int): If given, only repeats before this one are added,
+                e.g. to let the tails of a loop ring out after it is replaced.
+                Defaults to None (all repeats).
+
+        Returns:
+            np.ndarray: out
+        """
+        repeats = self._repeats(start, start + len(out))
+        if stop_repeat is not None:
+            repeats = range(repeats.start, min(repeats.stop, stop_repeat))
+        for r in repeats:
+            add_sound(out, self.dry, r * self.length - self.pre_roll - start)
+        return out
+
+    def read(self, start: int, out: np.ndarray) -> np.ndarray:
+        """
+        Fill out with the output frames starting at frame `start`.
+
+        Frames past the end of the output are filled with silence.
+
+        Args:
+            start (int): Index of the first output frame to read.
+            out (np.ndarray): float32 array of shape (n_frames, n_channels) to fill.
+
+        Returns:
+            np.ndarray: out
+        """
+        out[:] = 0
+        return self.add(start, out)
+
+    def frames(self, start: int, stop: int) -> np.ndarray:
+        """
+        Return output frames [start, stop).
+
+        The result is a view of the dry buffer when only one repeat is
+        audible in that range, and a new array otherwise.
+
+        Args:
+            start (int): Index of the first frame.
+            stop (int): Index after the last frame.
+
+        Returns:
+            np.ndarray: float32 array of shape (stop - start, n_channels).
+        """
+        repeats = self._repeats(start, stop)
+        if len(repeats) == 1:
+            offset = start - repeats[0] * self.length + self.pre_roll
+            if offset >= 0 and offset + (stop - start) <= len(self.dry):
+                return self.dry[offset : offset + stop - start]
+        out = np.empty((stop - start, self.n_channels), dtype=self.dry.dtype)
+        return self.read(start, out)
+
+    def blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        """
+        Yield the whole output in blocks of block_size frames.
+
+        Args:
+            block_size (int): Number of frames per block. The last block may be shorter.
+
+        Yields:
+            np.ndarray: Read-only float32 blocks of shape (n_frames, n_channels).
+        """
+        n_frames = self.n_frames
+        for start in range(0, n_frames, block_size):
+            yield self.frames(start, min(start + block_size, n_frames))
+
+    def to_array(self) -> np.ndarray:
+        """
+        Return the whole output as a single array.
+
+        Returns:
+            np.ndarray: float32 array of shape (n_frames, n_channels).
+        """
+        out = np.empty((self.n_frames, self.n_channels), dtype=self.dry.dtype)
+        return self.read(0, out)
+
+    def peak(self) -> float:
+        """
+        Return the maximum absolute amplitude of the output.
+
+        Only repeats near the start and end of the output can differ (they
+        have fewer neighbours ringing into them), so all repeats in the
+        middle share the peak of a single representative repeat.
+
+        Returns:
+            float: The peak amplitude.
+        """
+        edge = ceil((self.pre_roll + self.tail) / self.length) + 2
+        n_windows = ceil(self.n_frames / self.length)
+        windows = sorted(
+            set(range(min(n_windows, edge + 1)))
+            | set(range(max(0, self.repeat - edge), n_windows))
+        )
+        out = np.empty((self.length, self.n_channels), dtype=self.dry.dtype)
+        peak = 0.0
+        for k in windows:
+            window = self.read(k * self.length, out)
+            peak = max(peak, float(np.max(np.abs(window))))
+        return peak
+
+    def normalize(self, level: float):
+        """
+        Scale the dry buffer in place so that the output peaks at `level`.
+
+        The dry buffer is read-only afterwards.
+
+        Args:
+            level (float): Target peak amplitude.
+
+        Returns: None
+        """
+        peak = self.peak()
+        if peak != 0:
+            self.dry /= peak
+            self.dry *= level
+            self.gain = level / peak
+        self.dry.flags.writeable = False
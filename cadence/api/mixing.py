@@ -0,0 +1,315 @@
+import numpy as np
+from scipy.signal import oaconvolve
+
+try:
+    import numba
+except ImportError:  # numba is optional, see resolve_mix_backend()
+    numba = None
+
+MIX_MODES = ("auto", "direct", "convolve")
+MIX_BACKENDS = ("auto", "numpy", "numba")
+
+# Rough cost model used by choose_mix_mode(), in units of "one sample added".
+# Each direct hit pays a fixed interpreter overhead on top of the sample
+# length; convolution pays a per-sample FFT cost that grows with log2 of the
+# sample length (overlap-add uses blocks about as long as the sample).
+# The compiled kernel has almost no per-hit overhead.
+DIRECT_HIT_OVERHEAD = 1000
+JIT_HIT_OVERHEAD = 10
+CONVOLVE_COST_FACTOR = 8
+
+
+def choose_mix_mode(
+    n_hits: int,
+    sound_length: int,
+    pattern_length: int,
+    hit_overhead: int = DIRECT_HIT_OVERHEAD,
+) -> str:
+    """
+    Pick the cheaper mixing strategy for a track.
+
+    Args:
+        n_hits (int): Number of hits in the track.
+        sound_length (int): Length of the track's sound in samples.
+        pattern_length (int): Length of the pattern in samples.
+        hit_overhead (int): Fixed cost of a direct hit. Defaults to
+            DIRECT_HIT_OVERHEAD (use JIT_HIT_OVERHEAD for the numba backend).
+
+    Returns:
+        str: "direct" or "convolve".
+    """
+    direct_cost = n_hits * (sound_length + hit_overhead)
+    convolve_cost = (
+        CONVOLVE_COST_FACTOR
+        * (pattern_length + sound_length)
+        * np.log2(max(sound_length, 2))
+    )
+    return "convolve" if direct_cost > convolve_cost else "direct"
+
+
+def add_sound(
+    pattern: np.ndarray,
+    sound: np.ndarray,
+    start: int,
+    gain: float = 1.0,
+    scratch: np.ndarray = None,
+):
+    """
+    Add a sound into a pattern in place, clipping at the pattern edges.
+
+    Both arrays must have the same dtype and channel layout, so that the add
+    needs no temporary arrays. A gain other than 1 is applied into scratch,
+    which must be at least as long as the sound.
+
+    Args:
+        pattern (np.ndarray): Pattern to mix into, modified in place.
+        sound (np.ndarray): The sound to add.
+        start (int): Offset of the start of the sound in the pattern (may be negative).
+        gain (float): Gain applied to the sound. Defaults to 1.0.
+        scratch (np.ndarray): Buffer shaped like sound, overwritten when gain
+            is not 1. Defaults to None (allocate one).
+
+    Returns: None
+    """
+    clipped_start = max(start, 0)
+    clipped_end = min(start + len(sound), len(pattern))
+    if clipped_start >= clipped_end:
+        return
+    part = sound[clipped_start - start : clipped_end - start]
+    if gain != 1:
+        out = None if scratch is None else scratch[: len(part)]
+        part = np.multiply(part, pattern.dtype.type(gain), out=out)
+    pattern[clipped_start:clipped_end] += part
+
+
+def mix_direct(
+    pattern: np.ndarray,
+    sound: np.ndarray,
+    starts: np.ndarray,
+    velocity: np.ndarray = None,
+):
+    """
+    Add a sound into a pattern once per hit, clipping at the pattern edges.
+
+    Args:
+        pattern (np.ndarray): Pattern to mix into, modified in place.
+        sound (np.ndarray): The sound to add, with the track volume applied.
+        starts (np.ndarray): Start offset of each hit in samples (may be negative).
+        velocity (np.ndarray): Gain of each hit, or None for full velocity.
+            Defaults to None.
+
+    Returns: None
+    """
+    if velocity is None:
+        for start in np.asarray(starts).tolist():
+            add_sound(pattern, sound, start)
+        return
+    # One buffer for the scaled sound of every hit, rather than one per hit
+    scratch = np.empty_like(sound)
+    for start, gain in zip(np.asarray(starts).tolist(), velocity.tolist()):
+        add_sound(pattern, sound, start, gain, scratch)
+
+
+def mix_convolve(
+    pattern: np.ndarray,
+    sound: np.ndarray,
+    starts: np.ndarray,
+    gain: float | np.ndarray = 1.0,
+):
+    """
+    Add a sound into a pattern by convolving it with an impulse train.
+
+    An impulse is placed at every hit offset, and the train is convolved with
+    the sound using FFT overlap-add. The result matches mix_direct() within
+    floating point tolerance, but its cost depends on the pattern and sound
+    lengths rather than on the number of hits.
+
+    Args:
+        pattern (np.ndarray): Pattern to mix into, modified in place.
+        sound (np.ndarray): The sound to add, with the track volume applied.
+        starts (np.ndarray): Start offset of each hit in samples (may be negative).
+        gain (float or np.ndarray): Amplitude of the impulses (one value for
+            all hits, or one per hit), i.e. the volume to apply to the sound.
+            Defaults to 1.0.
+
+    Returns: None
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    audible = (starts + len(sound) > 0) & (starts < len(pattern))
+    starts = starts[audible]
+    if np.ndim(gain):
+        gain = np.asarray(gain)[audible]
+    if len(starts) == 0:
+        return
+
+    # Hits starting before the pattern are shifted right by `offset`,
+    # and the same number of samples is dropped from the convolution output
+    offset = max(0, -int(starts.min()))
+    impulses = np.zeros((len(pattern) + offset, 1), dtype=pattern.dtype)
+    np.add.at(impulses[:, 0], starts + offset, gain)
+
+    mixed = oaconvolve(impulses, sound, axes=0)
+    pattern += mixed[offset : offset + len(pattern)]
+
+
+def mix_track(
+    pattern: np.ndarray,
+    sound: np.ndarray,
+    starts: np.ndarray,
+    mix_mode: str = "auto",
+    velocity: np.ndarray = None,
+):
+    """
+    Add a track's hits into a pattern using the given mixing strategy.
+
+    Args:
+        pattern (np.ndarray): Pattern to mix into, modified in place.
+        sound (np.ndarray): The sound to add, with the track volume applied.
+        starts (np.ndarray): Start offset of each hit in samples (may be negative).
+        mix_mode (str): "direct", "convolve", or "auto" to choose
+            with choose_mix_mode(). Defaults to "auto".
+        velocity (np.ndarray): Gain of each hit, or None for full velocity.
+            Defaults to None.
+
+    Returns: None
+    """
+    if mix_mode not in MIX_MODES:
+        raise ValueError(f"Unknown mix mode {mix_mode!r}; expected one of {MIX_MODES}")
+    if mix_mode == "auto":
+        mix_mode = choose_mix_mode(len(starts), len(sound), len(pattern))
+
+    if mix_mode == "convolve":
+        mix_convolve(pattern, sound, starts, gain=1.0 if velocity is None else velocity)
+    else:
+        mix_direct(pattern, sound, starts, velocity=velocity)
+
+
+def resolve_mix_backend(mix_backend: str) -> str:
+    """
+    Return the mixing backend to use for a mix_backend argument.
+
+    Args:
+        mix_backend (str): "numpy", "numba", or "auto" to use numba when
+            it is installed and NumPy otherwise.
+
+    Returns:
+        str: "numpy" or "numba".
+    """
+    if mix_backend not in MIX_BACKENDS:
+        raise ValueError(
+            f"Unknown mix backend {mix_backend!r}; expected one of {MIX_BACKENDS}"
+        )
+    if mix_backend == "auto":
+        return "numpy" if numba is None else "numba"
+    if mix_backend == "numba" and numba is None:
+        raise ImportError("The numba mix backend requires numba (pip install numba)")
+    return mix_backend
+
+
+def _mix_events(out, samples, starts, offsets, lengths, gains):
+    # Work on flat views so the inner loop runs over contiguous memory
+    n_frames, n_channels = out.shape
+    out = out.reshape(-1)
+    samples = samples.reshape(-1)
+    for event in range(len(starts)):
+        start = starts[event]
+        first = max(0, -start)
+        last = min(lengths[event], n_frames - start)
+        if first >= last:
+            continue
+        n = (last - first) * n_channels
+        target = out[(start + first) * n_channels :][:n]
+        source = samples[(offsets[event] + first) * n_channels :][:n]
+        gain = gains[event]
+        for i in range(n):
+            target[i] += source[i] * gain
+
+
+if numba is not None:
+    # nogil lets the thread backend of mix_tracks() run the kernel in parallel
+    _mix_events = numba.njit(cache=True, nogil=True)(_mix_events)
+
+
+def concatenate_sounds(sounds: list[np.ndarray]) -> tuple[np.ndarray, list[int]]:
+    """
+    Concatenate sounds into one array for mix_events(), storing each distinct array once.
+
+    Args:
+        sounds (list[np.ndarray]): float32 sounds of shape (n_frames, n_channels).
+
+    Returns:
+        np.ndarray: The concatenated float32 sounds (the sound itself if
+        there is a single distinct one).
+        list[int]: The frame offset of each sound in it.
+    """
+    positions = {}
+    chunks = []
+    position = 0
+    for sound in sounds:
+        if id(sound) not in positions:
+            positions[id(sound)] = position
+            chunks.append(sound)
+            position += len(sound)
+    if len(chunks) == 1:
+        samples = chunks[0]
+    else:
+        samples = np.concatenate(chunks)
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    return samples, [positions[id(sound)] for sound in sounds]
+
+
+def mix_events(
+    pattern: np.ndarray,
+    tracks: list[tuple[np.ndarray, np.ndarray, float]],
+    samples: np.ndarray = None,
+    offsets: list[int] = None,
+):
+    """
+    Add the hits of several tracks into a pattern in one compiled pass.
+
+    The hits of all tracks are flattened into a single event array, and each
+    event adds its sound, scaled by its track's volume, clipping at the
+    pattern edges. The result is identical to mix_direct() with sounds
+    scaled in advance. Requires numba.
+
+    The kernel reads the sounds from one concatenated array. Callers mixing
+    the same sounds repeatedly (e.g. SampleBank.flat_sources) should pass it
+    in with samples and offsets; otherwise the sounds are concatenated here.
+
+    Args:
+        pattern (np.ndarray): float32 pattern to mix into, modified in place.
+        tracks (list[tuple]): (sound, starts, gain) for each track: the
+            float32 sound without volume applied, the start offset of each hit
+            in samples (may be negative), and the gain to apply: the track
+            volume, or an array with the gain of each hit.
+        samples (np.ndarray): The sounds concatenated by concatenate_sounds().
+            Defaults to None.
+        offsets (list[int]): Frame offset of each track's sound in samples.
+            Required with samples. Defaults to None.
+
+    Returns: None
+    """
+    if not tracks:
+        return
+
+    if samples is None:
+        samples, offsets = concatenate_sounds([sound for sound, _, _ in tracks])
+
+    starts = np.concatenate([np.asarray(hits, dtype=np.int64) for _, hits, _ in tracks])
+    n_hits = [len(hits) for _, hits, _ in tracks]
+    event_offsets = np.repeat(offsets, n_hits)
+    event_lengths = np.repeat([len(sound) for sound, _, _ in tracks], n_hits)
+    event_gains = np.concatenate(
+        [
+            np.broadcast_to(np.asarray(gain, dtype=np.float32), len(hits))
+            for _, hits, gain in tracks
+        ]
+    )
+    _mix_events(
+        pattern,
+        samples,
+        starts,
+        event_offsets.astype(np.int64),
+        event_lengths.astype(np.int64),
+        event_gains,
+    )
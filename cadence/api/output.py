@@ -0,0 +1,451 @@
+import threading
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from cadence.api.constants import PLAYER_BLOCK_SIZE
+from cadence.api.wavfile import WavWriter
+
+OUTPUT_BACKENDS = ("sounddevice", "null", "wav")
+
+
+class CallbackStop(Exception):
+    """
+    Raised by a stream callback to end the stream after the current block.
+
+    Used instead of sounddevice.CallbackStop, so that callbacks work with
+    every output backend.
+    """
+
+
+class TimeInfo(NamedTuple):
+    """Timing of a block passed to the callback of a simulated stream."""
+
+    currentTime: float
+    outputBufferDacTime: float
+
+
+class OutputBackend:
+    """
+    Where played audio goes.
+
+    A backend opens output streams with the interface of a
+    sounddevice.OutputStream: samplerate, blocksize, active, time, start(),
+    write(), stop(), abort() and close(). A stream opened with a callback
+    pulls its audio from the callback, like sounddevice's callback streams;
+    otherwise audio is pushed to it with write().
+
+    Args:
+        blocksize (int): Frames per block, or None for the backend's default.
+    """
+
+    def __init__(self, blocksize: int | None = None):
+        self.blocksize = blocksize
+
+    def open_stream(
+        self,
+        sample_rate: int,
+        n_channels: int,
+        blocksize: int | None = None,
+        callback: Callable | None = None,
+        finished_callback: Callable[[], None] | None = None,
+    ):
+        """
+        Open an output stream of float32 audio.
+
+        Args:
+            sample_rate (int): The sample rate of the audio.
+            n_channels (int): The number of audio channels.
+            blocksize (int): Frames per block. Defaults to the backend's blocksize.
+            callback (Callable): Called as callback(outdata, frames, time_info,
+                status) to fill each block, or None to write() to the stream.
+                May raise CallbackStop to end the stream. Defaults to None.
+            finished_callback (Callable): Called when a callback stream stops.
+                Defaults to None.
+
+        Returns:
+            The stream. Callback streams must be started; streams opened
+            without a callback are started, and are given back with release().
+        """
+        raise NotImplementedError
+
+    def release(self, stream, abort: bool = False):
+        """
+        Give back a stream opened without a callback, once done writing to it.
+
+        Args:
+            stream: The stream returned by open_stream().
+            abort (bool): If True, drop the audio not played yet instead of
+                waiting for it to play. Defaults to False.
+
+        Returns: None
+        """
+        if abort:
+            stream.abort()
+        else:
+            stream.stop()
+        stream.close()
+
+    def close(self):
+        """
+        Release the resources kept by the backend between streams.
+
+        Returns: None
+        """
+
+
+class SounddeviceBackend(OutputBackend):
+    """
+    Plays audio on a sound device through sounddevice (PortAudio).
+
+    sounddevice is only imported when the first stream is opened, so the
+    other backends work on machines without PortAudio.
+
+    Args:
+        device (int or str): Output device, as accepted by sounddevice.
+            Defaults to None (the default output device).
+        blocksize (int): Frames per block. Defaults to None (let PortAudio choose).
+        latency (float or str): Suggested output latency in seconds, or "low"
+            or "high". Defaults to None ("high", sounddevice's default).
+        persistent (bool): If True, keep the stream used by write() open between
+            playbacks, so that starting playback does not reopen the device.
+            Defaults to True.
+    """
+
+    def __init__(
+        self,
+        device: int | str | None = None,
+        blocksize: int | None = None,
+        latency: float | str | None = None,
+        persistent: bool = True,
+    ):
+        super().__init__(blocksize)
+        self.device = device
+        self.latency = latency
+        self.persistent = persistent
+        self._lock = threading.Lock()
+        # Persistent stream not in use by a playback, with its (sample rate,
+        # channels, blocksize)
+        self._idle_stream: tuple[tuple[int, int, int], object] = None
+        self._formats: dict[int, tuple[int, int, int]] = {}
+
+    def open_stream(
+        self,
+        sample_rate: int,
+        n_channels: int,
+        blocksize: int | None = None,
+        callback: Callable | None = None,
+        finished_callback: Callable[[], None] | None = None,
+    ):
+        import sounddevice as sd
+
+        blocksize = blocksize or self.blocksize or 0
+        stream_format = (sample_rate, n_channels, blocksize)
+        if callback is None and self.persistent:
+            with self._lock:
+                idle, self._idle_stream = self._idle_stream, None
+            if idle is not None:
+                idle_format, stream = idle
+                if idle_format == stream_format:
+                    if not stream.active:
+                        stream.start()
+                    return stream
+                del self._formats[id(stream)]
+                stream.close()
+
+        if callback is not None:
+            callback = _translate_callback_stop(callback, sd.CallbackStop)
+        stream = sd.OutputStream(
+            samplerate=sample_rate,
+            channels=n_channels,
+            dtype="float32",
+            blocksize=blocksize,
+            device=self.device,
+            latency=self.latency,
+            callback=callback,
+            finished_callback=finished_callback,
+        )
+        if callback is None:
+            self._formats[id(stream)] = stream_format
+            stream.start()
+        return stream
+
+    def release(self, stream, abort: bool = False):
+        # stop() waits for the audio already written to play, so that
+        # play(wait=True) returns once it has been heard. A kept stream is
+        # started again by the next open_stream(), without reopening the device.
+        if abort:
+            stream.abort()
+        else:
+            stream.stop()
+        if self.persistent:
+            with self._lock:
+                if self._idle_stream is None:
+                    self._idle_stream = (self._formats[id(stream)], stream)
+                    return
+        # Another playback released its stream first: close this one
+        del self._formats[id(stream)]
+        stream.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle_stream = self._idle_stream, None
+        if idle is not None:
+            _, stream = idle
+            del self._formats[id(stream)]
+            stream.close()
+
+
+class NullBackend(OutputBackend):
+    """
+    Discards audio, for running playback without a sound device (e.g. in CI).
+
+    Args:
+        blocksize (int): Frames per callback block. Defaults to None
+            (PLAYER_BLOCK_SIZE).
+        realtime (bool): If True, consume audio at the rate a sound device
+            would; otherwise as fast as it is produced. Callback streams that
+            are not realtime call their callback back to back, so a callback
+            fed by another thread (like LoopPlayer's) may underrun. Defaults
+            to False.
+    """
+
+    def __init__(self, blocksize: int | None = None, realtime: bool = False):
+        super().__init__(blocksize)
+        self.realtime = realtime
+        self.frames_played = 0  # Frames consumed by all streams so far
+
+    def open_stream(
+        self,
+        sample_rate: int,
+        n_channels: int,
+        blocksize: int | None = None,
+        callback: Callable | None = None,
+        finished_callback: Callable[[], None] | None = None,
+    ):
+        return _SimulatedStream(
+            self,
+            sample_rate,
+            n_channels,
+            blocksize or self.blocksize or PLAYER_BLOCK_SIZE,
+            callback,
+            finished_callback,
+        )
+
+    def _sink(self, stream: "_SimulatedStream", block: np.ndarray):
+        self.frames_played += len(block)
+
+    def _end(self, stream: "_SimulatedStream"):
+        pass
+
+
+class WavFileBackend(NullBackend):
+    """
+    Writes played audio to a WAV file instead of a sound device.
+
+    Each stream writes the whole file, so the file holds the audio of the
+    latest stream once it is closed.
+
+    Args:
+        file_path (str or Path): The path to the WAV file to write.
+        blocksize (int): Frames per callback block. Defaults to None
+            (PLAYER_BLOCK_SIZE).
+        realtime (bool): If True, consume audio at the rate a sound device
+            would; otherwise as fast as it is produced. Defaults to False.
+        sample_format (str): "float32", "int16" or "int24". Defaults to "float32".
+    """
+
+    def __init__(
+        self,
+        file_path: str | Path,
+        blocksize: int | None = None,
+        realtime: bool = False,
+        sample_format: str = "float32",
+    ):
+        super().__init__(blocksize, realtime)
+        self.file_path = Path(file_path)
+        self.sample_format = sample_format
+        self._writers: dict[int, WavWriter] = {}
+
+    def open_stream(self, sample_rate: int, n_channels: int, *args, **kwargs):
+        stream = super().open_stream(sample_rate, n_channels, *args, **kwargs)
+        self._writers[id(stream)] = WavWriter(
+            self.file_path, sample_rate, n_channels, self.sample_format
+        )
+        return stream
+
+    def _sink(self, stream: "_SimulatedStream", block: np.ndarray):
+        super()._sink(stream, block)
+        self._writers[id(stream)].write(block)
+
+    def _end(self, stream: "_SimulatedStream"):
+        writer = self._writers.pop(id(stream), None)
+        if writer is not None:
+            writer.close()
+
+
+class _SimulatedStream:
+    """An output stream that hands its audio to a NullBackend instead of a device."""
+
+    def __init__(
+        self,
+        backend: NullBackend,
+        sample_rate: int,
+        n_channels: int,
+        blocksize: int,
+        callback: Callable,
+        finished_callback: Callable[[], None],
+    ):
+        self.samplerate = sample_rate
+        self.channels = n_channels
+        self.blocksize = blocksize
+        self._backend = backend
+        self._callback = callback
+        self._finished_callback = finished_callback
+        self._frames = 0
+        self._start_time: float = None
+        self._stopping = threading.Event()
+        self._thread: threading.Thread = None
+        self._closed = False
+        self.active = False
+        if callback is None:
+            self.start()
+
+    @property
+    def time(self) -> float:
+        """Stream time in seconds: wall-clock time if realtime, else frames played."""
+        if self._backend.realtime and self._start_time is not None:
+            return time.monotonic() - self._start_time
+        return self._frames / self.samplerate
+
+    def start(self):
+        self._stopping.clear()
+        self._start_time = time.monotonic() - self._frames / self.samplerate
+        self.active = True
+        if self._callback is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def write(self, block: np.ndarray):
+        self._play(block)
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.active = False
+
+    abort = stop
+
+    def close(self):
+        self.stop()
+        if not self._closed:
+            self._closed = True
+            self._backend._end(self)
+
+    def _play(self, block: np.ndarray):
+        self._backend._sink(self, block)
+        self._frames += len(block)
+        if self._backend.realtime:
+            # Wait until a device would have played the block
+            delay = self._start_time + self._frames / self.samplerate - time.monotonic()
+            if delay > 0:
+                self._stopping.wait(delay)
+
+    def _run(self):
+        outdata = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+        try:
+            while not self._stopping.is_set():
+                now = self.time
+                try:
+                    self._callback(outdata, self.blocksize, TimeInfo(now, now), None)
+                except CallbackStop:
+                    self._play(outdata)  # The last block is still played
+                    break
+                self._play(outdata)
+        finally:
+            self.active = False
+            if self._finished_callback is not None:
+                self._finished_callback()
+
+
+def _translate_callback_stop(callback: Callable, stop_exception: type) -> Callable:
+    """Wrap a callback so that CallbackStop ends a sounddevice stream."""
+
+    def _callback(outdata, frames, time_info, status):
+        try:
+            callback(outdata, frames, time_info, status)
+        except CallbackStop:
+            raise stop_exception from None
+
+    return _callback
+
+
+# Backend used when none is passed to play(), play_sound_file() or LoopPlayer
+_output_backend: OutputBackend = None
+
+
+def get_output_backend() -> OutputBackend:
+    """
+    Return the default output backend, a SounddeviceBackend unless set otherwise.
+
+    Returns:
+        OutputBackend: The default output backend.
+    """
+    global _output_backend
+    if _output_backend is None:
+        _output_backend = SounddeviceBackend()
+    return _output_backend
+
+
+def set_output_backend(backend: OutputBackend):
+    """
+    Set the default output backend, closing the previous one.
+
+    Args:
+        backend (OutputBackend): The new default output backend.
+
+    Returns: None
+    """
+    global _output_backend
+    if _output_backend is not None and _output_backend is not backend:
+        _output_backend.close()
+    _output_backend = backend
+
+
+def make_output_backend(
+    name: str,
+    device: int | str | None = None,
+    blocksize: int | None = None,
+    latency: float | str | None = None,
+    file_path: str | Path | None = None,
+    realtime: bool = False,
+) -> OutputBackend:
+    """
+    Create an output backend by name.
+
+    Args:
+        name (str): "sounddevice", "null" or "wav".
+        device (int or str): Output device (sounddevice only). Defaults to None.
+        blocksize (int): Frames per block. Defaults to None.
+        latency (float or str): Suggested latency (sounddevice only). Defaults to None.
+        file_path (str or Path): The WAV file to write (wav only). Defaults to None.
+        realtime (bool): Consume audio in real time (null and wav only).
+            Defaults to False.
+
+    Returns:
+        OutputBackend: The new backend.
+    """
+    if name == "sounddevice":
+        return SounddeviceBackend(device=device, blocksize=blocksize, latency=latency)
+    if name == "null":
+        return NullBackend(blocksize=blocksize, realtime=realtime)
+    if name == "wav":
+        if file_path is None:
+            raise ValueError("The wav output backend requires a file path")
+        return WavFileBackend(file_path, blocksize=blocksize, realtime=realtime)
+    raise ValueError(
+        f"Unknown output backend {name!r}; expected one of {list(OUTPUT_BACKENDS)}"
+    )
@@ -0,0 +1,253 @@
+import contextlib
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from math import ceil
+
+import numpy as np
+
+from cadence.api.loop import LoopedBuffer
+from cadence.api.mixing import (
+    JIT_HIT_OVERHEAD,
+    MIX_MODES,
+    choose_mix_mode,
+    mix_convolve,
+    mix_events,
+    mix_track,
+    resolve_mix_backend,
+)
+from cadence.api.samples import SampleBank
+
+BACKENDS = ("thread", "process")
+
+
+def resolve_workers(workers: int | None) -> int:
+    """
+    Return the number of workers to use for a workers argument.
+
+    Args:
+        workers (int): Requested number of workers; 0 or None means one per CPU.
+
+    Returns:
+        int: The number of workers, at least 1.
+    """
+    return workers or os.cpu_count() or 1
+
+
+def make_executor(workers: int, backend: str) -> Executor:
+    """
+    Create an executor for mix_tracks(), to share between several calls.
+
+    Args:
+        workers (int): Number of workers.
+        backend (str): "thread" or "process".
+
+    Returns:
+        Executor: A ThreadPoolExecutor or ProcessPoolExecutor.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    if backend == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def _slices(n_frames: int, n_slices: int) -> list[tuple[int, int]]:
+    """Split frames [0, n_frames) into at most n_slices contiguous ranges."""
+    size = max(1, ceil(n_frames / n_slices))
+    return [(start, min(start + size, n_frames)) for start in range(0, n_frames, size)]
+
+
+def _hits_in_slice(
+    sound: np.ndarray,
+    starts: np.ndarray,
+    velocity: np.ndarray | None,
+    start: int,
+    stop: int,
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """Return the hit offsets relative to a slice and their velocities, keeping
+    only hits audible in it."""
+    audible = (starts + len(sound) > start) & (starts < stop)
+    return starts[audible] - start, None if velocity is None else velocity[audible]
+
+
+def _mix_slice(
+    out: np.ndarray,
+    start: int,
+    bank: SampleBank,
+    all_starts: list[np.ndarray],
+    all_velocities: list[np.ndarray | None],
+    mix_mode: str,
+    mix_backend: str,
+) -> np.ndarray:
+    """Mix every track into out, which holds frames [start, start + len(out))."""
+    stop = start + len(out)
+    if mix_backend == "numpy":
+        for sound, starts, velocity in zip(bank.sounds, all_starts, all_velocities):
+            hits, velocity = _hits_in_slice(sound, starts, velocity, start, stop)
+            if len(hits):
+                mix_track(out, sound, hits, mix_mode=mix_mode, velocity=velocity)
+        return out
+
+    # numba: direct hits of all tracks go through one compiled pass, with the
+    # volume applied by the kernel; dense tracks may still be convolved
+    direct = []
+    direct_offsets = []
+    samples, offsets = bank.flat_sources
+    for source, offset, volume, starts, velocity in zip(
+        bank.sources, offsets, bank.volumes, all_starts, all_velocities
+    ):
+        hits, velocity = _hits_in_slice(source, starts, velocity, start, stop)
+        if not len(hits):
+            continue
+        gain = volume if velocity is None else volume * velocity
+        track_mode = mix_mode
+        if track_mode == "auto":
+            track_mode = choose_mix_mode(
+                len(hits), len(source), len(out), hit_overhead=JIT_HIT_OVERHEAD
+            )
+        if track_mode == "convolve":
+            mix_convolve(out, source, hits, gain=gain)
+        else:
+            direct.append((source, hits, gain))
+            direct_offsets.append(offset)
+    mix_events(out, direct, samples, direct_offsets)
+    return out
+
+
+def _render_slice(
+    start: int,
+    stop: int,
+    bank: SampleBank,
+    all_starts: list[np.ndarray],
+    all_velocities: list[np.ndarray | None],
+    mix_mode: str,
+    mix_backend: str,
+) -> np.ndarray:
+    """Render frames [start, stop) into a new array (used by worker processes)."""
+    out = np.zeros((stop - start, bank.n_channels), dtype=np.float32)
+    return _mix_slice(
+        out, start, bank, all_starts, all_velocities, mix_mode, mix_backend
+    )
+
+
+def mix_tracks(
+    out: np.ndarray,
+    bank: SampleBank,
+    all_starts: list[np.ndarray],
+    all_velocities: list[np.ndarray | None] = None,
+    mix_mode: str = "auto",
+    workers: int = 1,
+    backend: str = "thread",
+    mix_backend: str = "auto",
+    executor: Executor = None,
+):
+    """
+    Mix the hits of several tracks into out, splitting the work in time slices.
+
+    The frames of out are split into one contiguous slice per worker. Each
+    slice receives every hit audible in it, including hits that start in an
+    earlier slice and ring into it, so slices are independent and need no
+    reduction step: with threads each worker mixes straight into its own view
+    of out, and with processes each worker returns its slice to be copied in.
+
+    NumPy adds, FFT convolution and the numba kernel release the GIL, so the
+    thread backend scales with cores without copying any audio; the process
+    backend pickles the sounds to every worker and is mainly useful if the
+    GIL becomes a bottleneck (e.g. patterns with very many short hits).
+
+    Args:
+        out (np.ndarray): float32 array of shape (n_frames, n_channels), modified in place.
+        bank (SampleBank): The sounds of the tracks.
+        all_starts (list[np.ndarray]): Start offsets of each track's hits in out.
+        all_velocities (list[np.ndarray]): Velocity of each track's hits, or None
+            for tracks (or a list of tracks) at full velocity. Defaults to None.
+        mix_mode (str): Mixing strategy, see mix_track(). Defaults to "auto".
+        workers (int): Number of workers; 0 or None means one per CPU. Defaults to 1
+            (mix in the current thread).
+        backend (str): "thread" or "process". Defaults to "thread".
+        mix_backend (str): "numpy", "numba", or "auto" to use numba if it is
+            installed, see mix_events(). Defaults to "auto".
+        executor (Executor): Executor of the given backend to run the workers
+            on, e.g. from make_executor(), so that several calls share one
+            pool. Defaults to None (create one for this call).
+
+    Returns: None
+    """
+    if mix_mode not in MIX_MODES:
+        raise ValueError(f"Unknown mix mode {mix_mode!r}; expected one of {MIX_MODES}")
+    mix_backend = resolve_mix_backend(mix_backend)
+    all_starts = [np.asarray(starts, dtype=np.int64) for starts in all_starts]
+    all_velocities = all_velocities or [None] * len(all_starts)
+
+    workers = resolve_workers(workers)
+    if workers == 1:
+        _mix_slice(out, 0, bank, all_starts, all_velocities, mix_mode, mix_backend)
+        return
+
+    slices = _slices(len(out), workers)
+    if backend == "thread":
+        # Build the shared arrays once, rather than racing to do it in every worker
+        bank.preload(mix_backend)
+    if executor is None:
+        pool = make_executor(workers, backend)
+    else:
+        pool = contextlib.nullcontext(executor)  # Owned by the caller
+    with pool as pool_executor:
+        if backend == "thread":
+            futures = [
+                pool_executor.submit(
+                    _mix_slice,
+                    out[start:stop],
+                    start,
+                    bank,
+                    all_starts,
+                    all_velocities,
+                    mix_mode,
+                    mix_backend,
+                )
+                for start, stop in slices
+            ]
+            for future in futures:
+                future.result()
+        else:
+            futures = {
+                (start, stop): pool_executor.submit(
+                    _render_slice,
+                    start,
+                    stop,
+                    bank,
+                    all_starts,
+                    all_velocities,
+                    mix_mode,
+                    mix_backend,
+                )
+                for start, stop in slices
+            }
+            for (start, stop), future in futures.items():
+                out[start:stop] += future.result()
+
+
+def read_loop(loop: LoopedBuffer, out: np.ndarray, workers: int = 1) -> np.ndarray:
+    """
+    Fill out with the whole output of a loop, reading slices in parallel threads.
+
+    Args:
+        loop (LoopedBuffer): The loop to read.
+        out (np.ndarray): float32 array of shape (loop.n_frames, n_channels) to fill.
+        workers (int): Number of threads; 0 or None means one per CPU. Defaults to 1.
+
+    Returns:
+        np.ndarray: out
+    """
+    workers = resolve_workers(workers)
+    if workers == 1:
+        return loop.read(0, out)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(loop.read, start, out[start:stop])
+            for start, stop in _slices(len(out), workers)
+        ]
+        for future in futures:
+            future.result()
+    return out
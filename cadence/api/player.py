@@ -0,0 +1,380 @@
+import threading
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from cadence.api.config import Config
+from cadence.api.constants import PLAYER_BLOCK_SIZE, PLAYER_LOOKAHEAD_BLOCKS
+from cadence.api.functions import render_loop
+from cadence.api.loop import LoopedBuffer
+from cadence.api.output import CallbackStop, OutputBackend, get_output_backend
+from cadence.api.track import Track
+
+
+class _Voice(NamedTuple):
+    """A loop scheduled on the player's timeline."""
+
+    loop: LoopedBuffer
+    start_frame: int  # Frame at which repeat 0 of the loop starts
+    stop_repeat: int  # Number of repeats of the loop to play
+
+    @property
+    def end_frame(self) -> int:
+        return self.start_frame + self.stop_repeat * self.loop.length + self.loop.tail
+
+
+class PlaybackPosition(NamedTuple):
+    """
+    The part of the timeline being heard.
+
+    Attributes:
+        frame (int): Frame of the timeline at the output, counted from the start.
+        pattern_frame (int): Offset of that frame in the current repeat of the
+            pattern, or None once the last repeat has ended (in its tail).
+        pattern_length (int): Length of the current pattern in frames.
+        sample_rate (int): Sample rate of the playback.
+        beat_length (int): Length of a beat of the current pattern in frames,
+            or None if unknown.
+    """
+
+    frame: int
+    pattern_frame: int | None
+    pattern_length: int
+    sample_rate: int
+    beat_length: int | None = None
+
+
+class LoopPlayer:
+    """
+    Looping playback engine that picks up edits without restarting.
+
+    Audio is produced by a callback stream of an output backend. A scheduler
+    thread mixes the loop into a ring of preallocated blocks a few blocks
+    ahead of the playhead, and the audio callback only copies the next ready
+    block into the output buffer, so it allocates no arrays.
+
+    Edits passed to update() are rendered in the background and swapped in
+    at the next pattern boundary; the tails of the previous pattern keep
+    ringing over the new one.
+
+    Args:
+        blocksize (int): Frames per audio block. Defaults to PLAYER_BLOCK_SIZE.
+        lookahead_blocks (int): Number of blocks mixed ahead of the playhead.
+            Defaults to PLAYER_LOOKAHEAD_BLOCKS.
+        backend (OutputBackend): Where the audio is played. Defaults to None
+            (the default backend, see get_output_backend()).
+
+    Attributes:
+        error (Exception): Why the latest edit could not be rendered (OSError
+            or ValueError, e.g. a missing or unreadable sound), or None if it
+            was. The pattern playing until then keeps playing.
+    """
+
+    def __init__(
+        self,
+        blocksize: int = PLAYER_BLOCK_SIZE,
+        lookahead_blocks: int = PLAYER_LOOKAHEAD_BLOCKS,
+        backend: OutputBackend = None,
+    ):
+        self.blocksize = blocksize
+        self.lookahead_blocks = lookahead_blocks
+        self.backend = backend
+
+        self._stream = None
+        self._scheduler: threading.Thread = None
+        self._on_finished: Callable = None
+
+        # Ring of mixed blocks, shared by the scheduler and the audio callback
+        self._ring: list[np.ndarray] = []
+        self._read_count = 0
+        self._write_count = 0
+        self._space = threading.Event()
+        self._ended = threading.Event()
+        self._stopping = False
+        self._done = False
+
+        # Stream time at which each block of the ring reaches the output, set
+        # by the callback before it counts the block as read. A slot is only
+        # reused lookahead_blocks blocks later, so the time of the last block
+        # read stays valid while position() reads it
+        self._output_times = np.zeros(0)
+
+        # Timeline state, only touched by the scheduler thread
+        self._voice: _Voice = None
+        # The latest few voices, replaced (not mutated) on every swap, to map
+        # the output position back to a pattern
+        self._timeline: list[_Voice] = []
+        self._outgoing: list[_Voice] = []
+        self._write_frame = 0
+        self._repeats_done = 0
+
+        # Latest edit, rendered in the background and swapped in at a boundary
+        self._pending: LoopedBuffer = None
+        self._request: tuple[list[Track], Config] = None
+        self._request_ready = threading.Condition()
+        self._renderer: threading.Thread = None
+        self.error: Exception = None
+
+    @property
+    def playing(self) -> bool:
+        """True while audio is playing."""
+        return self._stream is not None and self._stream.active
+
+    def play(
+        self,
+        tracks: list[Track],
+        config: Config | dict = Config(),
+        on_finished: Callable[[], None] | None = None,
+        loop: LoopedBuffer = None,
+    ):
+        """
+        Start playing tracks, replacing anything already playing.
+
+        Args:
+            tracks (list[Track]): List of Track objects defining the sounds and
+                their timings
+            config (Config or dict): Configuration options for playback
+            on_finished (Callable): Called from a background thread when playback
+                reaches the end. Not called when playback is stopped with stop().
+                Defaults to None.
+            loop (LoopedBuffer): The tracks already rendered with render_loop(),
+                e.g. by a Prerenderer, to start without rendering. Defaults to
+                None (render the tracks).
+
+        Returns: None
+        """
+        self.stop()
+        if loop is None:
+            loop, _ = render_loop(tracks, config)
+        if loop is None:
+            if on_finished:
+                on_finished()
+            return
+        self._start(loop, on_finished)
+
+    def position(self) -> PlaybackPosition | None:
+        """
+        Return the part of the timeline being heard.
+
+        The position is taken from the output stream's clock: the callback
+        records when each block reaches the output, and the time since then
+        is read from the stream, so it follows the audio device rather than
+        wall-clock time. It is cheap enough to poll at the display rate.
+
+        Returns:
+            PlaybackPosition or None: The position, or None if nothing is playing.
+        """
+        stream, read_count = self._stream, self._read_count
+        if stream is None or read_count == 0 or not stream.active:
+            return None
+        block = read_count - 1
+        block_frame = block * self.blocksize
+        output_time = float(self._output_times[block % self.lookahead_blocks])
+        sample_rate = int(stream.samplerate)
+        frame = block_frame + int((stream.time - output_time) * sample_rate)
+        # Never run ahead of the last block handed to the output
+        frame = max(0, min(frame, block_frame + self.blocksize))
+
+        for voice in reversed(self._timeline):
+            if voice.start_frame <= frame:
+                break
+        offset = frame - voice.start_frame
+        length = voice.loop.length
+        pattern_frame = offset % length if offset < voice.stop_repeat * length else None
+        return PlaybackPosition(
+            frame, pattern_frame, length, sample_rate, voice.loop.beat_length
+        )
+
+    def update(self, tracks: list[Track], config: Config | dict = Config()):
+        """
+        Replace the playing pattern at the next pattern boundary.
+
+        The new pattern is rendered in a background thread; only the most
+        recent update is rendered if several arrive in quick succession.
+
+        Args:
+            tracks (list[Track]): List of Track objects defining the sounds and
+                their timings
+            config (Config or dict): Configuration options for playback
+
+        Returns: None
+        """
+        if not self.playing:
+            return
+        with self._request_ready:
+            self._request = (list(tracks), config)
+            self._request_ready.notify()
+
+    def stop(self):
+        """
+        Stop playback immediately.
+
+        Returns: None
+        """
+        self._on_finished = None
+        self._stopping = True
+        self._space.set()
+        self._ended.set()
+        with self._request_ready:
+            self._request_ready.notify()
+        if self._stream is not None:
+            self._stream.abort()
+            self._stream.close()
+            self._stream = None
+        for thread in (self._scheduler, self._renderer):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join()
+        self._scheduler = self._renderer = None
+
+    def _start(self, loop: LoopedBuffer, on_finished: Callable):
+        self._ring = list(
+            np.zeros(
+                (self.lookahead_blocks, self.blocksize, loop.n_channels),
+                dtype=np.float32,
+            )
+        )
+        self._output_times = np.zeros(self.lookahead_blocks)
+        self._read_count = self._write_count = 0
+        self._stopping = self._done = False
+        self._space.clear()
+        self._ended.clear()
+        self._voice = _Voice(loop, 0, loop.repeat)
+        self._timeline = [self._voice]
+        self._outgoing = []
+        self._write_frame = 0
+        self._repeats_done = 0
+        self._pending = None
+        self._request = None
+        self._on_finished = on_finished
+
+        # Fill the ring before starting, so playback starts without an underrun
+        self._fill_ring()
+
+        backend = self.backend or get_output_backend()
+        self._stream = backend.open_stream(
+            loop.sample_rate,
+            loop.n_channels,
+            blocksize=self.blocksize,
+            callback=self._callback,
+            finished_callback=self._finished,
+        )
+        self._scheduler = threading.Thread(target=self._schedule, daemon=True)
+        self._renderer = threading.Thread(target=self._render, daemon=True)
+        self._scheduler.start()
+        self._renderer.start()
+        self._stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        # Runs on the audio thread: copy a ready block, never allocate arrays
+        if self._read_count < self._write_count:
+            slot = self._read_count % self.lookahead_blocks
+            np.copyto(outdata, self._ring[slot])
+            # Some host APIs do not report the output time; fall back to now
+            self._output_times[slot] = (
+                time_info.outputBufferDacTime or time_info.currentTime
+            )
+            self._read_count += 1
+            self._space.set()
+        elif self._done:
+            outdata.fill(0)
+            raise CallbackStop
+        else:
+            outdata.fill(0)  # Underrun: the scheduler fell behind
+            self._space.set()
+
+    def _finished(self):
+        # Runs on the audio thread when the stream stops
+        self._ended.set()
+
+    def _schedule(self):
+        while not self._stopping and not self._done:
+            self._space.clear()
+            self._fill_ring()
+            self._space.wait(timeout=0.1)
+
+        # Report the end of playback from this thread rather than the audio thread
+        self._ended.wait()
+        on_finished = self._on_finished
+        if on_finished:
+            on_finished()
+
+    def _fill_ring(self):
+        while (
+            not self._done
+            and self._write_count - self._read_count < self.lookahead_blocks
+        ):
+            block = self._ring[self._write_count % self.lookahead_blocks]
+            self._mix_block(self._write_frame, block)
+            self._write_frame += self.blocksize
+            self._write_count += 1
+            end_frame = max(
+                [self._voice.end_frame] + [v.end_frame for v in self._outgoing]
+            )
+            self._done = self._write_frame >= end_frame
+
+    def _mix_block(self, frame: int, block: np.ndarray):
+        """Mix the timeline frames [frame, frame + len(block)) into block."""
+        block[:] = 0
+        pending = self._pending
+        if pending is not None:
+            # Swap before mixing any of the pre-roll of either loop's repeat at
+            # the boundary: the old loop's must not play, the new loop's must
+            lead = max(self._voice.loop.pre_roll, pending.pre_roll)
+            boundary = self._next_boundary(frame + lead)
+            if boundary - lead < frame + len(block):
+                self._swap(boundary)
+        self._add_voices(frame, block)
+
+        # Forget loops whose tails have finished ringing
+        self._outgoing = [v for v in self._outgoing if v.end_frame > frame]
+
+    def _add_voices(self, frame: int, out: np.ndarray):
+        for voice in [self._voice, *self._outgoing]:
+            voice.loop.add(
+                frame - voice.start_frame, out, stop_repeat=voice.stop_repeat
+            )
+
+    def _next_boundary(self, frame: int) -> int:
+        """Return the first pattern boundary of the current loop at or after frame."""
+        voice = self._voice
+        offset = frame - voice.start_frame
+        repeats = -(-offset // voice.loop.length)  # Ceiling division
+        return voice.start_frame + repeats * voice.loop.length
+
+    def _swap(self, boundary: int):
+        """Replace the current loop with the pending one at a pattern boundary."""
+        voice = self._voice
+        played = (boundary - voice.start_frame) // voice.loop.length
+        played = min(played, voice.stop_repeat)
+        self._repeats_done += played
+        self._outgoing.append(voice._replace(stop_repeat=played))
+
+        loop, self._pending = self._pending, None
+        remaining = max(0, loop.repeat - self._repeats_done)
+        self._voice = _Voice(loop, boundary, remaining)
+        self._timeline = [*self._timeline[-3:], self._voice]
+
+    def _render(self):
+        while True:
+            with self._request_ready:
+                while self._request is None and not self._stopping:
+                    self._request_ready.wait()
+                if self._stopping:
+                    return
+                (tracks, config), self._request = self._request, None
+            # Render in the format of the playing stream
+            playing = self._voice.loop
+            try:
+                loop, _ = render_loop(
+                    tracks,
+                    config,
+                    sample_rate=playing.sample_rate,
+                    n_channels=playing.n_channels,
+                )
+            except (OSError, ValueError) as e:
+                self.error = e
+                continue
+            self.error = None
+            if loop is None:
+                continue
+            self._pending = loop
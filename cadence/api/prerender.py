@@ -0,0 +1,110 @@
+import threading
+import time
+
+from cadence.api.config import Config
+from cadence.api.constants import PRERENDER_DELAY
+from cadence.api.functions import render_loop
+from cadence.api.loop import LoopedBuffer
+from cadence.api.track import Track
+
+
+class Prerenderer:
+    """
+    Renders the latest version of a project in the background, ahead of playback.
+
+    Each call to request() replaces the previous request. A worker thread
+    waits until no request has arrived for `delay` seconds (so a burst of
+    edits is rendered once), then renders the latest one with render_loop().
+    Requests replaced before their render starts are never rendered, and a
+    render overtaken by a newer request is discarded when it finishes; its
+    track stems stay in the stem cache, so the newer render reuses them.
+
+    Args:
+        delay (float): Seconds without requests before rendering. Defaults to
+            PRERENDER_DELAY.
+
+    Attributes:
+        error (Exception): Why the latest render failed (OSError or
+            ValueError, e.g. a missing or unreadable sound), or None if it
+            succeeded.
+    """
+
+    def __init__(self, delay: float = PRERENDER_DELAY):
+        self.delay = delay
+        self._condition = threading.Condition()
+        self._generation = 0  # Incremented by every request
+        self._request: tuple[int, list[Track], Config] = None
+        self._deadline = 0.0
+        self._ready: tuple[list[Track], Config, LoopedBuffer] = None
+        self._thread: threading.Thread = None
+        self.error: Exception = None
+
+    def request(self, tracks: list[Track], config: Config | dict = Config()):
+        """
+        Schedule a background render of tracks, replacing any earlier request.
+
+        Args:
+            tracks (list[Track]): List of Track objects defining the sounds and
+                their timings
+            config (Config or dict): Configuration options for playback
+
+        Returns: None
+        """
+        if isinstance(config, dict):
+            config = Config(**config)
+        with self._condition:
+            self._generation += 1
+            self._request = (self._generation, list(tracks), config)
+            self._deadline = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def get(
+        self, tracks: list[Track], config: Config | dict = Config()
+    ) -> LoopedBuffer | None:
+        """
+        Return the prepared render of tracks, if it is ready.
+
+        Args:
+            tracks (list[Track]): List of Track objects defining the sounds and
+                their timings
+            config (Config or dict): Configuration options for playback
+
+        Returns:
+            LoopedBuffer or None: The rendered loop, or None if the latest
+            finished render is not of these tracks and config.
+        """
+        if isinstance(config, dict):
+            config = Config(**config)
+        with self._condition:
+            ready = self._ready
+        if ready is None:
+            return None
+        ready_tracks, ready_config, loop = ready
+        if ready_config != config or ready_tracks != list(tracks):
+            return None
+        return loop
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._request is None:
+                    self._condition.wait()
+                # Debounce: wait until requests stop arriving
+                while (remaining := self._deadline - time.monotonic()) > 0:
+                    self._condition.wait(remaining)
+                (generation, tracks, config), self._request = self._request, None
+
+            try:
+                loop, _ = render_loop(tracks, config)
+            except (OSError, ValueError) as e:
+                self.error = e
+                continue
+            self.error = None
+
+            with self._condition:
+                # Keep the render only if no newer request arrived meanwhile
+                if generation == self._generation:
+                    self._ready = (tracks, config, loop)
@@ -0,0 +1,299 @@
+import os
+import struct
+import threading
+from functools import cached_property
+from math import gcd
+from pathlib import Path
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from cadence.api.cache import content_key, file_digest, file_key, sample_cache
+from cadence.api.mixing import concatenate_sounds
+from cadence.api.store import project_cache_path, sample_digest
+from cadence.api.track import Track
+from cadence.api.utils import read_wav
+
+
+def to_float32(data: np.ndarray) -> np.ndarray:
+    """
+    Convert decoded WAV data to float32 in the range [-1.0, 1.0].
+
+    Args:
+        data (np.ndarray): Audio data as returned by read_wav().
+
+    Returns:
+        np.ndarray: float32 audio data with the same shape.
+    """
+    converted = data.astype(np.float32)
+    if data.dtype == np.uint8:
+        # 8-bit WAV data is unsigned, centered on 128
+        converted -= 128
+        converted /= 128
+    elif np.issubdtype(data.dtype, np.integer):
+        converted /= 2 ** (8 * data.dtype.itemsize - 1)
+    return converted
+
+
+def read_float32(file_path: str | Path) -> tuple[int, np.ndarray]:
+    """
+    Read a WAV file as float32 frames of shape (n_frames, n_channels).
+
+    The converted data is kept in the process-wide sample cache, keyed by the
+    file contents, so each sample is converted once. The returned array is read-only.
+
+    Args:
+        file_path (str or Path): The path to the WAV file.
+
+    Returns:
+        tuple[int, np.ndarray]: The sample rate and the float32 audio data.
+    """
+
+    def _load():
+        sample_rate, data = read_wav(file_path)
+        data = to_float32(data)
+        if data.ndim == 1:
+            data = data[:, np.newaxis]
+        return sample_rate, data
+
+    return sample_cache.get(content_key(file_digest(file_path), "float32"), _load)
+
+
+def conform(
+    data: np.ndarray, sample_rate: int, target_rate: int, n_channels: int
+) -> np.ndarray:
+    """
+    Resample float32 audio to target_rate and match its number of channels.
+
+    Resampling uses a polyphase filter; mono audio is upmixed by copying it to
+    every channel.
+
+    Args:
+        data (np.ndarray): float32 audio of shape (n_frames, n_source_channels).
+        sample_rate (int): Sample rate of data.
+        target_rate (int): Sample rate to convert to.
+        n_channels (int): Number of channels to convert to.
+
+    Returns:
+        np.ndarray: float32 audio of shape (n_target_frames, n_channels).
+    """
+    if data.shape[1] != n_channels:
+        if data.shape[1] != 1:
+            raise ValueError(
+                f"Cannot convert {data.shape[1]} channels to {n_channels}; only mono sounds can be upmixed"
+            )
+        data = np.repeat(data, n_channels, axis=1)
+
+    if sample_rate != target_rate:
+        divisor = gcd(sample_rate, target_rate)
+        data = resample_poly(
+            data, target_rate // divisor, sample_rate // divisor, axis=0
+        ).astype(np.float32, copy=False)
+    return data
+
+
+def read_conformed(
+    file_path: str | Path, target_rate: int, n_channels: int
+) -> np.ndarray:
+    """
+    Read a WAV file as float32 audio at target_rate with n_channels channels.
+
+    Converted audio is kept in the process-wide sample cache, keyed by the file
+    contents and the target format, so each conversion is done once.
+    For sounds stored in a project with a cache directory, the converted audio
+    is also saved there as a .npy file (see project_cache_path()) and
+    memory-mapped on later runs, without decoding the WAV file again.
+    The returned array is read-only.
+
+    Args:
+        file_path (str or Path): The path to the WAV file.
+        target_rate (int): Sample rate to convert to.
+        n_channels (int): Number of channels to convert to.
+
+    Returns:
+        np.ndarray: float32 audio of shape (n_frames, n_channels).
+    """
+    npy_path = project_cache_path(file_path, target_rate, n_channels)
+    if npy_path is None and read_format(file_path) == (target_rate, n_channels):
+        return read_float32(file_path)[1]
+
+    def _load():
+        if npy_path is not None:
+            try:
+                return np.load(npy_path, mmap_mode="r")
+            except (OSError, ValueError):
+                pass  # Missing or damaged: convert again
+
+        sample_rate, data = read_float32(file_path)
+        data = conform(data, sample_rate, target_rate, n_channels)
+        if npy_path is not None and _save_npy(npy_path, data):
+            # Serve the file-backed copy, which the OS can page out
+            return np.load(npy_path, mmap_mode="r")
+        return data
+
+    key = content_key(sample_digest(file_path), "conformed", target_rate, n_channels)
+    data = sample_cache.get(key, _load)
+    if npy_path is not None and not npy_path.exists():
+        # Converted earlier from a copy of the file outside the project
+        _save_npy(npy_path, data)
+    return data
+
+
+def _save_npy(npy_path: Path, data: np.ndarray) -> bool:
+    """Write data to npy_path atomically. Return False if it cannot be written."""
+    # np.save() adds the .npy suffix itself
+    tmp_name = f".{npy_path.stem}.{os.getpid()}.{threading.get_ident()}"
+    tmp_path = npy_path.with_name(tmp_name + ".npy")
+    try:
+        np.save(npy_path.with_name(tmp_name), data, allow_pickle=False)
+        os.replace(tmp_path, npy_path)
+        return True
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        return False
+
+
+def read_format(file_path: str | Path) -> tuple[int, int]:
+    """
+    Return the sample rate and number of channels of a WAV file.
+
+    Only the header is read, and the result is cached per file_key().
+
+    Args:
+        file_path (str or Path): The path to the WAV file.
+
+    Returns:
+        tuple[int, int]: The sample rate and the number of channels.
+    """
+
+    def _read():
+        with open(file_path, "rb") as f:
+            riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+            if riff not in (b"RIFF", b"RIFX") or wave != b"WAVE":
+                raise ValueError(f"Not a WAV file: {file_path}")
+            endian = "<" if riff == b"RIFF" else ">"
+            while header := f.read(8):
+                chunk_id, size = struct.unpack(endian + "4sI", header)
+                if chunk_id == b"fmt ":
+                    _, n_channels, sample_rate = struct.unpack(
+                        endian + "HHI", f.read(8)
+                    )
+                    return sample_rate, n_channels
+                f.seek(size + size % 2, os.SEEK_CUR)
+        raise ValueError(f"WAV file has no fmt chunk: {file_path}")
+
+    return sample_cache.get(file_key(file_path) + ("format",), _read)
+
+
+class SampleBank:
+    """
+    The sounds of a list of tracks, ready to be mixed.
+
+    Each sound in `sounds` is float32 with shape (n_frames, n_channels) and has
+    its track's volume already applied, so mixing a hit is a single in-place add.
+    Tracks with the same path and volume share one array. The scaled sounds
+    are only created when first used; mixers that apply the volume themselves
+    can use `sources` and `volumes` instead.
+
+    Sounds are conformed to a common format: by default the highest sample
+    rate among them, in stereo if any of them is stereo.
+
+    Args:
+        tracks (list[Track]): The tracks to load the sounds of.
+        sample_rate (int): Sample rate to convert all sounds to. Defaults to None
+            (the highest sample rate of the sounds).
+        n_channels (int): Number of channels to convert all sounds to. Defaults
+            to None (the highest number of channels of the sounds).
+
+    Attributes:
+        sample_rate (int): Sample rate shared by all sounds.
+        n_channels (int): Number of channels shared by all sounds.
+        sources (list[np.ndarray]): One read-only sound per track, in track order,
+            without the track volume applied.
+        volumes (list[float]): The volume of each track, in track order.
+    """
+
+    def __init__(
+        self, tracks: list[Track], sample_rate: int = None, n_channels: int = None
+    ):
+        formats = [read_format(track.path) for track in tracks]
+        self.sample_rate: int = sample_rate or max(rate for rate, _ in formats)
+        self.n_channels: int = n_channels or max(channels for _, channels in formats)
+
+        self.sources: list[np.ndarray] = [
+            read_conformed(track.path, self.sample_rate, self.n_channels)
+            for track in tracks
+        ]
+        self.volumes: list[float] = [track.volume for track in tracks]
+        # Bank this one was selected from, and the indices of its tracks there
+        self._parent: SampleBank = None
+        self._indices: list[int] = None
+
+    def select(self, indices: list[int]) -> "SampleBank":
+        """
+        Return a bank of some of the tracks, sharing their sounds.
+
+        Args:
+            indices (list[int]): Indices of the tracks to keep, in order.
+
+        Returns:
+            SampleBank: The bank of the selected tracks.
+        """
+        bank = object.__new__(SampleBank)
+        bank.sample_rate = self.sample_rate
+        bank.n_channels = self.n_channels
+        bank.sources = [self.sources[i] for i in indices]
+        bank.volumes = [self.volumes[i] for i in indices]
+        bank._parent, bank._indices = self, list(indices)
+        if "sounds" in self.__dict__:
+            bank.sounds = [self.sounds[i] for i in indices]
+        return bank
+
+    def preload(self, mix_backend: str = "numpy"):
+        """
+        Build the arrays a mix backend reads from this bank, if not done yet.
+
+        Args:
+            mix_backend (str): "numpy" (sounds) or "numba" (flat_sources).
+                Defaults to "numpy".
+
+        Returns: None
+        """
+        if mix_backend == "numpy":
+            _ = self.sounds
+        else:
+            _ = self.flat_sources
+
+    def __getstate__(self) -> dict:
+        # Sent to worker processes without the bank it was selected from
+        state = dict(self.__dict__)
+        state.pop("flat_sources", None)
+        state["_parent"] = state["_indices"] = None
+        return state
+
+    @cached_property
+    def flat_sources(self) -> tuple[np.ndarray, list[int]]:
+        """
+        The sources concatenated into one array for mix_events(), and the
+        frame offset of each track's source in it.
+
+        The array is built once per bank; banks made by select() share the
+        array of the bank they were selected from.
+        """
+        if self._parent is not None:
+            samples, offsets = self._parent.flat_sources
+            return samples, [offsets[i] for i in self._indices]
+        return concatenate_sounds(self.sources)
+
+    @cached_property
+    def sounds(self) -> list[np.ndarray]:
+        """One sound per track, in track order, with the track volume applied."""
+        scaled = {}
+        sounds = []
+        for data, volume in zip(self.sources, self.volumes):
+            # Sources of the same file are the same cached array
+            key = (id(data), volume)
+            if key not in scaled:
+                scaled[key] = data if volume == 1.0 else data * np.float32(volume)
+            sounds.append(scaled[key])
+        return sounds
@@ -0,0 +1,218 @@
+from typing import Iterator, NamedTuple
+
+import numpy as np
+
+from cadence.api.loop import LoopedBuffer
+from cadence.api.track import Track
+
+
+class _PatternFields(NamedTuple):
+    tracks: list[Track] = None
+    measures: int = None
+
+
+class Pattern(_PatternFields):
+    """
+    A named section of a song, such as a verse, chorus or fill.
+
+    Attributes:
+        tracks (list[Track]): The tracks of the pattern. Defaults to no tracks.
+        measures (int): Length of the pattern in measures. Defaults to None
+            (long enough for the last hit, see Config.measures).
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, tracks: list[Track] | None = None, measures: int | None = None):
+        # A new list for each pattern, rather than a default shared by all
+        return super().__new__(cls, [] if tracks is None else tracks, measures)
+
+    @classmethod
+    def _make(cls, iterable):
+        # Used by _replace(); go through __new__ so defaults are filled in
+        return cls(*iterable)
+
+
+class _ArrangementFields(NamedTuple):
+    patterns: dict[str, Pattern] = None
+    order: list[str] = None
+
+
+class Arrangement(_ArrangementFields):
+    """
+    A song built from named patterns played in order.
+
+    Attributes:
+        patterns (dict[str, Pattern]): The patterns of the song, by name.
+            Defaults to no patterns.
+        order (list[str]): Names of the patterns in the order they are played;
+            a pattern can appear any number of times. Defaults to an empty song.
+    """
+
+    __slots__ = ()
+
+    def __new__(
+        cls, patterns: dict[str, Pattern] | None = None, order: list[str] | None = None
+    ):
+        # A new dict and list for each arrangement, rather than shared defaults
+        return super().__new__(
+            cls,
+            {} if patterns is None else patterns,
+            [] if order is None else order,
+        )
+
+    @classmethod
+    def _make(cls, iterable):
+        # Used by _replace(); go through __new__ so defaults are filled in
+        return cls(*iterable)
+
+    def validate(self):
+        """
+        Check that every pattern in the order exists.
+
+        Returns: None
+        """
+        missing = sorted(set(self.order) - set(self.patterns))
+        if missing:
+            raise ValueError(f"Song order uses undefined patterns: {missing}")
+
+
+class SongBuffer:
+    """
+    A song assembled from rendered patterns.
+
+    Each distinct pattern is rendered once (as a LoopedBuffer with one repeat),
+    and output frames are computed on demand by overlap-adding the pattern
+    renders at their positions in the song, so pre-rolls and tails ring across
+    pattern boundaries.
+
+    Args:
+        segments (list[tuple[int, LoopedBuffer]]): (start frame, rendered
+            pattern) for each pattern in the song, in order.
+        sample_rate (int): Sample rate of the audio.
+
+    Attributes:
+        segments (list[tuple[int, LoopedBuffer]]): The patterns and their start frames.
+        sample_rate (int): Sample rate of the audio.
+        gain (float): Gain applied to the output by normalize(), 1.0 before.
+    """
+
+    def __init__(self, segments: list[tuple[int, LoopedBuffer]], sample_rate: int):
+        self.segments = segments
+        self.sample_rate = sample_rate
+        self.gain = 1.0
+
+    @property
+    def n_channels(self) -> int:
+        """Number of audio channels."""
+        return self.segments[0][1].n_channels
+
+    @property
+    def n_frames(self) -> int:
+        """Total number of output frames, including the final tail."""
+        return max(offset + loop.n_frames for offset, loop in self.segments)
+
+    def _overlapping(self, start: int, stop: int) -> list[tuple[int, LoopedBuffer]]:
+        """Return the segments whose audio overlaps frames [start, stop)."""
+        return [
+            (offset, loop)
+            for offset, loop in self.segments
+            if offset - loop.pre_roll < stop and offset + loop.n_frames > start
+        ]
+
+    def read(self, start: int, out: np.ndarray) -> np.ndarray:
+        """
+        Fill out with the output frames starting at frame `start`.
+
+        Args:
+            start (int): Index of the first output frame to read.
+            out (np.ndarray): float32 array of shape (n_frames, n_channels) to fill.
+
+        Returns:
+            np.ndarray: out
+        """
+        out[:] = 0
+        # Nothing plays before the start of the song
+        skip = min(max(0, -start), len(out))
+        for offset, loop in self._overlapping(start + skip, start + len(out)):
+            loop.add(start + skip - offset, out[skip:])
+        if self.gain != 1.0:
+            out *= np.float32(self.gain)
+        return out
+
+    def blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        """
+        Yield the whole output in blocks of block_size frames.
+
+        Args:
+            block_size (int): Number of frames per block. The last block may be shorter.
+
+        Yields:
+            np.ndarray: float32 blocks of shape (n_frames, n_channels).
+        """
+        n_frames = self.n_frames
+        for start in range(0, n_frames, block_size):
+            out = np.empty(
+                (min(block_size, n_frames - start), self.n_channels), dtype=np.float32
+            )
+            yield self.read(start, out)
+
+    def to_array(self) -> np.ndarray:
+        """
+        Return the whole output as a single array.
+
+        Returns:
+            np.ndarray: float32 array of shape (n_frames, n_channels).
+        """
+        out = np.empty((self.n_frames, self.n_channels), dtype=np.float32)
+        return self.read(0, out)
+
+    def peak(self) -> float:
+        """
+        Return the maximum absolute amplitude of the output.
+
+        The output over a segment only depends on which patterns overlap it
+        and where, so segments with the same neighbourhood (e.g. the middle
+        verses of a run of verses) are only read once.
+
+        Returns:
+            float: The peak amplitude.
+        """
+        peak = 0.0
+        seen = set()
+        ends = [offset + loop.length for offset, loop in self.segments]
+        windows = [(offset, end) for (offset, _), end in zip(self.segments, ends)] + [
+            (max(ends), self.n_frames)
+        ]
+        for start, stop in windows:
+            if stop <= start:
+                continue
+            neighbourhood = (
+                stop - start,
+                tuple(
+                    (id(loop), offset - start)
+                    for offset, loop in self._overlapping(start, stop)
+                ),
+            )
+            if neighbourhood in seen:
+                continue
+            seen.add(neighbourhood)
+            window = self.read(
+                start, np.empty((stop - start, self.n_channels), np.float32)
+            )
+            peak = max(peak, float(np.max(np.abs(window))))
+        return peak
+
+    def normalize(self, level: float):
+        """
+        Set the output gain so that the output peaks at `level`.
+
+        Args:
+            level (float): Target peak amplitude.
+
+        Returns: None
+        """
+        self.gain = 1.0
+        peak = self.peak()
+        if peak != 0:
+            self.gain = level / peak
@@ -0,0 +1,184 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Hashable, NamedTuple
+
+import numpy as np
+
+from cadence.api.cache import SampleCache
+from cadence.api.constants import STEM_CACHE_MAX_BYTES, STEM_LINEAGES_MAX
+from cadence.api.parallel import mix_tracks
+from cadence.api.samples import SampleBank
+
+# Above this fraction of changed hits, a stem is rendered again from scratch
+# rather than patched
+STEM_PATCH_MAX_CHANGED = 0.5
+
+
+class Stem(NamedTuple):
+    """
+    The rendered hits of a single track, before the tracks are summed.
+
+    Attributes:
+        offset (int): Frame of the pattern at which data starts (negative if
+            the first hit starts before the pattern).
+        data (np.ndarray): Read-only float32 audio of shape (n_frames, n_channels),
+            from the start of the first hit to the end of the last one.
+        starts (np.ndarray): Start frame of each hit, relative to the pattern.
+        velocity (np.ndarray): Velocity of each hit, or None if all are at
+            full velocity.
+    """
+
+    offset: int
+    data: np.ndarray
+    starts: np.ndarray
+    velocity: np.ndarray | None
+
+
+# Process-wide cache of rendered stems, keyed by everything that determines
+# them; see render_stem()
+stem_cache = SampleCache(STEM_CACHE_MAX_BYTES)
+
+# Latest stem key of each lineage (a key without the track's timing), used
+# to find a stem to patch when only the timing of a track changes; the least
+# recently rendered lineages are forgotten past STEM_LINEAGES_MAX
+_latest_keys: OrderedDict[Hashable, Hashable] = OrderedDict()
+_latest_keys_lock = threading.Lock()
+
+
+def _latest_key(lineage: Hashable) -> Hashable | None:
+    with _latest_keys_lock:
+        return _latest_keys.get(lineage)
+
+
+def _set_latest_key(lineage: Hashable, key: Hashable):
+    with _latest_keys_lock:
+        _latest_keys[lineage] = key
+        _latest_keys.move_to_end(lineage)
+        while len(_latest_keys) > STEM_LINEAGES_MAX:
+            _latest_keys.popitem(last=False)
+
+
+def _hit_keys(starts: np.ndarray, velocity: np.ndarray | None) -> np.ndarray:
+    keys = np.empty(len(starts), dtype=[("start", np.int64), ("velocity", np.float32)])
+    keys["start"] = starts
+    keys["velocity"] = 1.0 if velocity is None else velocity
+    return keys
+
+
+def _changed_starts(
+    previous: Stem, starts: np.ndarray, velocity: np.ndarray | None
+) -> np.ndarray | None:
+    """
+    Return the sorted starts of the hits added, removed or changed since a
+    previous stem, or None if they cannot be told apart (repeated hits).
+    """
+    old_keys = _hit_keys(previous.starts, previous.velocity)
+    new_keys = _hit_keys(starts, velocity)
+    if len(np.unique(old_keys)) < len(old_keys) or len(np.unique(new_keys)) < len(
+        new_keys
+    ):
+        return None
+    return np.unique(np.setxor1d(old_keys, new_keys)["start"])
+
+
+def _dirty_regions(changed: np.ndarray, length: int) -> list[tuple[int, int]]:
+    """Merge the frames reached by hits starting at changed into ranges."""
+    if not len(changed):
+        return []
+    breaks = np.flatnonzero(np.diff(changed) >= length) + 1
+    firsts = changed[np.concatenate(([0], breaks))]
+    lasts = changed[np.concatenate((breaks - 1, [len(changed) - 1]))]
+    return [(int(a), int(b) + length) for a, b in zip(firsts, lasts)]
+
+
+def render_stem(
+    bank: SampleBank,
+    track_index: int,
+    starts: np.ndarray,
+    velocity: np.ndarray | None,
+    key: Hashable,
+    lineage: Hashable,
+    mix_mode: str = "auto",
+    workers: int = 1,
+    backend: str = "thread",
+    mix_backend: str = "auto",
+    executor: Executor | None = None,
+) -> Stem:
+    """
+    Return the stem of a track, from the stem cache if possible.
+
+    On a miss, the latest stem of the same lineage (the same sound, volume
+    and format, with different hits) is patched if there is one: only the
+    frames reached by hits that were added, removed or changed are mixed
+    again, so editing a few hits of a long track costs a few hits. Patches
+    are mixed in the calling thread; only full renders use the workers.
+
+    Args:
+        bank (SampleBank): The sounds of the tracks.
+        track_index (int): Index of the track in bank.
+        starts (np.ndarray): Start frame of each hit, relative to the pattern.
+        velocity (np.ndarray): Velocity of each hit, or None.
+        key (Hashable): Identifies the stem: the track's sound, volume and
+            hits, and the format and tempo they are rendered at.
+        lineage (Hashable): The same as key, without the hits.
+        mix_mode (str): Mixing strategy, see mix_tracks(). Defaults to "auto".
+        workers (int): Number of workers, see mix_tracks(). Defaults to 1.
+        backend (str): "thread" or "process". Defaults to "thread".
+        mix_backend (str): "numpy", "numba" or "auto", see mix_tracks().
+            Defaults to "auto".
+        executor (Executor): Executor shared by the stems of a render, see
+            mix_tracks(). Defaults to None.
+
+    Returns:
+        Stem: The rendered stem.
+    """
+    track_bank = bank.select([track_index])
+    length = len(track_bank.sources[0])
+
+    def _render() -> Stem:
+        offset = int(starts[0]) if len(starts) else 0
+        n_frames = int(starts[-1]) + length - offset if len(starts) else 0
+        data = np.zeros((n_frames, bank.n_channels), dtype=np.float32)
+        regions = [(offset, offset + n_frames)]
+        region_workers = workers
+
+        previous_key = _latest_key(lineage)
+        previous = stem_cache.peek(previous_key) if previous_key else None
+        if previous is not None and len(starts):
+            changed = _changed_starts(previous, starts, velocity)
+            if changed is not None and len(changed) <= STEM_PATCH_MAX_CHANGED * len(
+                starts
+            ):
+                # Reuse the previous render outside the frames reached by changed hits
+                lo = max(offset, previous.offset)
+                hi = min(offset + n_frames, previous.offset + len(previous.data))
+                if lo < hi:
+                    data[lo - offset : hi - offset] = previous.data[
+                        lo - previous.offset : hi - previous.offset
+                    ]
+                regions = _dirty_regions(changed, length)
+                region_workers = 1
+
+        for start, stop in regions:
+            start, stop = max(start, offset), min(stop, offset + n_frames)
+            if start >= stop:
+                continue
+            region = data[start - offset : stop - offset]
+            region[:] = 0
+            mix_tracks(
+                region,
+                track_bank,
+                [starts - start],
+                [velocity],
+                mix_mode=mix_mode,
+                workers=region_workers,
+                backend=backend,
+                mix_backend=mix_backend,
+                executor=executor,
+            )
+        return Stem(offset, data, starts, velocity)
+
+    stem = stem_cache.get(key, _render)
+    _set_latest_key(lineage, key)
+    return stem
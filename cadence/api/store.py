@@ -0,0 +1,263 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+from cadence.api.cache import DIGEST_SIZE, file_digest, file_key, sample_cache
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; reflinks are skipped there
+    fcntl = None
+
+# Directory of a project holding its converted samples
+PROJECT_CACHE_DIR = "cache"
+
+# Suffixes of the samples stored in a project's sounds/ directory
+SAMPLE_SUFFIXES = (".wav",)
+
+# ioctl request to clone a file's extents on copy-on-write filesystems (Linux)
+FICLONE = 0x40049409
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """Try to make dst a copy-on-write clone of src. Return True on success."""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        return True
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+
+
+def copy_file(src: str | Path, dst: str | Path, link: bool = False):
+    """
+    Copy a file without reading it into memory.
+
+    A copy-on-write clone (reflink) is used when the filesystem supports it,
+    and the file is copied in chunks otherwise. The copy is written to a
+    temporary file and renamed, so dst is never left half-written.
+
+    Args:
+        src (str or Path): The file to copy.
+        dst (str or Path): The destination path.
+        link (bool): If True, hardlink dst to src when possible instead of
+            copying. The two paths then share their contents, so later edits
+            to src also change dst. Defaults to False.
+
+    Returns: None
+    """
+    src, dst = Path(src), Path(dst)
+    tmp_path = dst.with_name(f".{dst.name}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        if link:
+            try:
+                os.link(src, tmp_path)
+                os.replace(tmp_path, dst)
+                return
+            except OSError:
+                pass
+        if not _reflink(src, tmp_path):
+            # copyfile streams in chunks, using copy_file_range/sendfile if available
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def sample_filename(file_path: str | Path) -> str:
+    """
+    Return the content-addressed file name of a sample: its digest and suffix.
+
+    Args:
+        file_path (str or Path): The path to the sample.
+
+    Returns:
+        str: The file name, e.g. "3f9a...c1.wav".
+    """
+    return file_digest(file_path) + Path(file_path).suffix.lower()
+
+
+def _is_digest(name: str) -> bool:
+    return len(name) == 2 * DIGEST_SIZE and all(c in "0123456789abcdef" for c in name)
+
+
+def _is_stored(sounds_path: Path, file_path: Path) -> bool:
+    """Return True if file_path is a content-addressed sample in sounds_path."""
+    return (
+        file_path.parent.resolve() == sounds_path.resolve()
+        and _is_digest(file_path.stem)
+        and file_path.exists()
+        and sample_digest(file_path) == file_path.stem
+    )
+
+
+def _stat_record_path(file_path: Path) -> Path | None:
+    """Return where a project records the stat of a stored sample, if it can."""
+    cache_path = file_path.parent.parent / PROJECT_CACHE_DIR
+    if (
+        file_path.parent.name != "sounds"
+        or not _is_digest(file_path.stem)
+        or not cache_path.is_dir()
+    ):
+        return None
+    return cache_path / f"{file_path.stem}.stat"
+
+
+def _read_stat_record(record_path: Path) -> list[int] | None:
+    try:
+        return json.loads(record_path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_stat_record(record_path: Path, stat: list[int]):
+    if not record_path.exists():
+        # Converted samples written before the name was verified can't be trusted
+        for npy_path in record_path.parent.glob(f"{record_path.stem}-*.npy"):
+            npy_path.unlink(missing_ok=True)
+    tmp_path = record_path.with_name(f".{record_path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_text(json.dumps(stat))
+        os.replace(tmp_path, record_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
+def sample_digest(file_path: str | Path) -> str:
+    """
+    Return the content digest of a sample.
+
+    Samples stored in a project's sounds/ directory are named by their digest,
+    but the name alone is not trusted: a hardlinked sample changes whenever
+    its source is edited. The project's cache/ directory records the stat
+    (mtime, size and inode) of each stored sample whose contents were hashed
+    and found to match its name; the name is used without hashing only while
+    the file still has that stat. The result is cached per file_key().
+
+    Args:
+        file_path (str or Path): The path to the sample.
+
+    Returns:
+        str: Hex digest of the sample contents, as returned by file_digest().
+    """
+    file_path = Path(file_path)
+    if file_path.parent.name != "sounds" or not _is_digest(file_path.stem):
+        return file_digest(file_path)
+
+    def _digest():
+        stat = file_path.stat()
+        stat = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+        record_path = _stat_record_path(file_path)
+        if record_path is not None and _read_stat_record(record_path) == stat:
+            return file_path.stem
+        digest = file_digest(file_path)
+        if digest == file_path.stem and record_path is not None:
+            _write_stat_record(record_path, stat)
+        return digest
+
+    digest = sample_cache.get(file_key(file_path) + ("sample_digest",), _digest)
+    sample_cache.add_digest(file_path, digest)
+    return digest
+
+
+def project_cache_path(
+    file_path: str | Path, sample_rate: int, n_channels: int
+) -> Path | None:
+    """
+    Return where a project keeps a sample converted to a given format.
+
+    Projects saved with a cache/ directory (see save_project()) keep float32
+    copies of their sounds there, converted to the format they are played in,
+    as .npy files that can be memory-mapped.
+
+    Args:
+        file_path (str or Path): The path to a sample.
+        sample_rate (int): Sample rate of the converted sample.
+        n_channels (int): Number of channels of the converted sample.
+
+    Returns:
+        Path or None: The path of the .npy file, or None if the sample is not
+        stored in a project with a cache directory, or its contents no longer
+        match its name.
+    """
+    file_path = Path(file_path)
+    record_path = _stat_record_path(file_path)
+    if record_path is None or sample_digest(file_path) != file_path.stem:
+        return None
+    return record_path.with_name(f"{file_path.stem}-{sample_rate}-{n_channels}.npy")
+
+
+def remove_orphan_cache_files(cache_path: Path, digests: set[str]):
+    """
+    Remove converted samples and stat records whose digest is not in digests
+    from a project cache.
+
+    Args:
+        cache_path (Path): The project's cache directory.
+        digests (set[str]): Digests of the samples used by the project.
+
+    Returns: None
+    """
+    for path in [*cache_path.glob("*.npy"), *cache_path.glob("*.stat")]:
+        # Temporary files start with "." and are never digest-shaped
+        digest = path.stem.split("-")[0]
+        if _is_digest(digest) and digest not in digests and path.is_file():
+            path.unlink(missing_ok=True)
+
+
+def remove_orphan_samples(sounds_path: Path, names: set[str]):
+    """
+    Remove stored samples whose file name is not in names from a sounds directory.
+
+    Only files this module stores are removed: regular files named by a
+    digest with a sample suffix. Other files, directories and the temporary
+    files of a copy in progress are left alone.
+
+    Args:
+        sounds_path (Path): The project's sounds directory.
+        names (set[str]): File names of the samples used by the project.
+
+    Returns: None
+    """
+    for path in sounds_path.iterdir():
+        if (
+            path.name not in names
+            and _is_digest(path.stem)
+            and path.suffix in SAMPLE_SUFFIXES
+            and path.is_file()
+            and not path.is_symlink()
+        ):
+            path.unlink(missing_ok=True)
+
+
+def store_sample(sounds_path: Path, file_path: str | Path, link: bool = False) -> Path:
+    """
+    Store a sample in a content-addressed directory.
+
+    The sample is stored under sample_filename(), so identical samples are
+    stored once and different samples with the same name never collide.
+    Nothing is copied if the sample is already stored, unless the stored file
+    no longer matches its name (e.g. a hardlinked source was edited in place).
+
+    Args:
+        sounds_path (Path): The directory to store the sample in.
+        file_path (str or Path): The path to the sample.
+        link (bool): If True, hardlink instead of copying when possible,
+            see copy_file(). Defaults to False.
+
+    Returns:
+        Path: The path of the stored sample.
+    """
+    file_path = Path(file_path)
+    if _is_stored(sounds_path, file_path):
+        # Already stored here under its digest; no need to hash it again
+        return file_path
+    stored_path = sounds_path / sample_filename(file_path)
+    if not stored_path.exists() or sample_digest(stored_path) != stored_path.stem:
+        copy_file(file_path, stored_path, link=link)
+    return stored_path
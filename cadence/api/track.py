@@ -1,20 +1,45 @@
-from typing import NamedTuple
+from typing import Iterable, NamedTuple
 
+from cadence.api.events import EventTable
 
-class Track(NamedTuple):
+
+class _TrackFields(NamedTuple):
+    name: str = None
+    path: str = None
+    timing: EventTable = EventTable()
+    attack: float = 0.0
+    volume: float = 1.0
+
+
+class Track(_TrackFields):
     """
     Represents a track with audio file information and timing data.
 
     Attributes:
         name (str): Name of the sound. Defaults to None.
         path (str): File path to .wav file. Defaults to None.
-        timing (list[int]): List of timings in 1/12ths of a beat. Defaults to [].
+        timing (EventTable): Timings in 1/12ths of a beat, with optional per-hit
+            velocities. A list of ints (or the JSON form of an EventTable) is
+            converted to an EventTable. Defaults to no hits.
         attack (float): Attack time in seconds. Defaults to 0.0.
         volume (float): Relative volume (0.0 to 1.0). Defaults to 1.0.
     """
 
-    name: str = None
-    path: str = None
-    timing: list[int] = []
-    attack: float = 0.0
-    volume: float = 1.0
+    __slots__ = ()
+
+    def __new__(
+        cls,
+        name: str = None,
+        path: str = None,
+        timing: EventTable | Iterable[int] | dict = (),
+        attack: float = 0.0,
+        volume: float = 1.0,
+    ):
+        return super().__new__(
+            cls, name, path, EventTable.coerce(timing), attack, volume
+        )
+
+    @classmethod
+    def _make(cls, iterable):
+        # Used by _replace(); go through __new__ so timing is converted
+        return cls(*iterable)
@@ -3,6 +3,7 @@ import warnings
 
 import scipy.io.wavfile as wav
 
+from cadence.api.cache import content_key, file_digest, sample_cache
 from cadence.api.track import Track
 
 
@@ -10,14 +11,22 @@ def read_wav(file_path: str | Path):
     """
     Reads a WAV file and returns the sample rate and audio data.
 
+    Decoded files are kept in the process-wide sample cache, keyed by content,
+    so a file is only decoded again after it changes on disk, and identical
+    files at different paths are decoded once. The returned array is read-only.
+
     Args:
         file_path (str | Path): The path to the WAV file.
 
     Returns:
         tuple[int, np.ndarray]: A tuple containing the sample rate (int) and audio data (numpy array).
     """
-    with warnings.catch_warnings(category=wav.WavFileWarning):
-        return wav.read(file_path)
+
+    def _load():
+        with warnings.catch_warnings(category=wav.WavFileWarning):
+            return wav.read(file_path)
+
+    return sample_cache.get(content_key(file_digest(file_path), "wav"), _load)
 
 
 def is_valid_track(track: Track) -> bool:
@@ -0,0 +1,227 @@
+import itertools
+import struct
+import time
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+
+# Sample format name -> (WAV format tag, bytes per sample)
+SAMPLE_FORMATS = {
+    "float32": (WAVE_FORMAT_IEEE_FLOAT, 4),
+    "int16": (WAVE_FORMAT_PCM, 2),
+    "int24": (WAVE_FORMAT_PCM, 3),
+}
+
+
+class ExportStats(NamedTuple):
+    """
+    Summary of a WAV export.
+
+    Attributes:
+        n_frames (int): Number of frames written.
+        audio_seconds (float): Duration of the exported audio in seconds.
+        elapsed_seconds (float): Wall-clock time taken by the export.
+        bytes_written (int): Size of the WAV file in bytes.
+    """
+
+    n_frames: int
+    audio_seconds: float
+    elapsed_seconds: float
+    bytes_written: int
+
+    @property
+    def realtime_factor(self) -> float:
+        """Seconds of audio exported per second of wall-clock time."""
+        return (
+            self.audio_seconds / self.elapsed_seconds if self.elapsed_seconds else 0.0
+        )
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """Write throughput in megabytes per second."""
+        if not self.elapsed_seconds:
+            return 0.0
+        return self.bytes_written / self.elapsed_seconds / 1e6
+
+
+class WavWriter:
+    """
+    Writes a WAV file incrementally, one block of audio at a time.
+
+    The header is written up front with placeholder sizes and patched in
+    when the writer is closed, so only the current block is ever held in
+    memory. Use as a context manager, or call close() when done.
+
+    Args:
+        file_path (str or Path): The path to the WAV file to write.
+        sample_rate (int): The sample rate of the audio.
+        n_channels (int): The number of audio channels.
+        sample_format (str): "float32", "int16" or "int24". Defaults to "float32".
+        dither (bool): If True, add triangular (TPDF) dither before quantizing
+            to an integer format. Ignored for float32. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        file_path: str | Path,
+        sample_rate: int,
+        n_channels: int,
+        sample_format: str = "float32",
+        dither: bool = False,
+    ):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(
+                f"Unknown sample format {sample_format!r}; "
+                f"expected one of {list(SAMPLE_FORMATS)}"
+            )
+        self.sample_rate = sample_rate
+        self.n_channels = n_channels
+        self.sample_format = sample_format
+        self.dither = dither
+        self.n_frames = 0
+
+        self._format_tag, self._sample_width = SAMPLE_FORMATS[sample_format]
+        self._rng = np.random.default_rng() if dither else None
+        self._file = open(file_path, "wb")
+        try:
+            self._file.write(self._header())
+        except Exception:
+            self._file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def bytes_written(self) -> int:
+        """Size of the WAV file in bytes, once closed."""
+        return len(self._header()) + self._data_size() + self._data_size() % 2
+
+    def write(self, block: np.ndarray):
+        """
+        Append a block of audio to the file.
+
+        Args:
+            block (np.ndarray): float32 audio in [-1.0, 1.0] with shape
+                (n_frames, n_channels).
+
+        Returns: None
+        """
+        assert block.shape[1:] == (self.n_channels,), (
+            f"Expected {self.n_channels} channels, got block of shape {block.shape}"
+        )
+        self._file.write(self._encode(block))
+        self.n_frames += len(block)
+
+    def close(self):
+        """
+        Patch the final sizes into the header and close the file.
+
+        Returns: None
+        """
+        if self._file.closed:
+            return
+        # Chunks must have an even size; pad the data chunk if needed
+        if self._data_size() % 2:
+            self._file.write(b"\x00")
+        self._file.seek(0)
+        self._file.write(self._header())
+        self._file.close()
+
+    def _data_size(self) -> int:
+        return self.n_frames * self.n_channels * self._sample_width
+
+    def _header(self) -> bytes:
+        """Build the RIFF header for the frames written so far."""
+        block_align = self._sample_width * self.n_channels
+        fmt_chunk = struct.pack(
+            "<HHIIHH",
+            self._format_tag,
+            self.n_channels,
+            self.sample_rate,
+            self.sample_rate * block_align,  # byte rate
+            block_align,
+            8 * self._sample_width,  # bits per sample
+        )
+        chunks = []
+        if self._format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            # Non-PCM formats have a (here empty) format extension and a fact chunk
+            fmt_chunk += struct.pack("<H", 0)
+            chunks.append((b"fact", struct.pack("<I", self.n_frames)))
+        data_size = self._data_size()
+
+        riff_size = 4 + (8 + len(fmt_chunk)) + (8 + data_size + data_size % 2)
+        riff_size += sum(8 + len(body) for _, body in chunks)
+        header = [b"RIFF", struct.pack("<I", riff_size), b"WAVE"]
+        header += [b"fmt ", struct.pack("<I", len(fmt_chunk)), fmt_chunk]
+        for chunk_id, body in chunks:
+            header += [chunk_id, struct.pack("<I", len(body)), body]
+        header += [b"data", struct.pack("<I", data_size)]
+        return b"".join(header)
+
+    def _encode(self, block: np.ndarray) -> bytes:
+        """Convert a float32 block to the bytes of the output sample format."""
+        if self.sample_format == "float32":
+            return np.ascontiguousarray(block, dtype="<f4").tobytes()
+
+        max_value = 2 ** (8 * self._sample_width - 1) - 1
+        scaled = block.astype(np.float64) * max_value
+        if self.dither:
+            # Triangular dither with a peak of +/- 1 LSB
+            scaled += self._rng.random(scaled.shape) - self._rng.random(scaled.shape)
+        quantized = np.clip(np.rint(scaled), -max_value - 1, max_value).astype("<i4")
+
+        if self.sample_format == "int16":
+            return quantized.astype("<i2").tobytes()
+        # int24: keep the 3 low bytes of each little-endian int32
+        return quantized.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+
+
+def write_wav_blocks(
+    file_path: str | Path,
+    blocks: Iterable[np.ndarray],
+    sample_rate: int,
+    sample_format: str = "float32",
+    dither: bool = False,
+) -> ExportStats:
+    """
+    Write audio blocks to a WAV file as they are produced.
+
+    Only one block needs to be in memory at a time, so memory use does not
+    depend on the length of the audio.
+
+    Args:
+        file_path (str or Path): The path to the WAV file to write.
+        blocks (Iterable[np.ndarray]): float32 blocks of shape (n_frames, n_channels).
+        sample_rate (int): The sample rate of the audio.
+        sample_format (str): "float32", "int16" or "int24". Defaults to "float32".
+        dither (bool): If True, dither when quantizing to an integer format.
+            Defaults to False.
+
+    Returns:
+        ExportStats: Number of frames written and export throughput. The elapsed
+        time includes producing the blocks.
+    """
+    start_time = time.perf_counter()
+    blocks = iter(blocks)
+    first = next(blocks, None)
+    n_channels = first.shape[1] if first is not None else 1
+
+    with WavWriter(file_path, sample_rate, n_channels, sample_format, dither) as writer:
+        if first is not None:
+            for block in itertools.chain([first], blocks):
+                writer.write(block)
+
+    return ExportStats(
+        n_frames=writer.n_frames,
+        audio_seconds=writer.n_frames / sample_rate,
+        elapsed_seconds=time.perf_counter() - start_time,
+        bytes_written=writer.bytes_written,
+    )
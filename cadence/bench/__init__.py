@@ -0,0 +1 @@
+from .bench import run_benchmarks as run_benchmarks
@@ -0,0 +1,277 @@
+import gc
+import itertools
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import numpy as np
+import scipy
+import scipy.io.wavfile as wav
+
+from cadence.api.cache import sample_cache
+from cadence.api.config import Config
+from cadence.api.constants import TIMING_UNITS_PER_BEAT
+from cadence.api.functions import load_project, save_project, save_sound, sequence
+from cadence.api.mixing import numba
+from cadence.api.stems import stem_cache
+from cadence.api.track import Track
+
+BENCH_SAMPLE_RATE = 44100
+
+
+class BenchCase(NamedTuple):
+    """
+    A synthetic project to benchmark.
+
+    Attributes:
+        name (str): Name of the case in the report.
+        n_tracks (int): Number of tracks, each with its own sample.
+        hits_per_measure (int): Number of hits per measure in each track.
+        sample_seconds (float): Length of each sample in seconds.
+        bpm (int): Tempo in beats per minute.
+        repeat (int): Number of times the pattern is repeated.
+        measures (int): Number of measures in the pattern.
+    """
+
+    name: str
+    n_tracks: int = 4
+    hits_per_measure: int = 8
+    sample_seconds: float = 0.25
+    bpm: int = 120
+    repeat: int = 4
+    measures: int = 4
+
+
+# Each case scales one dimension of the "baseline" case
+DEFAULT_CASES = [
+    BenchCase("baseline"),
+    BenchCase("many_tracks", n_tracks=32),
+    BenchCase("dense_hits", hits_per_measure=48),
+    BenchCase("long_samples", sample_seconds=2.0),
+    BenchCase("fast_bpm", bpm=300),
+    BenchCase("many_repeats", repeat=100),
+    BenchCase("long_pattern", measures=64),
+]
+
+# Smaller versions of the default cases, for a quick check
+QUICK_CASES = [
+    case._replace(
+        n_tracks=min(case.n_tracks, 8),
+        repeat=min(case.repeat, 16),
+        measures=min(case.measures, 8),
+    )
+    for case in DEFAULT_CASES
+]
+
+
+def make_sample(
+    file_path: Path, seconds: float, seed: int, sample_rate: int = BENCH_SAMPLE_RATE
+):
+    """
+    Write a synthetic percussive stereo sample (a decaying tone plus noise).
+
+    Args:
+        file_path (Path): The path to the WAV file to write.
+        seconds (float): Length of the sample in seconds.
+        seed (int): Seed for the noise and the pitch of the tone.
+        sample_rate (int): Sample rate of the sample. Defaults to BENCH_SAMPLE_RATE.
+
+    Returns: None
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    envelope = np.exp(-t * 8 / seconds)
+    tone = np.sin(2 * np.pi * (60 + 40 * seed) * t)
+    noise = rng.uniform(-1, 1, size=(len(t), 2))
+    audio = envelope[:, np.newaxis] * (0.6 * tone[:, np.newaxis] + 0.4 * noise)
+    wav.write(file_path, sample_rate, (audio * 32767 * 0.9).astype(np.int16))
+
+
+def make_project(case: BenchCase, sample_dir: Path) -> tuple[list[Track], Config]:
+    """
+    Create the tracks and config of a synthetic project, writing its samples.
+
+    Args:
+        case (BenchCase): The case to create.
+        sample_dir (Path): Directory to write the samples into.
+
+    Returns:
+        tuple[list[Track], Config]: The tracks and config of the project.
+    """
+    config = Config(bpm=case.bpm, repeat=case.repeat)
+    units_per_measure = TIMING_UNITS_PER_BEAT * config.beats_per_measure
+    spacing = max(1, units_per_measure // case.hits_per_measure)
+
+    tracks = []
+    for i in range(case.n_tracks):
+        sample_path = sample_dir / f"sample{i}.wav"
+        make_sample(sample_path, case.sample_seconds, seed=i)
+        # Offset each track a little so that tracks don't all hit together
+        timing = list(range(i % spacing, case.measures * units_per_measure, spacing))
+        tracks.append(
+            Track(name=f"track{i}", path=str(sample_path), timing=timing, volume=0.8)
+        )
+    return tracks, config
+
+
+def measure(stage: Callable, rounds: int) -> dict:
+    """
+    Time a benchmark stage and measure its peak memory.
+
+    The stage is timed over `rounds` runs (reporting the fastest), then run
+    once more under tracemalloc to measure its peak allocation.
+
+    Args:
+        stage (Callable): Function running the stage; called with no arguments.
+        rounds (int): Number of timed runs.
+
+    Returns:
+        dict: "seconds" (fastest run) and "peak_bytes" of the stage.
+    """
+    timings = []
+    for _ in range(rounds):
+        gc.collect()
+        start_time = time.perf_counter()
+        stage()
+        timings.append(time.perf_counter() - start_time)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": min(timings), "peak_bytes": peak_bytes}
+
+
+def run_case(case: BenchCase, work_dir: Path, rounds: int) -> dict:
+    """
+    Benchmark every stage of the render pipeline on one synthetic project.
+
+    Args:
+        case (BenchCase): The case to benchmark.
+        work_dir (Path): Empty directory for the samples and outputs of the case.
+        rounds (int): Number of timed runs per stage.
+
+    Returns:
+        dict: The case parameters, audio duration and per-stage results.
+    """
+    sample_dir = work_dir / "samples"
+    sample_dir.mkdir()
+    tracks, config = make_project(case, sample_dir)
+    project_path = work_dir / "bench.cadence"
+    wav_path = work_dir / "bench.wav"
+
+    def _save_project():
+        # save_project refuses to overwrite an existing project
+        shutil.rmtree(project_path, ignore_errors=True)
+        save_project(project_path, tracks, config)
+
+    def _sequence_cold():
+        sample_cache.invalidate()
+        stem_cache.invalidate()
+        sequence(tracks, config)
+
+    def _without_stems(render: Callable) -> Callable:
+        # Mix every run: after the first round, the stem cache would otherwise
+        # hold the whole render and only cache hits would be timed
+        def _render():
+            stem_cache.invalidate()
+            render()
+
+        return _render
+
+    edits = itertools.count()
+
+    def _sequence_edit():
+        # Toggle one hit of the first track, a different one each run, so that
+        # only its stem is patched
+        timing = sorted(set(tracks[0].timing) ^ {next(edits)})
+        sequence([tracks[0]._replace(timing=timing), *tracks[1:]], config)
+
+    stages = {
+        "save_project": measure(_save_project, rounds),
+        "load_project": measure(lambda: load_project(project_path), rounds),
+        "sequence_cold": measure(_sequence_cold, rounds),
+        "sequence": measure(_without_stems(lambda: sequence(tracks, config)), rounds),
+        "sequence_parallel": measure(
+            _without_stems(lambda: sequence(tracks, config, workers=0)), rounds
+        ),
+        # Stems of unchanged tracks from the stem cache, as when Play is pressed
+        # again without edits
+        "sequence_cached": measure(lambda: sequence(tracks, config), rounds),
+        "sequence_edit": measure(_sequence_edit, rounds),
+        "save_sound": measure(
+            _without_stems(lambda: save_sound(wav_path, tracks, config)), rounds
+        ),
+    }
+
+    audio, sample_rate = sequence(tracks, config)
+    audio_seconds = len(audio) / sample_rate
+    for name in (
+        "sequence_cold",
+        "sequence",
+        "sequence_parallel",
+        "sequence_cached",
+        "sequence_edit",
+        "save_sound",
+    ):
+        stages[name]["realtime_factor"] = audio_seconds / stages[name]["seconds"]
+
+    return {
+        "name": case.name,
+        "params": case._asdict(),
+        "audio_seconds": audio_seconds,
+        "stages": stages,
+    }
+
+
+def run_benchmarks(
+    cases: list[BenchCase] | None = None,
+    rounds: int = 3,
+    work_dir: str | Path | None = None,
+) -> dict:
+    """
+    Run the benchmark suite.
+
+    Samples and outputs are written to a temporary directory; no audio
+    device is used.
+
+    Args:
+        cases (list[BenchCase]): Cases to run. Defaults to DEFAULT_CASES.
+        rounds (int): Number of timed runs per stage. Defaults to 3.
+        work_dir (str or Path): Directory for temporary files. Defaults to
+            the system temporary directory.
+
+    Returns:
+        dict: JSON-serializable report with machine info and per-case results.
+    """
+    cases = cases if cases is not None else DEFAULT_CASES
+    report = {
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "numba": numba.__version__ if numba is not None else None,
+        },
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "rounds": rounds,
+        "cases": [],
+    }
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        for case in cases:
+            case_dir = Path(tmp_dir) / case.name
+            case_dir.mkdir()
+            report["cases"].append(run_case(case, case_dir, rounds))
+    return report
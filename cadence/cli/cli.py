@@ -1,13 +1,34 @@
+import argparse
+import json
 import sys
+import time
 
 from cadence.api.functions import load_project, play, play_sound_file
 
 USAGE = """
-Usage: cadence [go|load|play] <options>
+Usage: cadence [go|load|play|render|bench] <options>
 Commands:
   go                Launch the Cadence UI
   load <file>       Load a project from a .cadence file and launch the UI
+      --tracks <n>             Number of tracks in the UI (go and load; default: 8)
+      --measures <n>           Number of measures in the UI grid (go and load; default: 4)
   play <file>       Play a .cadence project file or a .wav audio file
+      --output <backend>       sounddevice, null or wav (default: sounddevice)
+      --device <device>        Output device name or index (sounddevice)
+      --blocksize <n>          Frames per audio block
+      --latency <latency>      Output latency in seconds, or low or high (sounddevice)
+      --wav-file <file>        File to write (wav)
+      --realtime               Play at the speed of a sound device (null and wav)
+  render <files>    Render .cadence projects (paths or glob patterns) to .wav files
+      -o, --output-dir <dir>   Directory for the .wav files (default: current directory)
+      -j, --jobs <n>           Number of worker processes (default: number of CPUs)
+      --format <format>        float32, int16 or int24 (default: float32)
+      --dither                 Dither when writing int16 or int24
+  bench             Benchmark the render engine and print a JSON report
+      --quick                  Run smaller versions of the benchmark cases
+      --case <name>            Only run the named case (can be repeated)
+      --rounds <n>             Number of timed runs per stage (default: 3)
+      -o, --output <file>      Write the report to a file instead of printing it
 """
 
 
@@ -16,6 +37,200 @@ def print_usage():
     print(USAGE)
 
 
+def render(args: list[str]):
+    """
+    Render many .cadence projects to .wav files in parallel.
+
+    Prints the timing of each project as it finishes, then a throughput summary.
+
+    Args:
+        args (list[str]): Command-line arguments following "render".
+
+    Returns: None
+    """
+    from cadence.api.batch import expand_project_paths, render_projects, summarize
+    from cadence.api.wavfile import SAMPLE_FORMATS
+
+    parser = argparse.ArgumentParser(prog="cadence render", add_help=False)
+    parser.add_argument("projects", nargs="*")
+    parser.add_argument("-o", "--output-dir", default=".")
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    parser.add_argument("--format", choices=list(SAMPLE_FORMATS), default="float32")
+    parser.add_argument("--dither", action="store_true")
+    options, unknown = parser.parse_known_args(args)
+    if unknown or not options.projects:
+        print("Error: 'render' command requires one or more .cadence projects.")
+        print_usage()
+        sys.exit(1)
+
+    project_paths = expand_project_paths(options.projects)
+    start_time = time.perf_counter()
+    results = []
+    for result in render_projects(
+        project_paths,
+        options.output_dir,
+        jobs=options.jobs,
+        sample_format=options.format,
+        dither=options.dither,
+    ):
+        results.append(result)
+        if result.error:
+            print(f"FAILED  {result.project_path}: {result.error}")
+        else:
+            stats = result.stats
+            print(
+                f"{stats.elapsed_seconds:7.2f} s  {result.project_path} -> {result.output_path}"
+                f" ({stats.audio_seconds:.1f} s of audio, {stats.realtime_factor:.1f}x realtime)"
+            )
+
+    summary = summarize(results, start_time)
+    print(
+        f"Rendered {summary.n_projects} project(s), {summary.audio_seconds:.1f} s of audio"
+        f" in {summary.elapsed_seconds:.2f} s: {summary.realtime_factor:.1f} s of audio"
+        " per wall-clock second"
+    )
+    if summary.n_failed:
+        print(f"{summary.n_failed} project(s) failed to render.")
+        sys.exit(1)
+
+
+def play_file(args: list[str]):
+    """
+    Play a .cadence project or a .wav file on the chosen output backend.
+
+    Args:
+        args (list[str]): Command-line arguments following "play".
+
+    Returns: None
+    """
+    from cadence.api.output import (
+        OUTPUT_BACKENDS,
+        make_output_backend,
+        set_output_backend,
+    )
+
+    parser = argparse.ArgumentParser(prog="cadence play", add_help=False)
+    parser.add_argument("file", nargs="?", default=None)
+    parser.add_argument("--output", choices=OUTPUT_BACKENDS, default="sounddevice")
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--blocksize", type=int, default=None)
+    parser.add_argument("--latency", default=None)
+    parser.add_argument("--wav-file", default=None)
+    parser.add_argument("--realtime", action="store_true")
+    options, unknown = parser.parse_known_args(args)
+    if unknown or not options.file:
+        print(
+            "Error: 'play' command requires a path to a .cadence project or a .wav file."
+        )
+        print_usage()
+        sys.exit(1)
+    if options.output == "wav" and not options.wav_file:
+        print("Error: '--output wav' requires --wav-file.")
+        print_usage()
+        sys.exit(1)
+
+    device = options.device
+    if device is not None and device.isdigit():
+        device = int(device)
+    latency = options.latency
+    if latency is not None and latency not in {"low", "high"}:
+        latency = float(latency)
+    backend = make_output_backend(
+        options.output,
+        device=device,
+        blocksize=options.blocksize,
+        latency=latency,
+        file_path=options.wav_file,
+        realtime=options.realtime,
+    )
+    set_output_backend(backend)
+
+    file_path = options.file
+    if file_path.endswith(".cadence"):
+        tracks, config = load_project(file_path)
+        play(tracks, config)
+    elif file_path.endswith(".wav"):
+        play_sound_file(file_path)
+    else:
+        print("Error: Path must be a .cadence project or a .wav file.")
+        print_usage()
+        sys.exit(1)
+    # Close the output stream kept open between playbacks
+    backend.close()
+
+
+def ui(args: list[str], require_project: bool = False):
+    """
+    Launch the UI, optionally loading a project.
+
+    Args:
+        args (list[str]): Command-line arguments following "go" or "load".
+        require_project (bool): If True, a project path is required. Defaults to False.
+
+    Returns: None
+    """
+    # Avoid loading UI dependencies unless needed
+    from cadence.ui.run import run
+    from cadence.ui.ui_constants import N_MEASURES, N_TRACKS
+
+    parser = argparse.ArgumentParser(prog="cadence", add_help=False)
+    parser.add_argument("project", nargs="?", default=None)
+    parser.add_argument("--tracks", type=int, default=N_TRACKS)
+    parser.add_argument("--measures", type=int, default=N_MEASURES)
+    options, unknown = parser.parse_known_args(args)
+    if unknown or options.tracks < 1 or options.measures < 1:
+        print(f"Error: invalid options: {' '.join(args)}")
+        print_usage()
+        sys.exit(1)
+    if require_project and not options.project:
+        print("Error: 'load' command requires a file path argument.")
+        print_usage()
+        sys.exit(1)
+
+    run(
+        project_path=options.project,
+        n_tracks=options.tracks,
+        n_measures=options.measures,
+    )
+
+
+def bench(args: list[str]):
+    """
+    Run the benchmark suite and print (or save) the JSON report.
+
+    Args:
+        args (list[str]): Command-line arguments following "bench".
+
+    Returns: None
+    """
+    from cadence.bench.bench import DEFAULT_CASES, QUICK_CASES, run_benchmarks
+
+    parser = argparse.ArgumentParser(prog="cadence bench", add_help=False)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--case", action="append", default=[])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("-o", "--output", default=None)
+    options, unknown = parser.parse_known_args(args)
+    if unknown:
+        print(f"Error: unknown 'bench' options: {' '.join(unknown)}")
+        print_usage()
+        sys.exit(1)
+
+    cases = QUICK_CASES if options.quick else DEFAULT_CASES
+    if options.case:
+        cases = [case for case in cases if case.name in options.case]
+        if not cases:
+            print(f"Error: no benchmark case named {', '.join(options.case)}")
+            sys.exit(1)
+
+    report = json.dumps(run_benchmarks(cases, rounds=options.rounds), indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
 def main():
     """
     Main entry point for the Cadence CLI.
@@ -24,37 +239,18 @@ def main():
     """
     args = sys.argv[1:]
     if not args or args[0] in {"run", "launch", "lancer", "go"}:
-        # Avoid loading UI dependencies unless needed
-        from cadence.ui.run import run
-        run()
+        ui(args[1:])
     elif args[0] in {"load"}:
-        if len(args) != 2:
-            print("Error: 'load' command requires a file path argument.")
-            print_usage()
-            sys.exit(1)
-        file_path = args[1]
-        from cadence.ui.run import run
-        run(project_path=file_path)
-        pass
+        ui(args[1:], require_project=True)
 
     elif args[0] in {"play"}:
-        if len(args) != 2:
-            print(
-                "Error: 'play' command requires a path to a .cadence project or a .wav file."
-            )
-            print_usage()
-            sys.exit(1)
-        file_path = args[1]
+        play_file(args[1:])
 
-        if file_path.endswith(".cadence"):
-            tracks, config = load_project(file_path)
-            play(tracks, config)
-        elif file_path.endswith(".wav"):
-            play_sound_file(file_path)
-        else:
-            print("Error: Path must be a .cadence project or a .wav file.")
-            print_usage()
-            sys.exit(1)
+    elif args[0] in {"render"}:
+        render(args[1:])
+
+    elif args[0] in {"bench"}:
+        bench(args[1:])
 
     elif args[0] in {"-h", "--help", "help"}:
         print_usage()
@@ -1,47 +1,35 @@
 import threading
 
 from tkinter import filedialog
-from customtkinter import CTkButton
+from customtkinter import CTk, CTkButton
 
-from cadence.api.functions import load_project, play_sound_file
+from cadence.api.functions import load_arrangement, load_project
+from cadence.ui.grid import Cell
 from cadence.ui.state import app_state
-from cadence.ui.ui_constants import STYLE
+from cadence.ui.ui_constants import PLAYHEAD_POLL_MS, STYLE
 from cadence.ui.utils import update_track_ui_from_tracks, update_tracks_from_track_ui
 
 
-# Function to handle button clicks
-def on_button_click(button: CTkButton):
+# Function to handle clicks on the step grid
+def on_cell_toggle(cell: Cell, enabled: bool):
     """
-    Handle button click events to toggle button state and update app_state.
+    Handle a click on a cell of the step grid, after the grid toggled it.
 
     Args:
-        button (CTkButton): The button that was clicked
+        cell (Cell): The (track, beat, division, button index) of the cell
+        enabled (bool): Whether the cell is now enabled
 
     Returns: None
     """
-
-    # Toggle button state
-    button.enabled = not button.enabled
-
-    # Update app_state
-    app_state.update_track_timings()
-
-    # Update button color
-    if button.enabled:
-        button.configure(fg_color=STYLE["btn_color_selected"])
-        button.configure(hover_color=STYLE["btn_color_selected"])
-    else:
-        if button.is_even:
-            button.configure(fg_color=STYLE["btn_color_light"])
-            button.configure(hover_color=STYLE["btn_color_light_hover"])
-        else:
-            button.configure(fg_color=STYLE["btn_color_dark"])
-            button.configure(hover_color=STYLE["btn_color_dark_hover"])
+    app_state.toggle_cell(cell, enabled)
+    app_state.refresh_playback()
 
 
 def on_play_sound(play_sound_button: CTkButton):
     """Handle play sound button click
 
+    The sound plays over any other sounds being previewed.
+
     Args:
         play_sound_button (CTkButton): The button that was clicked
 
@@ -49,11 +37,7 @@ def on_play_sound(play_sound_button: CTkButton):
     """
     if not play_sound_button.path:
         return
-
-    def _play_sound():
-        play_sound_file(play_sound_button.path)
-
-    threading.Thread(target=_play_sound).start()
+    app_state.audition.trigger(play_sound_button.path)
 
 
 def on_play(play_button: CTkButton):
@@ -68,15 +52,44 @@ def on_play(play_button: CTkButton):
 
     def _play():
         try:
-            app_state.play(wait=True)
-        finally:
+            app_state.play(on_finished=lambda: on_stop(play_button))
+        except Exception:
             on_stop(play_button)
+            raise
+
+    def _poll_playhead():
+        # Runs on the Tk main thread until playback stops
+        app_state.update_playhead()
+        if play_button.enabled:
+            app_state.playhead_job = play_button.after(PLAYHEAD_POLL_MS, _poll_playhead)
+        else:
+            app_state.playhead_job = None
+            app_state.grid.set_playhead(None)
+
+    # Replace the polling loop of an earlier press, rather than adding another
+    if app_state.playhead_job is not None:
+        play_button.after_cancel(app_state.playhead_job)
+        app_state.playhead_job = None
 
     play_button.enabled = True
     play_button.configure(fg_color=STYLE["btn_color_selected"])
     play_button.configure(hover_color=STYLE["btn_color_selected"])
     play_button.configure(text_color=STYLE["btn_color_dark"])
     threading.Thread(target=_play).start()
+    _poll_playhead()
+
+
+def on_close(app: CTk):
+    """
+    Handle the main window being closed: stop all sound, then quit.
+
+    Args:
+        app (CTk): The main application window
+
+    Returns: None
+    """
+    app_state.close()
+    app.destroy()
 
 
 def on_stop(play_button: CTkButton):
@@ -115,6 +128,8 @@ def on_choose_sound(track_index: int, play_sound_button: CTkButton):
         return
 
     play_sound_button.path = file_path
+    # Decode the sound now, so that previewing it starts at once
+    app_state.audition.load(file_path)
 
     # TODO: this function should just update the tracks dirctly
     # instead of returning them; there's a reason I did this (because of the config)
@@ -139,6 +154,21 @@ def on_choose_sound(track_index: int, play_sound_button: CTkButton):
         app_state.all_name_labels,
         app_state.tracks,
     )
+    app_state.refresh_playback()
+
+
+def on_config_change(event=None):
+    """
+    Handle edits to the BPM or repeat entries.
+
+    If playing, the new config is picked up at the next pattern boundary.
+
+    Args:
+        event (tkinter.Event): The triggering event, if any
+
+    Returns: None
+    """
+    app_state.refresh_playback(read_config=True)
 
 
 def on_save_project():
@@ -175,17 +205,12 @@ def on_export_wav():
         app_state.save_sound(file_path)
 
 
-def on_load_project(
-    all_buttons: dict[tuple[int, int, int, int], CTkButton],
-):
+def on_load_project():
     """
     Handle load project button click.
 
     Opens a file dialog to load a project from a .cadence file and updates the application state.
 
-    Args:
-        all_buttons (dict[tuple[int, int, int, int], CTkButton]): Dictionary of all buttons in the UI.
-
     Returns: None
     """
     file_path = filedialog.askopenfilename(
@@ -196,8 +221,6 @@ def on_load_project(
         return
 
     tracks, config = load_project(file_path)
+    app_state.arrangement = load_arrangement(file_path)
     app_state.set_config(config)
     app_state.set_tracks(tracks)
-
-    # The below shouldn't be necessary
-    # app_state.update_track_timings(all_buttons)
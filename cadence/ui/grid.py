@@ -0,0 +1,382 @@
+# Step grid drawn on a single canvas, with one rectangle per visible cell
+
+from typing import Callable
+
+from customtkinter import CTkCanvas
+
+from cadence.ui.ui_constants import (
+    BUTTON_PAD_X,
+    BUTTON_PAD_Y,
+    BUTTON_SIZE,
+    DIVS_PER_BEAT_LOWER,
+    DIVS_PER_BEAT_UPPER,
+    STYLE,
+    TRACK_ROW_HEIGHT,
+    TRIPLET_ROW_HEIGHT_FRAC,
+)
+
+# A cell of the grid: (track, beat, division, button index), where division
+# is 0 for the upper row of a beat and 1 for the lower (triplet) row
+Cell = tuple[int, int, int, int]
+
+# Derived sizes in pixels
+UPPER_STEP = BUTTON_SIZE + 2 * BUTTON_PAD_X  # Width of an upper cell and its padding
+BEAT_WIDTH = UPPER_STEP * DIVS_PER_BEAT_UPPER
+LOWER_STEP = BEAT_WIDTH / DIVS_PER_BEAT_LOWER  # Width of a lower cell and its padding
+LOWER_HEIGHT = int(BUTTON_SIZE * TRIPLET_ROW_HEIGHT_FRAC)
+LOWER_TOP = BUTTON_SIZE + 3 * BUTTON_PAD_Y  # Top of the lower row within a track row
+
+
+def cell_rect(cell: Cell) -> tuple[float, float, float, float]:
+    """
+    Return the rectangle of a cell in grid coordinates.
+
+    Args:
+        cell (Cell): The cell.
+
+    Returns:
+        tuple[float, float, float, float]: (x0, y0, x1, y1) in pixels.
+    """
+    track, beat, division, index = cell
+    x = beat * BEAT_WIDTH
+    y = track * TRACK_ROW_HEIGHT
+    if division == 0:
+        x0 = x + index * UPPER_STEP + BUTTON_PAD_X
+        y0 = y + BUTTON_PAD_Y
+        return x0, y0, x0 + BUTTON_SIZE, y0 + BUTTON_SIZE
+    x0 = x + index * LOWER_STEP + BUTTON_PAD_X
+    y0 = y + LOWER_TOP
+    return x0, y0, x0 + LOWER_STEP - 2 * BUTTON_PAD_X, y0 + LOWER_HEIGHT
+
+
+def cell_at(x: float, y: float, n_tracks: int, n_beats: int) -> Cell | None:
+    """
+    Return the cell under a point, in constant time.
+
+    Clicks on the padding around a cell count as clicks on the cell.
+
+    Args:
+        x (float): Horizontal position in grid coordinates.
+        y (float): Vertical position in grid coordinates.
+        n_tracks (int): Number of tracks in the grid.
+        n_beats (int): Number of beats in the grid.
+
+    Returns:
+        Cell or None: The cell, or None if the point is outside the grid.
+    """
+    if x < 0 or y < 0:
+        return None
+    beat, beat_x = divmod(x, BEAT_WIDTH)
+    track, row_y = divmod(y, TRACK_ROW_HEIGHT)
+    if beat >= n_beats or track >= n_tracks:
+        return None
+    if row_y < LOWER_TOP - BUTTON_PAD_Y:
+        division, index = 0, min(int(beat_x // UPPER_STEP), DIVS_PER_BEAT_UPPER - 1)
+    else:
+        division, index = 1, min(int(beat_x // LOWER_STEP), DIVS_PER_BEAT_LOWER - 1)
+    return int(track), int(beat), division, index
+
+
+def _block_cells(track: int, beat: int) -> list[Cell]:
+    """Return the cells of one beat of one track, in drawing order."""
+    return [(track, beat, 0, i) for i in range(DIVS_PER_BEAT_UPPER)] + [
+        (track, beat, 1, i) for i in range(DIVS_PER_BEAT_LOWER)
+    ]
+
+
+class StepGrid(CTkCanvas):
+    """
+    The grid of steps of every track, drawn on a single canvas.
+
+    Only the cells in view are drawn: beats of tracks scrolled into view are
+    drawn as they appear and deleted once scrolled out, so the number of
+    canvas items does not depend on the size of the grid. Clicks are mapped
+    to cells arithmetically (see cell_at()).
+
+    Args:
+        master: The parent widget.
+        n_tracks (int): Number of tracks (rows).
+        n_beats (int): Number of beats (columns).
+        on_toggle (Callable): Called as on_toggle(cell, enabled) when a cell is
+            clicked, after it is toggled. Defaults to None.
+        xscrollcommand (Callable): Called with the visible horizontal fraction
+            when the view changes, e.g. a scrollbar's set(). Defaults to None.
+        yscrollcommand (Callable): The same, for the vertical fraction.
+            Defaults to None.
+        **kwargs: Passed to the canvas, e.g. width and height.
+
+    Attributes:
+        n_tracks (int): Number of tracks.
+        n_beats (int): Number of beats.
+        enabled (set[Cell]): The enabled cells.
+    """
+
+    def __init__(
+        self,
+        master,
+        n_tracks: int,
+        n_beats: int,
+        on_toggle: Callable[[Cell, bool], None] = None,
+        xscrollcommand: Callable = None,
+        yscrollcommand: Callable = None,
+        **kwargs,
+    ):
+        super().__init__(
+            master,
+            bg=STYLE["bkg_color"],
+            highlightthickness=0,
+            xscrollincrement=BEAT_WIDTH,
+            yscrollincrement=TRACK_ROW_HEIGHT,
+            **kwargs,
+        )
+        self.n_tracks: int = n_tracks
+        self.n_beats: int = n_beats
+        self.enabled: set[Cell] = set()
+        self.on_toggle = on_toggle
+        self._xscrollcommand = xscrollcommand
+        self._yscrollcommand = yscrollcommand
+        # Canvas items of the drawn beats, by (track, beat)
+        self._blocks: dict[tuple[int, int], list[int]] = {}
+        self._redraw_pending = False
+        # Outline around the step being played, and that step as (beat, index)
+        self._playhead: int = None
+        self._playhead_step: tuple[int, int] = None
+        # Cells changed by set_enabled() that are not redrawn yet
+        self._pending_cells: set[Cell] = set()
+        self._cells_pending = False
+
+        self.configure(xscrollcommand=self._on_xview, yscrollcommand=self._on_yview)
+        self._update_scrollregion()
+        self.bind("<Configure>", lambda event: self.schedule_redraw())
+        self.bind("<Button-1>", self._on_click)
+
+    def _update_scrollregion(self):
+        self.configure(
+            scrollregion=(
+                0,
+                0,
+                self.n_beats * BEAT_WIDTH,
+                self.n_tracks * TRACK_ROW_HEIGHT,
+            )
+        )
+
+    def _on_xview(self, first: str, last: str):
+        if self._xscrollcommand:
+            self._xscrollcommand(first, last)
+        self.schedule_redraw()
+
+    def _on_yview(self, first: str, last: str):
+        if self._yscrollcommand:
+            self._yscrollcommand(first, last)
+        self.schedule_redraw()
+
+    def _colors(self, cell: Cell) -> tuple[str, str]:
+        """Return the fill and hover colors of a cell."""
+        if cell in self.enabled:
+            return STYLE["btn_color_selected"], STYLE["btn_color_selected"]
+        if cell[0] % 2 == 0:
+            return STYLE["btn_color_light"], STYLE["btn_color_light_hover"]
+        return STYLE["btn_color_dark"], STYLE["btn_color_dark_hover"]
+
+    def _draw_block(self, track: int, beat: int) -> list[int]:
+        """Draw the cells of one beat of one track and return their items."""
+        items = []
+        for cell in _block_cells(track, beat):
+            fill, hover = self._colors(cell)
+            items.append(
+                self.create_rectangle(
+                    *cell_rect(cell), fill=fill, activefill=hover, width=0
+                )
+            )
+        return items
+
+    def schedule_redraw(self):
+        """
+        Draw the cells scrolled into view once Tk is idle.
+
+        Several view changes in a row (e.g. while dragging a scrollbar) are
+        handled by a single redraw.
+
+        Returns: None
+        """
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._draw_visible)
+
+    def _draw_visible(self):
+        """Draw the beats in view and delete the ones out of view."""
+        self._redraw_pending = False
+        x0, y0 = self.canvasx(0), self.canvasy(0)
+        x1 = self.canvasx(self.winfo_width())
+        y1 = self.canvasy(self.winfo_height())
+        beats = range(
+            max(0, int(x0 // BEAT_WIDTH)), min(self.n_beats, int(x1 // BEAT_WIDTH) + 1)
+        )
+        tracks = range(
+            max(0, int(y0 // TRACK_ROW_HEIGHT)),
+            min(self.n_tracks, int(y1 // TRACK_ROW_HEIGHT) + 1),
+        )
+        visible = {(track, beat) for track in tracks for beat in beats}
+
+        for block in self._blocks.keys() - visible:
+            self.delete(*self._blocks.pop(block))
+        for block in visible - self._blocks.keys():
+            self._blocks[block] = self._draw_block(*block)
+        if self._playhead is not None:
+            self.tag_raise(self._playhead)
+
+    def _redraw_cell(self, cell: Cell):
+        """Update the colors of a cell, if it is drawn."""
+        items = self._blocks.get(cell[:2])
+        if items is None:
+            return
+        division, index = cell[2:]
+        item = items[index if division == 0 else DIVS_PER_BEAT_UPPER + index]
+        fill, hover = self._colors(cell)
+        self.itemconfigure(item, fill=fill, activefill=hover)
+
+    def _on_click(self, event):
+        cell = cell_at(
+            self.canvasx(event.x), self.canvasy(event.y), self.n_tracks, self.n_beats
+        )
+        if cell is None:
+            return
+        enabled = cell not in self.enabled
+        self.set_cell(cell, enabled)
+        if self.on_toggle:
+            self.on_toggle(cell, enabled)
+
+    def set_cell(self, cell: Cell, enabled: bool):
+        """
+        Enable or disable a single cell.
+
+        Args:
+            cell (Cell): The cell.
+            enabled (bool): Whether the cell is enabled.
+
+        Returns: None
+        """
+        if enabled:
+            self.enabled.add(cell)
+        else:
+            self.enabled.discard(cell)
+        self._redraw_cell(cell)
+
+    def set_enabled(self, cells: set[Cell]):
+        """
+        Set which cells are enabled.
+
+        Only the cells whose state changes, and that are drawn, are updated,
+        so that loading a project touches a handful of canvas items. The
+        updates are applied together once Tk is idle.
+
+        Args:
+            cells (set[Cell]): The cells to enable; all others are disabled.
+
+        Returns: None
+        """
+        cells = set(cells)
+        changed = cells ^ self.enabled
+        self.enabled = cells
+        self._pending_cells |= changed
+        if self._pending_cells and not self._cells_pending:
+            self._cells_pending = True
+            self.after_idle(self._redraw_pending_cells)
+
+    def _redraw_pending_cells(self):
+        self._cells_pending = False
+        cells, self._pending_cells = self._pending_cells, set()
+        for cell in cells:
+            self._redraw_cell(cell)
+
+    def set_playhead(self, step: tuple[int, int] | None):
+        """
+        Highlight the column of the step being played.
+
+        The highlight is a single outline moved from column to column, so
+        only the previous and current columns are repainted, and nothing is
+        done while the step does not change.
+
+        Args:
+            step (tuple[int, int]): (beat, index) of the step in the upper
+                division of the beat, or None to hide the highlight.
+
+        Returns: None
+        """
+        if step == self._playhead_step:
+            return
+        self._playhead_step = step
+        if step is None:
+            if self._playhead is not None:
+                self.itemconfigure(self._playhead, state="hidden")
+            return
+        beat, index = step
+        x0, _, x1, _ = cell_rect((0, beat, 0, index))
+        coords = (x0 - 1, 0, x1 + 1, self.n_tracks * TRACK_ROW_HEIGHT)
+        if self._playhead is None:
+            self._playhead = self.create_rectangle(
+                *coords, outline=STYLE["playhead_color"], width=2
+            )
+        else:
+            self.coords(self._playhead, *coords)
+            self.itemconfigure(self._playhead, state="normal")
+
+    def resize(self, n_tracks: int = None, n_beats: int = None):
+        """
+        Change the number of tracks or beats of the grid.
+
+        Enabled cells outside the new size are kept, but not shown.
+
+        Args:
+            n_tracks (int): New number of tracks. Defaults to None (unchanged).
+            n_beats (int): New number of beats. Defaults to None (unchanged).
+
+        Returns: None
+        """
+        self.n_tracks = n_tracks or self.n_tracks
+        self.n_beats = n_beats or self.n_beats
+        self._update_scrollregion()
+        self.schedule_redraw()
+
+
+def bind_mouse_wheel(app, area, canvases: list, horizontal: list = ()):
+    """
+    Scroll canvases with the mouse wheel while the pointer is over an area.
+
+    The wheel scrolls vertically, and horizontally with Shift held (or with a
+    horizontal wheel or trackpad). Events are caught application-wide, so
+    scrolling also works over the widgets inside the area, not only over the
+    scrollbars.
+
+    Args:
+        app: The application window.
+        area: The widget containing the scrolled content.
+        canvases (list): Canvases scrolled vertically together.
+        horizontal (list): Canvases scrolled horizontally. Defaults to ().
+
+    Returns: None
+    """
+    area_path = str(area)
+
+    def _scroll(event, units: int, shift: bool):
+        widget = app.winfo_containing(event.x_root, event.y_root)
+        if widget is None or not str(widget).startswith(area_path):
+            return
+        for canvas in horizontal if shift else canvases:
+            if shift:
+                canvas.xview_scroll(units, "units")
+            else:
+                canvas.yview_scroll(units, "units")
+
+    def _on_wheel(event, shift: bool = False):
+        # Windows and macOS: delta is positive when scrolling up
+        if event.delta:
+            _scroll(event, -1 if event.delta > 0 else 1, shift)
+
+    app.bind_all("<MouseWheel>", _on_wheel, add="+")
+    app.bind_all("<Shift-MouseWheel>", lambda e: _on_wheel(e, True), add="+")
+    # X11 reports the wheel as buttons 4 (up) and 5 (down)
+    app.bind_all("<Button-4>", lambda e: _scroll(e, -1, False), add="+")
+    app.bind_all("<Button-5>", lambda e: _scroll(e, 1, False), add="+")
+    app.bind_all("<Shift-Button-4>", lambda e: _scroll(e, -1, True), add="+")
+    app.bind_all("<Shift-Button-5>", lambda e: _scroll(e, 1, True), add="+")
@@ -1,17 +1,21 @@
 import functools
 
+from tkinter import Frame
+
 from customtkinter import (
     CTkButton,
+    CTkCanvas,
     CTkEntry,
     CTkFrame,
     CTkLabel,
-    CTkScrollableFrame,
+    CTkScrollbar,
     StringVar,
 )
 
 from cadence.ui.callbacks import (
-    on_button_click,
+    on_cell_toggle,
     on_choose_sound,
+    on_config_change,
     on_play,
     on_play_sound,
     on_stop,
@@ -19,9 +23,11 @@ from cadence.ui.callbacks import (
     on_export_wav,
     on_load_project,
 )
+from cadence.ui.grid import StepGrid, bind_mouse_wheel
 from cadence.ui.state import app_state
 from cadence.ui.ui_constants import (
-    N_BEATS,
+    BEATS_PER_MEASURE,
+    N_MEASURES,
     N_TRACKS,
     PLAY_BUTTON_HEIGHT,
     PLAY_BUTTON_WIDTH,
@@ -29,31 +35,32 @@ from cadence.ui.ui_constants import (
     PLAY_SOUND_BUTTON_WIDTH,
     CHOOSE_BUTTON_WIDTH,
     LABEL_WIDTH,
-    BUTTON_SIZE,
-    TRIPLET_ROW_HEIGHT_FRAC,
-    DEFAULT_TRACK_LABELS,
+    DEFAULT_TRACK_LABEL,
     STYLE,
-    DIVS_PER_BEAT_UPPER,
-    DIVS_PER_BEAT_LOWER,
-    BUTTON_PAD_X,
-    BUTTON_PAD_Y,
+    TRACK_CONTROLS_WIDTH,
+    TRACK_ROW_HEIGHT,
+    GRID_VIEW_TRACKS,
+    GRID_VIEW_WIDTH,
     UI_DEFAULT_BPM,
     UI_DEFAULT_REPEATS,
 )
-from cadence.ui.utils import get_timing_index
 
 
-def add_layout(app):
+def add_layout(app, n_tracks: int = N_TRACKS, n_measures: int = N_MEASURES):
     """
     Create and add the UI layout to the application window.
 
-    Sets up the main frame, track controls, buttons, and all UI elements.
+    Sets up the main frame, track controls, step grid, and all UI elements.
 
     Args:
         app (CTk): The main application window.
+        n_tracks (int): Number of tracks. Defaults to N_TRACKS.
+        n_measures (int): Number of measures in the step grid. Defaults to N_MEASURES.
 
     Returns: None
     """
+    n_beats = n_measures * BEATS_PER_MEASURE
+
     # Configure the main window to center content
     app.grid_rowconfigure(0, weight=1)
     app.grid_columnconfigure(0, weight=1)
@@ -93,6 +100,8 @@ def add_layout(app):
         textvariable=StringVar(value=UI_DEFAULT_BPM),
     )
     bpm_entry.grid(row=0, column=3, pady=10)
+    bpm_entry.bind("<Return>", on_config_change)
+    bpm_entry.bind("<FocusOut>", on_config_change)
     app_state.bpm_entry = bpm_entry
 
     # Add repeat controls
@@ -105,44 +114,76 @@ def add_layout(app):
         textvariable=StringVar(value=UI_DEFAULT_REPEATS),
     )
     repeat_entry.grid(row=0, column=5, pady=10)
+    repeat_entry.bind("<Return>", on_config_change)
+    repeat_entry.bind("<FocusOut>", on_config_change)
     app_state.repeat_entry = repeat_entry
 
-    # Create a scrollable canvas within the main frame to hold the tracks
-    # TODO: fix scrolling; only works when mouse is over scrollbar
-    scrollable_area_height = (
-        N_TRACKS * (BUTTON_SIZE * (1 + TRIPLET_ROW_HEIGHT_FRAC) + 2 * BUTTON_PAD_Y + 2)
-        + 10
+    # Create the track area: the controls of each track on the left, and the
+    # step grid on the right, scrolled vertically together
+    tracks_frame = CTkFrame(main_frame, fg_color=STYLE["bkg_color"])
+    tracks_frame.grid(row=1, column=0, sticky="nsew")
+    view_height = min(n_tracks, GRID_VIEW_TRACKS) * TRACK_ROW_HEIGHT
+
+    vertical_scrollbar = CTkScrollbar(tracks_frame, orientation="vertical")
+    horizontal_scrollbar = CTkScrollbar(tracks_frame, orientation="horizontal")
+    controls_canvas = CTkCanvas(
+        tracks_frame,
+        width=TRACK_CONTROLS_WIDTH,
+        height=view_height,
+        bg=STYLE["bkg_color"],
+        highlightthickness=0,
+        yscrollincrement=TRACK_ROW_HEIGHT,
     )
-    scrollable_tracks_frame = CTkScrollableFrame(
-        main_frame,
-        height=scrollable_area_height,
-        width=1200,
-        orientation="horizontal",
-        fg_color=STYLE["bkg_color"],
+    step_grid = StepGrid(
+        tracks_frame,
+        n_tracks,
+        n_beats,
+        on_toggle=on_cell_toggle,
+        xscrollcommand=horizontal_scrollbar.set,
+        yscrollcommand=vertical_scrollbar.set,
+        width=GRID_VIEW_WIDTH,
+        height=view_height,
     )
-    scrollable_tracks_frame.grid(row=1, column=0, sticky="nsew")
 
-    all_buttons = {}
-    all_play_sound_buttons = []
-    all_name_labels = []
-    # Add 1 row for each track
-    for track in range(N_TRACKS):
-        # Create frame for entire track row
-        track_frame = CTkFrame(scrollable_tracks_frame, fg_color=STYLE["bkg_color"])
-        track_frame.grid(row=track, column=0, sticky="ew")
+    def _yview(*args):
+        step_grid.yview(*args)
+        controls_canvas.yview(*args)
 
-        # Create a frame for the controls on the left, and add to track_frame grid
-        controls_frame = CTkFrame(track_frame, fg_color=STYLE["bkg_color"])
-        controls_frame.grid(row=0, column=0, sticky="ns")
-        controls_frame.grid_rowconfigure(0, weight=1)  # Center vertically
+    vertical_scrollbar.configure(command=_yview)
+    horizontal_scrollbar.configure(command=step_grid.xview)
+    controls_canvas.grid(row=0, column=0, sticky="ns")
+    step_grid.grid(row=0, column=1, sticky="nsew")
+    vertical_scrollbar.grid(row=0, column=2, sticky="ns")
+    horizontal_scrollbar.grid(row=1, column=1, sticky="ew")
+    bind_mouse_wheel(
+        app, tracks_frame, [step_grid, controls_canvas], horizontal=[step_grid]
+    )
+
+    # The controls are widgets in a frame inside the controls canvas, one row
+    # per track, each exactly as high as a row of the step grid
+    controls_frame = Frame(controls_canvas, bg=STYLE["bkg_color"])
+    controls_canvas.create_window(0, 0, window=controls_frame, anchor="nw")
+    controls_canvas.configure(
+        scrollregion=(0, 0, TRACK_CONTROLS_WIDTH, n_tracks * TRACK_ROW_HEIGHT)
+    )
 
-        # Add file controls grid to controls grid
-        file_controls_frame = CTkFrame(controls_frame, fg_color=STYLE["bkg_color"])
-        file_controls_frame.grid(row=0, column=0, padx=5, sticky="e")
+    all_play_sound_buttons = []
+    all_name_labels = []
+    # Add the controls of each track
+    for track in range(n_tracks):
+        track_frame = Frame(
+            controls_frame,
+            bg=STYLE["bkg_color"],
+            width=TRACK_CONTROLS_WIDTH,
+            height=TRACK_ROW_HEIGHT,
+        )
+        track_frame.grid(row=track, column=0)
+        track_frame.grid_propagate(False)
+        track_frame.grid_rowconfigure(0, weight=1)  # Center vertically
 
-        # Add play sound button to file controls grid
+        # Add play sound button
         play_sound_button = CTkButton(
-            file_controls_frame,
+            track_frame,
             text="",
             state="disabled",
             height=PLAY_SOUND_BUTTON_HEIGHT,
@@ -154,11 +195,11 @@ def add_layout(app):
             command=functools.partial(on_play_sound, play_sound_button)
         )
         all_play_sound_buttons.append(play_sound_button)
-        play_sound_button.grid(row=0, column=0, sticky="e")
+        play_sound_button.grid(row=0, column=0, padx=(5, 0), sticky="e")
 
-        # Add "Choose sound..." button to file controls grid
+        # Add "Choose sound..." button
         choose_button = CTkButton(
-            file_controls_frame,
+            track_frame,
             text="Choose...",
             height=PLAY_SOUND_BUTTON_HEIGHT,
             width=CHOOSE_BUTTON_WIDTH,
@@ -169,104 +210,23 @@ def add_layout(app):
         )
         choose_button.grid(row=0, column=1, padx=5, sticky="e")
 
-        # Add track label to controls grid as a CTkEntry so user can edit track name
+        # Add track label as a CTkEntry so user can edit track name
         label = CTkEntry(
-            controls_frame,
+            track_frame,
             width=LABEL_WIDTH,
             fg_color=STYLE["track_entry_fill_color"],
-            textvariable=StringVar(value=DEFAULT_TRACK_LABELS[track]),
+            textvariable=StringVar(value=DEFAULT_TRACK_LABEL.format(track + 1)),
         )
         all_name_labels.append(label)
-        label.grid(row=0, column=1, sticky="w", padx=5)
-
-        # Create a frame for the buttons on the right, and add to track_frame grid
-        buttons_frame = CTkFrame(track_frame, fg_color=STYLE["bkg_color"])
-        buttons_frame.grid(row=0, column=1, sticky="ew")
-        buttons_frame.grid_columnconfigure(0, weight=1)  # Expand to fill space
-
-        # Determine button color based on track index (alternating colors)
-        if track % 2 == 0:
-            button_color = STYLE["btn_color_light"]
-            button_color_hover = STYLE["btn_color_light_hover"]
-            is_even = True
-        else:
-            button_color = STYLE["btn_color_dark"]
-            button_color_hover = STYLE["btn_color_dark_hover"]
-            is_even = False
-
-        # Loop through each beat
-        for beat in range(N_BEATS):
-            # Create a beat frame for this beat's buttons
-            beat_frame = CTkFrame(buttons_frame, fg_color=STYLE["bkg_color"])
-            beat_frame.grid(row=0, column=beat)
-
-            # Add buttons to upper division
-            # Create frame for upper division buttons
-            upper_div_frame = CTkFrame(beat_frame, fg_color=STYLE["bkg_color"])
-            upper_div_frame.grid(row=0, column=0)
-            for i in range(DIVS_PER_BEAT_UPPER):
-                button = CTkButton(
-                    upper_div_frame,
-                    text="",
-                    width=BUTTON_SIZE,
-                    height=BUTTON_SIZE,
-                    fg_color=button_color,
-                    hover_color=button_color_hover,
-                )
-                button.configure(command=functools.partial(on_button_click, button))
-                button.enabled = False
-                button.is_even = is_even
-                button.track = track
-                button.beat = beat
-                button.division = 0
-                button.button_index = i
-                button.timing_index = get_timing_index(0, i)
-                button.grid(row=0, column=i, padx=BUTTON_PAD_X, pady=BUTTON_PAD_Y)
-
-                all_buttons[
-                    (button.track, button.beat, button.division, button.button_index)
-                ] = button
-
-            # Add buttons to lower division
-            # First, calculate button width to align with upper division
-            # bottom_button_width = ((BUTTON_SIZE+per_button_padding_top)*N_BUTTONS_TOP)/N_BUTTONS_BOTTOM - per_button_padding_bottom
-            pad = BUTTON_PAD_X * 2
-            bottom_button_width = (
-                (BUTTON_SIZE + pad) * DIVS_PER_BEAT_UPPER
-            ) / DIVS_PER_BEAT_LOWER - pad
-            # Create frame for lower division buttons
-            lower_div_frame = CTkFrame(beat_frame, fg_color=STYLE["bkg_color"])
-            lower_div_frame.grid(row=1, column=0)
-            for i in range(DIVS_PER_BEAT_LOWER):
-                button = CTkButton(
-                    lower_div_frame,
-                    text="",
-                    width=bottom_button_width,
-                    height=int(BUTTON_SIZE * TRIPLET_ROW_HEIGHT_FRAC),
-                    fg_color=button_color,
-                    hover_color=button_color_hover,
-                )
-                button.configure(command=functools.partial(on_button_click, button))
-                button.enabled = False
-                button.is_even = is_even
-                button.track = track
-                button.beat = beat
-                button.division = 1
-                button.button_index = i
-                button.timing_index = get_timing_index(1, i)
-                button.grid(row=1, column=i, padx=BUTTON_PAD_X, pady=BUTTON_PAD_Y)
-
-                all_buttons[
-                    (button.track, button.beat, button.division, button.button_index)
-                ] = button
+        label.grid(row=0, column=2, sticky="w", padx=5)
 
-    app_state.all_buttons = all_buttons
+    app_state.grid = step_grid
     app_state.all_play_sound_buttons = all_play_sound_buttons
     app_state.all_name_labels = all_name_labels
 
     # Add save/load buttons row
     save_load_frame = CTkFrame(main_frame, fg_color=STYLE["bkg_color"])
-    save_load_frame.grid(row=N_TRACKS, column=0, sticky="ew", pady=10)
+    save_load_frame.grid(row=2, column=0, sticky="ew", pady=10)
 
     # Save project button
     save_project_button = CTkButton(
@@ -300,6 +260,6 @@ def add_layout(app):
         width=120,
         fg_color=STYLE["btn_color_dark"],
         hover_color=STYLE["btn_color_dark_hover"],
-        command=lambda: on_load_project(all_buttons),
+        command=on_load_project,
     )
     load_project_button.grid(row=0, column=2, padx=50, pady=10)
@@ -1,3 +1,4 @@
+import functools
 from pathlib import Path
 
 # Before importing customtkinter, ensure tkinter is available
@@ -6,17 +7,23 @@ check_tkinter()
 
 import customtkinter
 
-from cadence.api.functions import load_project
+from cadence.api.functions import load_arrangement, load_project
+from cadence.ui.callbacks import on_close
 from cadence.ui.layout import add_layout
 from cadence.ui.state import app_state
+from cadence.ui.ui_constants import N_MEASURES, N_TRACKS
 
 
-def create_app(project_path: Path = None) -> customtkinter.CTk:
+def create_app(
+    project_path: Path = None, n_tracks: int = N_TRACKS, n_measures: int = N_MEASURES
+) -> customtkinter.CTk:
     """
     Create and configure the main application window.
 
     Args:
         project_path (Path, optional): Path to a .cadence project file to load. Defaults to None.
+        n_tracks (int, optional): Number of tracks. Defaults to N_TRACKS.
+        n_measures (int, optional): Number of measures in the step grid. Defaults to N_MEASURES.
 
     Returns:
         (customtkinter.CTk): The configured application window.
@@ -25,30 +32,39 @@ def create_app(project_path: Path = None) -> customtkinter.CTk:
     # Create a customtkinter window
     app = customtkinter.CTk()
     app.title("Cadence")
+    # Close the audio streams before the window goes away
+    app.protocol("WM_DELETE_WINDOW", functools.partial(on_close, app))
 
     # Create layout
-    add_layout(app)
+    add_layout(app, n_tracks=n_tracks, n_measures=n_measures)
 
     # Load project if provided
     if project_path:
         tracks, config = load_project(project_path)
 
+        app_state.arrangement = load_arrangement(project_path)
         app_state.set_config(config)
         app_state.set_tracks(tracks)
 
     return app
 
 
-def run(project_path: Path = None):
+def run(
+    project_path: Path = None, n_tracks: int = N_TRACKS, n_measures: int = N_MEASURES
+):
     """
     Run the Cadence application.
 
     Args:
         project_path (Path, optional): Path to a .cadence project file to load. Defaults to None.
+        n_tracks (int, optional): Number of tracks. Defaults to N_TRACKS.
+        n_measures (int, optional): Number of measures in the step grid. Defaults to N_MEASURES.
 
     Returns: None
     """
-    app = create_app(project_path=project_path)
+    app = create_app(
+        project_path=project_path, n_tracks=n_tracks, n_measures=n_measures
+    )
     app.mainloop()
 
 
@@ -1,21 +1,28 @@
 # Class to capture current state of UI in terms of what should be played
 
-from collections import defaultdict
 from pathlib import Path
+from typing import Callable
 
 from customtkinter import CTkButton, CTkEntry
 
 from cadence.api.track import Track
 from cadence.api.config import Config
-from cadence.api.functions import play, save_project, stop, save_sound
+from cadence.api.functions import load_arrangement, save_project, stop, save_sound
+from cadence.api.audition import AuditionMixer
+from cadence.api.player import LoopPlayer
+from cadence.api.prerender import Prerenderer
+from cadence.api.song import Arrangement
+from cadence.ui.grid import Cell, StepGrid
 from cadence.ui.utils import (
-    update_button_state_from_tracks,
+    get_timing_index,
     update_config_from_config_ui,
     update_config_ui_from_config,
+    update_grid_from_tracks,
     update_tracks_from_track_ui,
     update_track_ui_from_tracks,
 )
 from cadence.api.constants import TIMING_UNITS_PER_BEAT
+from cadence.ui.ui_constants import DIVS_PER_BEAT_UPPER
 
 
 class State:
@@ -26,19 +33,29 @@ class State:
     ):
         self.tracks: list[Track] = tracks or []
         self.config: Config = config
+        # Song arrangement of the loaded project, kept when it is saved
+        self.arrangement: Arrangement | None = None
+        self.player = LoopPlayer()
+        # Keeps a render of the latest edit ready for play()
+        self.prerenderer = Prerenderer()
+        # Plays the sounds previewed with the tracks' play sound buttons
+        self.audition = AuditionMixer()
 
         # UI elements to be set later
-        self.all_buttons: dict[tuple[int, int, int], CTkButton] = {}
+        self.grid: StepGrid = None
         self.all_play_sound_buttons: list[CTkButton] = []
         self.all_name_labels: list[CTkEntry] = []
         self.bpm_entry: CTkEntry = None
         self.repeat_entry: CTkEntry = None
+        # Pending Tk after() call of the playhead polling loop, while playing
+        self.playhead_job: str = None
 
     def set_tracks(self, tracks: list[Track]):
         """
         Sets State.tracks to the provided tracks.
         Track timings may be empty lists; they can be updated later
-        with the update_tracks() method.
+        with the toggle_cell() method. Only the grid cells whose state
+        changes are redrawn, and the tracks' sounds are preloaded for preview.
 
         Args:
             tracks (list[Track]): A list of Track objects to initialize the state with.
@@ -46,10 +63,14 @@ class State:
         Returns: None
         """
         self.tracks = tracks
-        update_button_state_from_tracks(self.all_buttons, self.tracks)
+        update_grid_from_tracks(self.grid, self.tracks)
         update_track_ui_from_tracks(
             self.all_play_sound_buttons, self.all_name_labels, self.tracks
         )
+        for track in self.tracks:
+            if track.path and Path(track.path).exists():
+                self.audition.load(track.path)
+        self.refresh_playback()
 
     def set_config(self, config: Config):
         """
@@ -63,53 +84,60 @@ class State:
         self.config = config
         update_config_ui_from_config(self.bpm_entry, self.repeat_entry, self.config)
 
-    def update_track_timings(self):
+    def toggle_cell(self, cell: Cell, enabled: bool):
         """
-        Updates State.tracks with the correct data based on the current state of the buttons.
+        Adds or removes the hit of a grid cell in State.tracks.
+
+        Only the cell's track is updated, with a sorted insert or delete, so
+        the cost of a click does not depend on the size of the grid.
+
+        Args:
+            cell (Cell): The (track, beat, division, button index) of the cell.
+            enabled (bool): True to add the hit, False to remove it.
 
         Returns: None
         """
-        timings = defaultdict(list)
-
-        for btn in self.all_buttons.values():
-            if btn.enabled:
-                timings[btn.track].append(
-                    btn.beat * TIMING_UNITS_PER_BEAT + btn.timing_index
-                )
-
-        new_n_tracks = max(timings.keys()) + 1 if timings else 0
-        existing_n_tracks = len(self.tracks)
-
-        for track_index in range(max(new_n_tracks, existing_n_tracks)):
-            if track_index >= len(self.tracks):
-                existing_track = Track()
-            else:
-                existing_track = self.tracks[track_index]
-            new_track = Track(
-                name=existing_track.name,
-                path=existing_track.path,
-                timing=sorted(timings[track_index]),
-                attack=existing_track.attack,
-                volume=existing_track.volume,
-            )
-            if track_index >= len(self.tracks):
-                self.tracks.append(new_track)
-            else:
-                self.tracks[track_index] = new_track
+        track_index, beat, division, button_index = cell
+        tick = beat * TIMING_UNITS_PER_BEAT + get_timing_index(division, button_index)
+        while track_index >= len(self.tracks):
+            self.tracks.append(Track())
+        track = self.tracks[track_index]
+        if enabled:
+            timing = track.timing.insert(tick)
+        else:
+            timing = track.timing.remove(tick)
+        self.tracks[track_index] = track._replace(timing=timing)
 
     def stop(self):
         """
         Stops any currently playing sound.
+
+        Sound previews (see State.audition) play on their own stream and are
+        left to ring, so starting playback does not cut them off.
         """
+        self.player.stop()
         stop()
 
-    def play(self, wait: bool = False):
+    def close(self):
+        """
+        Stops all sound and closes the output streams, before the app exits.
+
+        Returns: None
+        """
+        self.stop()
+        self.audition.close()
+
+    def play(self, on_finished: Callable[[], None] = None):
         """
         Plays the current state of the tracks.
 
+        Playback starts from the background render of the latest edit if it
+        is ready, and renders the tracks first otherwise. Edits made while
+        playing are picked up at the next pattern boundary (see refresh_playback()).
+
         Args:
-            wait (bool): If True, block until playback is finished.
-                (default: False)
+            on_finished (Callable): Called when playback reaches the end.
+                (default: None)
 
         Returns: None
         """
@@ -117,7 +145,52 @@ class State:
         self.config = update_config_from_config_ui(
             self.bpm_entry, self.repeat_entry, self.config
         )
-        play(self.tracks, self.config, wait=wait)
+        self.player.play(
+            self.tracks,
+            self.config,
+            on_finished=on_finished,
+            loop=self.prerenderer.get(self.tracks, self.config),
+        )
+
+    def update_playhead(self):
+        """
+        Highlights the step being played in the grid, or nothing if stopped.
+
+        Returns: None
+        """
+        position = self.player.position()
+        if (
+            position is None
+            or position.pattern_frame is None
+            or position.beat_length is None
+        ):
+            self.grid.set_playhead(None)
+            return
+        # Use the tempo of the pattern being heard, which an edit of the BPM
+        # entry only replaces at the next pattern boundary
+        beat, offset = divmod(position.pattern_frame, position.beat_length)
+        index = offset * DIVS_PER_BEAT_UPPER // position.beat_length
+        self.grid.set_playhead((beat, index))
+
+    def refresh_playback(self, read_config: bool = False):
+        """
+        Sends the current tracks and config to the player, if it is playing;
+        the change is heard from the next pattern boundary. They are also
+        rendered in the background, so that the next play() starts at once.
+
+        Args:
+            read_config (bool): If True, update State.config from the config
+                entries first. (default: False)
+
+        Returns: None
+        """
+        if read_config:
+            self.config = update_config_from_config_ui(
+                self.bpm_entry, self.repeat_entry, self.config
+            )
+        if self.player.playing:
+            self.player.update(self.tracks, self.config)
+        self.prerenderer.request(self.tracks, self.config)
 
     def save_sound(self, file_path: Path):
         """
@@ -139,7 +212,8 @@ class State:
     def save_project(self, file_path: Path):
         """
         Saves the current state of the tracks and config to a folder containing
-        a JSON file and all individual sound files.
+        a JSON file and all individual sound files. An existing project at
+        file_path is updated in place.
 
         Args:
             file_path (Path): The path to the folder to save.
@@ -152,7 +226,19 @@ class State:
         self.config = update_config_from_config_ui(
             self.bpm_entry, self.repeat_entry, self.config
         )
-        save_project(file_path, self.tracks, self.config)
+        # Point the tracks at the saved sounds, as sounds that are no longer
+        # used by the project are removed when it is overwritten
+        self.set_tracks(
+            save_project(
+                file_path,
+                self.tracks,
+                self.config,
+                overwrite=True,
+                arrangement=self.arrangement,
+            )
+        )
+        if self.arrangement is not None:
+            self.arrangement = load_arrangement(file_path)
 
 
 app_state = State()  # Initialize the application state
@@ -21,8 +21,17 @@ UI_DEFAULT_BPM = 120
 UI_MAX_REPEATS = 100
 UI_DEFAULT_REPEATS = 4
 
+# Layout of the track area
+TRACK_CONTROLS_WIDTH = 240  # Width of the controls to the left of each track
+GRID_VIEW_WIDTH = 960  # Width of the visible part of the step grid
+GRID_VIEW_TRACKS = 8  # Maximum number of tracks visible without scrolling
+PLAYHEAD_POLL_MS = 15  # Interval between playhead updates while playing
+
 # Derived constants
 N_BEATS = N_MEASURES * BEATS_PER_MEASURE
+TRACK_ROW_HEIGHT = (
+    BUTTON_SIZE + int(BUTTON_SIZE * TRIPLET_ROW_HEIGHT_FRAC) + 4 * BUTTON_PAD_Y + 2
+)
 
 # Style constants
 STYLE = {
@@ -34,6 +43,7 @@ STYLE = {
     "btn_color_disabled": "#46596C",  # Darker blue
     "btn_text_color": "#FFFFFF",
     "btn_color_selected": "#FFFFFF",
+    "playhead_color": "#F5A623",  # Orange
     "lbl_text_color": "#FFFFFF",
     "lbl_text_color_inactive": "#777777",
     # "track_entry_border_color": "#363636",
@@ -43,4 +53,4 @@ STYLE = {
 
 # Default labels
 DEFAULT_FILE_LABEL = "(no file)"
-DEFAULT_TRACK_LABELS = [f"Track {i + 1}" for i in range(N_TRACKS)]
+DEFAULT_TRACK_LABEL = "Track {}"  # Formatted with the track number
@@ -1,10 +1,14 @@
+from math import ceil
+
 from customtkinter import CTkButton, CTkEntry
 
 from cadence.api.constants import TIMING_UNITS_PER_BEAT
 from cadence.api.track import Track
 from cadence.api.config import Config
+from cadence.ui.grid import StepGrid
 from cadence.ui.ui_constants import (
-    DEFAULT_TRACK_LABELS,
+    BEATS_PER_MEASURE,
+    DEFAULT_TRACK_LABEL,
     DIVS_PER_BEAT_UPPER,
     DIVS_PER_BEAT_LOWER,
     STYLE,
@@ -63,42 +67,25 @@ def get_button_info(timing: int) -> tuple[int, int, int]:
         return beat, division, btn_index
 
 
-def update_button_state_from_tracks(
-    all_buttons: dict[tuple[int, int, int, int], CTkButton],
-    tracks: list[Track],
-):
+def update_grid_from_tracks(grid: StepGrid, tracks: list[Track]):
     """
-    Update the state of buttons based on the provided tracks.
+    Update the enabled cells of the step grid based on the provided tracks.
+
+    The grid is widened (in whole measures) if the tracks have hits past its end.
 
     Args:
-        all_buttons (dict[tuple[int, int, int, int], CTkButton]): Dictionary of buttons to update.
+        grid (StepGrid): The step grid to update.
         tracks (list[Track]): List of Track objects defining the sounds and their timings.
 
     Returns: None
     """
-    # First, disable all buttons
-    for button in all_buttons.values():
-        button.enabled = False
-        if button.is_even:
-            button.configure(fg_color=STYLE["btn_color_light"])
-            button.configure(hover_color=STYLE["btn_color_light_hover"])
-        else:
-            button.configure(fg_color=STYLE["btn_color_dark"])
-            button.configure(hover_color=STYLE["btn_color_dark_hover"])
-
-    # Enable buttons based on tracks
-    for i, track in enumerate(tracks):
-        for t in track.timing:
-            beat, division, btn_index = get_button_info(t)
-            btn_to_enable = all_buttons[(i, beat, division, btn_index)]
-
-            btn_to_enable.enabled = True
-            if btn_to_enable.is_even:
-                btn_to_enable.configure(fg_color=STYLE["btn_color_selected"])
-                btn_to_enable.configure(hover_color=STYLE["btn_color_selected"])
-            else:
-                btn_to_enable.configure(fg_color=STYLE["btn_color_selected"])
-                btn_to_enable.configure(hover_color=STYLE["btn_color_selected"])
+    cells = {
+        (i, *get_button_info(t)) for i, track in enumerate(tracks) for t in track.timing
+    }
+    n_beats = max([cell[1] + 1 for cell in cells], default=0)
+    if n_beats > grid.n_beats:
+        grid.resize(n_beats=ceil(n_beats / BEATS_PER_MEASURE) * BEATS_PER_MEASURE)
+    grid.set_enabled(cells)
 
 
 def update_track_ui_from_tracks(
@@ -142,7 +129,7 @@ def update_track_ui_from_tracks(
             else:
                 name_label.configure(text_color=STYLE["lbl_text_color_inactive"])
         else:
-            # name_label.configure(text=DEFAULT_TRACK_LABELS[i])
+            # name_label.configure(text=DEFAULT_TRACK_LABEL.format(i + 1))
             name_label.configure(text_color=STYLE["lbl_text_color_inactive"])
 
         # Update file label
@@ -185,7 +172,7 @@ def update_tracks_from_track_ui(
         if name_label and name_label.cget("textvariable").get():
             new_name = name_label.get()
         else:
-            new_name = DEFAULT_TRACK_LABELS[i]
+            new_name = DEFAULT_TRACK_LABEL.format(i + 1)
 
         # Update track path
         if play_sound_btn and play_sound_btn.path:
@@ -0,0 +1,158 @@
+import itertools
+import os
+from math import ceil
+from pathlib import Path
+
+import numpy as np
+import pytest
+import scipy.io.wavfile as wav
+
+from cadence.api.cache import sample_cache
+from cadence.api.config import Config
+from cadence.api.constants import MASTER_VOLUME, TIMING_UNITS_PER_BEAT
+from cadence.api.track import Track
+
+SOUNDS_PATH = Path(__file__).parent.parent / "sounds"
+
+
+@pytest.fixture(autouse=True)
+def clear_sample_cache():
+    """Start every test with an empty process-wide sample cache."""
+    sample_cache.invalidate()
+    yield
+    sample_cache.invalidate()
+
+
+def write_sound(
+    file_path: Path, data: np.ndarray, sample_rate: int = 44100, bump: bool = False
+) -> Path:
+    """
+    Write a WAV file for a test.
+
+    Args:
+        file_path (Path): The path to the WAV file.
+        data (np.ndarray): The audio, e.g. float32 of shape (n_frames,) or
+            (n_frames, n_channels).
+        sample_rate (int): The sample rate. Defaults to 44100.
+        bump (bool): If True, move the file's mtime forward a second, so that
+            rewriting a file is seen as a change however coarse the filesystem
+            timestamps are. Defaults to False.
+
+    Returns:
+        Path: file_path
+    """
+    wav.write(file_path, sample_rate, data)
+    if bump:
+        stat = file_path.stat()
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    return file_path
+
+
+def ramp(n_frames: int, scale: float = 1.0) -> np.ndarray:
+    """Return a mono float32 ramp, which normalization can't make constant."""
+    return (np.linspace(-1.0, 1.0, n_frames) * scale).astype(np.float32)
+
+
+def noise(n_frames: int, n_channels: int = 1, seed: int = 0) -> np.ndarray:
+    """Return float32 noise of shape (n_frames, n_channels) that decays to 0."""
+    rng = np.random.default_rng(seed)
+    envelope = np.linspace(1.0, 0.0, n_frames)[:, np.newaxis]
+    return (rng.uniform(-1, 1, (n_frames, n_channels)) * envelope).astype(np.float32)
+
+
+@pytest.fixture
+def make_tracks(tmp_path):
+    """
+    Build tracks with synthetic sounds, all at 44100 Hz with the same channels.
+
+    Call it with a (timing, n_frames) or (timing, n_frames, fields) tuple per
+    track, where fields holds more Track fields (e.g. attack), and optionally
+    n_channels.
+    """
+
+    # Numbers the sounds of all calls, so that each gets its own file and noise
+    counter = itertools.count()
+
+    def _make_tracks(*specs, n_channels: int = 1) -> list[Track]:
+        tracks = []
+        for timing, n_frames, *rest in specs:
+            fields = rest[0] if rest else {}
+            i = next(counter)
+            data = noise(n_frames, n_channels, seed=i)
+            path = write_sound(tmp_path / f"sound{i}.wav", data)
+            tracks.append(Track(f"sound{i}", str(path), timing, **fields))
+        return tracks
+
+    return _make_tracks
+
+
+def reference_hits(
+    tracks: list[Track], config: Config
+) -> tuple[list[tuple[int, np.ndarray]], int]:
+    """
+    Place the hits of a pattern, in float64.
+
+    Returns:
+        list[tuple[int, np.ndarray]]: (start frame, sound scaled by volume and
+        velocity) of each hit of a single repeat.
+        int: The length of the pattern in frames.
+    """
+    tracks = [track for track in tracks if track.path is not None]
+    sounds = [wav.read(track.path) for track in tracks]
+    sample_rate = sounds[0][0]
+    sounds = [data.reshape(len(data), -1).astype(np.float64) for _, data in sounds]
+
+    units_per_measure = TIMING_UNITS_PER_BEAT * config.beats_per_measure
+    if config.measures:
+        n_measures = config.measures
+    else:
+        max_timing = max(max(track.timing, default=0) for track in tracks)
+        n_measures = ceil((max_timing + 1) / units_per_measure)
+    samples_per_beat = int((60 / config.bpm) * sample_rate)
+    samples_per_timing_unit = samples_per_beat / TIMING_UNITS_PER_BEAT
+    length = n_measures * config.beats_per_measure * samples_per_beat
+
+    hits = []
+    for track, sound in zip(tracks, sounds):
+        velocity = track.timing.velocity
+        for i, tick in enumerate(track.timing):
+            if tick >= n_measures * units_per_measure:
+                continue
+            start = int(tick * samples_per_timing_unit) - int(
+                track.attack * sample_rate
+            )
+            gain = track.volume * (1.0 if velocity is None else float(velocity[i]))
+            hits.append((start, sound * gain))
+    return hits, length
+
+
+def reference_mix(hits: list[tuple[int, np.ndarray]], n_frames: int) -> np.ndarray:
+    """
+    Add hits to a timeline of at least n_frames, cutting off audio before 0,
+    and normalize it to MASTER_VOLUME.
+    """
+    n_frames = max([n_frames] + [start + len(sound) for start, sound in hits])
+    out = np.zeros((n_frames, hits[0][1].shape[1]))
+    for start, sound in hits:
+        clip = max(0, -start)
+        out[start + clip : start + len(sound)] += sound[clip:]
+    peak = np.max(np.abs(out), initial=0)
+    return out / peak * MASTER_VOLUME if peak else out
+
+
+def reference_sequence(tracks: list[Track], config: Config) -> np.ndarray:
+    """
+    Mix a sequence hit by hit, in float64, as the rendering engine should.
+
+    Every repeat of every hit is added to a timeline holding all repeats and
+    the tail that rings out after the last one; hits before the start are cut
+    off. The result is normalized to MASTER_VOLUME. All sounds must share a
+    sample rate and number of channels.
+    """
+    hits, length = reference_hits(tracks, config)
+    repeated = [
+        (start + repeat * length, sound)
+        for repeat in range(config.repeat)
+        for start, sound in hits
+    ]
+    return reference_mix(repeated, length * config.repeat)
@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+from conftest import noise, ramp, write_sound
+
+from cadence.api import audition
+from cadence.api.audition import AuditionMixer
+from cadence.api.constants import MASTER_VOLUME
+from cadence.api.output import NullBackend
+from cadence.api.samples import read_float32
+
+
+class RecordingBackend(NullBackend):
+    """Opens streams whose callback is pulled by the test, one block at a time."""
+
+    def __init__(self):
+        super().__init__()
+        self.streams = []
+
+    def open_stream(
+        self, sample_rate, n_channels, blocksize=None, callback=None, **kwargs
+    ):
+        stream = ManualStream(sample_rate, n_channels, blocksize, callback)
+        self.streams.append(stream)
+        return stream
+
+
+class ManualStream:
+    def __init__(self, sample_rate, n_channels, blocksize, callback):
+        self.samplerate = sample_rate
+        self.channels = n_channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.started = self.closed = False
+
+    def start(self):
+        self.started = True
+
+    def abort(self):
+        self.started = False
+
+    def close(self):
+        self.closed = True
+
+    def pull(self, n_blocks=1):
+        blocks = []
+        for _ in range(n_blocks):
+            out = np.empty((self.blocksize, self.channels), dtype=np.float32)
+            self.callback(out, self.blocksize, None, None)
+            blocks.append(out)
+        return np.concatenate(blocks)
+
+
+def normalized(path):
+    """Read a mono sound as the mixer plays it, normalized to MASTER_VOLUME."""
+    data = read_float32(path)[1].reshape(-1, 1)
+    return data * np.float32(MASTER_VOLUME / np.max(np.abs(data)))
+
+
+@pytest.fixture
+def backend():
+    return RecordingBackend()
+
+
+@pytest.fixture
+def mixer(backend):
+    mixer = AuditionMixer(
+        sample_rate=44100, n_channels=1, blocksize=64, max_voices=2, backend=backend
+    )
+    yield mixer
+    mixer.close()
+
+
+@pytest.fixture
+def sounds(tmp_path):
+    return [
+        write_sound(tmp_path / "a.wav", ramp(100, 0.5)),
+        write_sound(tmp_path / "b.wav", noise(150, seed=1)[:, 0] * np.float32(0.25)),
+        write_sound(tmp_path / "c.wav", noise(400, seed=2)[:, 0]),
+    ]
+
+
+def test_load_normalizes_and_caches(mixer, sounds):
+    loaded = mixer.load(sounds[0])
+    assert loaded.shape == (100, 1)
+    assert np.max(np.abs(loaded)) == pytest.approx(MASTER_VOLUME)
+    assert mixer.load(sounds[0]) is loaded
+
+
+def test_load_sees_edits(mixer, sounds):
+    loaded = mixer.load(sounds[0])
+    write_sound(sounds[0], ramp(100)[::-1].copy(), bump=True)
+    np.testing.assert_allclose(
+        mixer.load(sounds[0])[:, 0], ramp(100)[::-1] * MASTER_VOLUME, rtol=1e-6
+    )
+    assert loaded[0, 0] == pytest.approx(-MASTER_VOLUME)
+
+
+def test_preloaded_sounds_are_not_read_again(mixer, sounds, monkeypatch):
+    mixer.load(sounds[0])
+
+    def _read_conformed(*args):
+        raise AssertionError("read again")
+
+    monkeypatch.setattr(audition, "read_conformed", _read_conformed)
+    mixer.trigger(sounds[0])
+
+
+def test_the_stream_opens_once(mixer, backend, sounds):
+    assert backend.streams == []
+    mixer.trigger(sounds[0])
+    mixer.trigger(sounds[1])
+    assert len(backend.streams) == 1
+    assert backend.streams[0].started
+
+    mixer.close()
+    assert backend.streams[0].closed
+
+
+def test_previews_mix_over_each_other(mixer, backend, sounds):
+    mixer.trigger(sounds[0])
+    mixer.trigger(sounds[1])
+    out = backend.streams[0].pull(4)
+
+    expected = np.zeros((256, 1), dtype=np.float32)
+    expected[:100] += normalized(sounds[0])
+    expected[:150] += normalized(sounds[1])
+    np.testing.assert_allclose(out, np.clip(expected, -1, 1), atol=1e-7)
+
+
+def test_a_preview_starts_at_the_next_block(mixer, backend, sounds):
+    mixer.trigger(sounds[2])
+    stream = backend.streams[0]
+    first = stream.pull()
+    mixer.trigger(sounds[0])
+    second = stream.pull()
+
+    loaded = [normalized(sounds[2]), normalized(sounds[0])]
+    np.testing.assert_allclose(first, loaded[0][:64], atol=1e-7)
+    np.testing.assert_allclose(
+        second, np.clip(loaded[0][64:128] + loaded[1][:64], -1, 1), atol=1e-7
+    )
+
+
+def test_the_longest_playing_preview_is_replaced(mixer, backend, sounds):
+    mixer.trigger(sounds[2])
+    stream = backend.streams[0]
+    stream.pull()
+    mixer.trigger(sounds[2])
+    stream.pull()
+    mixer.trigger(sounds[0])  # No free voice: replaces the first preview
+    out = stream.pull()
+
+    loaded = [normalized(sounds[2]), normalized(sounds[0])]
+    expected = loaded[0][64:128] + loaded[1][:64]
+    np.testing.assert_allclose(out, np.clip(expected, -1, 1), atol=1e-7)
+
+
+def test_stop_silences_previews(mixer, backend, sounds):
+    mixer.trigger(sounds[2])
+    stream = backend.streams[0]
+    stream.pull()
+    mixer.stop()
+    assert not stream.pull().any()
+    assert not stream.closed
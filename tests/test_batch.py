@@ -0,0 +1,113 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import scipy.io.wavfile as wav
+
+from cadence.api.batch import expand_project_paths, render_projects, summarize
+from cadence.api.config import Config
+from cadence.api.functions import save_project, sequence
+from cadence.cli import cli
+
+CONFIG = Config(bpm=240, repeat=2)
+
+
+@pytest.fixture
+def projects(tmp_path, make_tracks):
+    """Three projects, two of which share a sample."""
+    tracks = make_tracks(([0, 12], 1000), ([6], 2000), ([3, 9], 1500))
+    paths = []
+    for i, project_tracks in enumerate([tracks[:2], tracks[1:], tracks[2:]]):
+        path = tmp_path / "projects" / f"song{i}.cadence"
+        save_project(path, project_tracks, CONFIG)
+        paths.append(path)
+    return paths, [tracks[:2], tracks[1:], tracks[2:]]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_render_projects(tmp_path, projects, jobs):
+    paths, tracks = projects
+    results = list(render_projects(paths, tmp_path / "out", jobs=jobs))
+
+    assert sorted(result.project_path for result in results) == sorted(map(str, paths))
+    for path, project_tracks in zip(paths, tracks):
+        (result,) = [r for r in results if r.project_path == str(path)]
+        assert result.error is None
+        assert result.output_path == str(tmp_path / "out" / f"{path.stem}.wav")
+        sample_rate, audio = wav.read(result.output_path)
+        expected, expected_rate = sequence(project_tracks, CONFIG)
+        assert sample_rate == expected_rate
+        np.testing.assert_allclose(audio.reshape(expected.shape), expected, atol=1e-6)
+        assert result.stats.n_frames == len(expected)
+
+
+def test_failures_are_reported_per_project(tmp_path, projects):
+    paths, _ = projects
+    missing = tmp_path / "missing.cadence"
+    results = list(render_projects([missing, paths[0]], tmp_path / "out", jobs=1))
+
+    by_path = {result.project_path: result for result in results}
+    assert by_path[str(missing)].error is not None
+    assert by_path[str(missing)].stats is None
+    assert by_path[str(paths[0])].error is None
+
+    summary = summarize(results, 0.0)
+    assert (summary.n_projects, summary.n_failed) == (1, 1)
+    assert summary.audio_seconds == by_path[str(paths[0])].stats.audio_seconds
+
+
+def test_output_names_must_be_unique(tmp_path, projects):
+    paths, _ = projects
+    other = tmp_path / "other" / paths[0].name
+    with pytest.raises(AssertionError):
+        list(render_projects([paths[0], other], tmp_path / "out"))
+
+
+def test_expand_project_paths(tmp_path, projects):
+    paths, _ = projects
+    pattern = str(tmp_path / "projects" / "*.cadence")
+    assert expand_project_paths([str(paths[1]), pattern]) == [
+        paths[1],
+        paths[0],
+        paths[2],
+    ]
+    # Patterns that match nothing are kept, so that they are reported
+    assert expand_project_paths(["no/such/*.cadence"]) == [Path("no/such/*.cadence")]
+
+
+def test_render_command(tmp_path, projects, monkeypatch, capsys):
+    paths, _ = projects
+    out_dir = tmp_path / "out"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "cadence",
+            "render",
+            str(tmp_path / "projects" / "*.cadence"),
+            "-o",
+            str(out_dir),
+            "-j",
+            "1",
+            "--format",
+            "int16",
+        ],
+    )
+    cli.main()
+
+    assert sorted(p.name for p in out_dir.iterdir()) == [f"{p.stem}.wav" for p in paths]
+    assert wav.read(out_dir / "song0.wav")[1].dtype == np.int16
+    assert "Rendered 3 project(s)" in capsys.readouterr().out
+
+
+def test_render_command_fails_if_a_project_fails(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["cadence", "render", str(tmp_path / "missing.cadence"), "-o", str(tmp_path)],
+    )
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main()
+    assert exc_info.value.code == 1
+    assert "FAILED" in capsys.readouterr().out
@@ -0,0 +1,88 @@
+import json
+import sys
+
+import pytest
+import scipy.io.wavfile as wav
+
+from cadence.api.constants import TIMING_UNITS_PER_BEAT
+from cadence.bench.bench import (
+    DEFAULT_CASES,
+    QUICK_CASES,
+    BenchCase,
+    make_project,
+    run_benchmarks,
+)
+from cadence.cli import cli
+
+TINY_CASE = BenchCase("tiny", n_tracks=2, hits_per_measure=4, sample_seconds=0.05)
+
+STAGES = {
+    "save_project",
+    "load_project",
+    "sequence_cold",
+    "sequence",
+    "sequence_parallel",
+    "sequence_cached",
+    "sequence_edit",
+    "save_sound",
+}
+
+
+def test_make_project(tmp_path):
+    tracks, config = make_project(TINY_CASE, tmp_path)
+
+    assert len(tracks) == TINY_CASE.n_tracks
+    assert (config.bpm, config.repeat) == (TINY_CASE.bpm, TINY_CASE.repeat)
+    units = TINY_CASE.measures * config.beats_per_measure * TIMING_UNITS_PER_BEAT
+    for track in tracks:
+        assert len(track.timing) == TINY_CASE.measures * TINY_CASE.hits_per_measure
+        assert all(0 <= t < units for t in track.timing)
+        sample_rate, data = wav.read(track.path)
+        assert data.shape == (int(TINY_CASE.sample_seconds * sample_rate), 2)
+
+
+def test_quick_cases_match_the_default_cases():
+    assert [case.name for case in QUICK_CASES] == [case.name for case in DEFAULT_CASES]
+    assert len({case.name for case in DEFAULT_CASES}) == len(DEFAULT_CASES)
+
+
+def test_run_benchmarks_reports_every_stage(tmp_path):
+    report = run_benchmarks([TINY_CASE], rounds=1, work_dir=tmp_path)
+
+    json.dumps(report)
+    assert report["rounds"] == 1
+    assert list(tmp_path.iterdir()) == []  # Temporary files are removed
+    (case,) = report["cases"]
+    assert case["name"] == "tiny"
+    assert case["params"] == TINY_CASE._asdict()
+    assert case["audio_seconds"] > 0
+    assert set(case["stages"]) == STAGES
+    for name, stage in case["stages"].items():
+        assert stage["seconds"] > 0
+        assert stage["peak_bytes"] > 0
+        if name.startswith(("sequence", "save_sound")):
+            assert stage["realtime_factor"] == pytest.approx(
+                case["audio_seconds"] / stage["seconds"]
+            )
+
+
+def test_bench_command(tmp_path, monkeypatch):
+    output = tmp_path / "report.json"
+    monkeypatch.setattr("cadence.bench.bench.DEFAULT_CASES", [TINY_CASE])
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["cadence", "bench", "--case", "tiny", "--rounds", "1", "-o", str(output)],
+    )
+    cli.main()
+
+    report = json.loads(output.read_text())
+    assert [case["name"] for case in report["cases"]] == ["tiny"]
+
+
+def test_bench_command_rejects_unknown_cases(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["cadence", "bench", "--case", "nope"])
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main()
+    assert exc_info.value.code == 1
+    assert "nope" in capsys.readouterr().out
@@ -0,0 +1,129 @@
+import threading
+
+import numpy as np
+import pytest
+from conftest import ramp, write_sound
+
+from cadence.api.cache import SampleCache, file_key, sample_cache
+from cadence.api.utils import read_wav
+
+
+def test_get_loads_once_and_counts_hits():
+    cache = SampleCache(1024)
+    calls = []
+
+    def load():
+        calls.append(1)
+        return np.zeros(8, dtype=np.float32)
+
+    first = cache.get(("a",), load)
+    second = cache.get(("a",), load)
+
+    assert first is second
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+    assert stats.size_bytes == 32
+
+
+def test_cached_arrays_are_read_only():
+    cache = SampleCache(1024)
+    value = cache.get(("a",), lambda: np.zeros(8))
+    with pytest.raises(ValueError):
+        value[0] = 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SampleCache(100)
+    cache.get(("a",), lambda: np.zeros(10, dtype=np.float32))
+    cache.get(("b",), lambda: np.zeros(10, dtype=np.float32))
+    cache.get(("a",), lambda: None)  # a is now the most recently used
+    cache.get(("c",), lambda: np.zeros(10, dtype=np.float32))
+
+    assert cache.peek(("a",)) is not None
+    assert cache.peek(("b",)) is None
+    assert cache.peek(("c",)) is not None
+    assert cache.stats().evictions == 1
+    assert cache.stats().size_bytes <= 100
+
+
+def test_values_larger_than_the_budget_are_not_cached():
+    cache = SampleCache(10)
+    value = cache.get(("a",), lambda: np.zeros(10, dtype=np.float32))
+    assert len(value) == 10
+    assert cache.stats().entries == 0
+
+
+def test_concurrent_lookups_share_one_load():
+    cache = SampleCache(1024)
+    started = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.wait(1)
+        return np.zeros(4)
+
+    threads = [
+        threading.Thread(target=cache.get, args=(("a",), load)) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+
+
+def test_file_key_changes_when_a_file_is_rewritten(tmp_path):
+    path = write_sound(tmp_path / "a.wav", ramp(100))
+    key = file_key(path)
+    write_sound(path, ramp(100, 0.5), bump=True)
+    assert file_key(path) != key
+
+
+def test_read_wav_returns_new_contents_after_an_edit(tmp_path):
+    path = write_sound(tmp_path / "a.wav", ramp(100))
+    _, before = read_wav(path)
+    write_sound(path, ramp(100, 0.5), bump=True)
+    _, after = read_wav(path)
+
+    np.testing.assert_array_equal(before, ramp(100))
+    np.testing.assert_array_equal(after, ramp(100, 0.5))
+
+
+def test_read_wav_decodes_identical_files_once(tmp_path):
+    a = write_sound(tmp_path / "a.wav", ramp(100))
+    b = write_sound(tmp_path / "b.wav", ramp(100))
+    assert read_wav(a)[1] is read_wav(b)[1]
+
+
+def test_invalidate_removes_the_entries_of_a_path(tmp_path):
+    path = write_sound(tmp_path / "a.wav", ramp(100))
+    read_wav(path)
+    assert sample_cache.stats().entries > 0
+
+    sample_cache.invalidate(path)
+    assert sample_cache.stats().entries == 0
+    assert sample_cache.stats().size_bytes == 0
+
+
+def test_invalidate_removes_content_entries_shared_with_other_paths(tmp_path):
+    a = write_sound(tmp_path / "a.wav", ramp(100))
+    b = write_sound(tmp_path / "b.wav", ramp(100))
+    _, decoded = read_wav(a)
+    assert read_wav(b)[1] is decoded
+
+    sample_cache.invalidate(a)
+    assert read_wav(b)[1] is not decoded
+
+
+def test_invalidate_keeps_the_entries_of_other_files(tmp_path):
+    a = write_sound(tmp_path / "a.wav", ramp(100))
+    b = write_sound(tmp_path / "b.wav", ramp(200))
+    read_wav(a)
+    _, decoded = read_wav(b)
+
+    sample_cache.invalidate(a)
+    assert read_wav(b)[1] is decoded
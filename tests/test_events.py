@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+import pytest
+
+from cadence.api.events import COMPACT_JSON_MIN_EVENTS, EventTable, HitIndex
+from cadence.api.track import Track
+
+
+def test_ticks_are_sorted_with_their_velocities():
+    table = EventTable([30, 10, 20], velocity=[0.3, 0.1, 0.2])
+    assert list(table) == [10, 20, 30]
+    np.testing.assert_allclose(table.velocity, [0.1, 0.2, 0.3])
+
+
+def test_tables_are_immutable():
+    table = EventTable([1, 2])
+    with pytest.raises(ValueError):
+        table.ticks[0] = 5
+
+
+def test_full_velocities_are_dropped():
+    assert EventTable([1, 2], velocity=[1.0, 1.0]).velocity is None
+
+
+def test_mismatched_velocities_are_rejected():
+    with pytest.raises(ValueError):
+        EventTable([1, 2], velocity=[0.5])
+
+
+def test_insert_keeps_ticks_sorted():
+    table = EventTable([0, 10, 20]).insert(15).insert(-5).insert(10)
+    assert table == [-5, 0, 10, 10, 15, 20]
+    assert table.velocity is None
+
+
+def test_insert_with_a_velocity():
+    table = EventTable([0, 20]).insert(10, 0.5)
+    np.testing.assert_allclose(table.velocity, [1.0, 0.5, 1.0])
+
+
+def test_remove():
+    table = EventTable([0, 10, 10, 20], velocity=[1.0, 0.5, 1.0, 1.0])
+    assert table.remove(10) == [0, 10, 20]
+    assert table.remove(10).remove(10).velocity is None
+    assert table.remove(5) is table
+
+
+def test_equal_tables_hash_equally():
+    a = EventTable([3, 1, 2])
+    b = EventTable([1, 2]).insert(3)
+    assert a == b
+    assert hash(a) == hash(b)
+    assert a.digest == b.digest
+    assert a.digest != EventTable([1, 2, 3], velocity=[1.0, 1.0, 0.5]).digest
+    assert {a: "cached"}[b] == "cached"
+
+
+@pytest.mark.parametrize("n_events", [3, COMPACT_JSON_MIN_EVENTS])
+@pytest.mark.parametrize("velocity", [False, True])
+def test_json_round_trip(n_events, velocity):
+    ticks = np.arange(n_events) * 3 + 7
+    table = EventTable(ticks, np.linspace(0.1, 1.0, n_events) if velocity else None)
+    data = json.loads(json.dumps(table.to_json()))
+
+    assert EventTable.from_json(data) == table
+    assert EventTable.coerce(data) == table
+    if n_events < COMPACT_JSON_MIN_EVENTS and not velocity:
+        assert data == ticks.tolist()  # As in older projects
+
+
+def test_unknown_json_encodings_are_rejected():
+    with pytest.raises(ValueError):
+        EventTable.from_json({"encoding": "zstd", "ticks": ""})
+
+
+def test_tracks_coerce_their_timing():
+    track = Track("kick", "kick.wav", [24, 0, 12])
+    assert isinstance(track.timing, EventTable)
+    assert track.timing == [0, 12, 24]
+
+
+def test_hit_index_query_matches_a_scan():
+    rng = np.random.default_rng(0)
+    starts = [rng.integers(-1000, 100000, 300), rng.integers(0, 100000, 50)]
+    velocities = [None, rng.random(50).astype(np.float32)]
+    lengths = [500, 4000]
+    index = HitIndex(starts, lengths, velocities)
+
+    for start, stop in [(-2000, 0), (0, 1000), (50000, 50100), (99000, 200000)]:
+        found, found_velocities = index.query(start, stop)
+        for i, (track_starts, length) in enumerate(zip(starts, lengths)):
+            audible = (track_starts < stop) & (track_starts + length > start)
+            np.testing.assert_array_equal(found[i], np.sort(track_starts[audible]))
+        assert found_velocities[0] is None
+        assert len(found_velocities[1]) == len(found[1])
+
+
+def test_hit_index_bounds():
+    index = HitIndex([np.array([5, -20]), np.array([], dtype=np.int64)], [100, 10])
+    assert index.first_frame == -20
+    assert index.end_frame == 105
+    assert HitIndex([], []).end_frame == 0
@@ -0,0 +1,208 @@
+import numpy as np
+import pytest
+from conftest import noise, reference_sequence
+
+from cadence.api import mixing
+from cadence.api.config import Config
+from cadence.api.functions import sequence
+from cadence.api.mixing import (
+    add_sound,
+    choose_mix_mode,
+    concatenate_sounds,
+    mix_convolve,
+    mix_direct,
+    mix_events,
+    mix_track,
+    resolve_mix_backend,
+)
+from cadence.api.samples import SampleBank, read_float32
+
+# Hits before, across and past the edges of a 2000-frame pattern
+STARTS = np.array([-500, -50, 0, 0, 333, 1200, 1900, 1999, 2500], dtype=np.int64)
+VELOCITY = np.linspace(0.2, 1.0, len(STARTS)).astype(np.float32)
+
+requires_numba = pytest.mark.skipif(mixing.numba is None, reason="numba not installed")
+
+
+def direct(sound, starts, velocity=None, n_frames=2000):
+    pattern = np.zeros((n_frames, sound.shape[1]), dtype=np.float32)
+    mix_direct(pattern, sound, starts, velocity)
+    return pattern
+
+
+@pytest.mark.parametrize("n_channels", [1, 2])
+@pytest.mark.parametrize("velocity", [None, VELOCITY])
+def test_convolve_matches_direct(n_channels, velocity):
+    sound = noise(300, n_channels)
+    pattern = np.zeros((2000, n_channels), dtype=np.float32)
+    mix_convolve(pattern, sound, STARTS, gain=1.0 if velocity is None else velocity)
+    np.testing.assert_allclose(pattern, direct(sound, STARTS, velocity), atol=1e-5)
+
+
+def test_convolve_with_no_audible_hits():
+    pattern = np.zeros((100, 1), dtype=np.float32)
+    mix_convolve(pattern, noise(10), np.array([-20, 200]))
+    assert not pattern.any()
+
+
+@pytest.mark.parametrize("mix_mode", ["direct", "convolve", "auto"])
+def test_mix_track_modes_agree(mix_mode):
+    sound = noise(300, 2)
+    pattern = np.zeros((2000, 2), dtype=np.float32)
+    mix_track(pattern, sound, STARTS, mix_mode=mix_mode, velocity=VELOCITY)
+    np.testing.assert_allclose(pattern, direct(sound, STARTS, VELOCITY), atol=1e-5)
+
+
+def test_mix_track_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        mix_track(np.zeros((10, 1), np.float32), noise(5), [0], mix_mode="fft")
+
+
+def test_choose_mix_mode_prefers_convolution_for_dense_tracks():
+    assert choose_mix_mode(2, 1000, 10**6) == "direct"
+    assert choose_mix_mode(5000, 10**5, 10**6) == "convolve"
+
+
+def test_sequence_mix_modes_agree(make_tracks):
+    tracks = make_tracks(
+        (list(range(0, 96, 3)), 4000),
+        ([5, 50], 9000, {"attack": 0.005}),
+        n_channels=2,
+    )
+    config = Config(bpm=200, repeat=2)
+    direct_audio, _ = sequence(tracks, config, mix_mode="direct")
+    convolved, _ = sequence(tracks, config, mix_mode="convolve")
+    np.testing.assert_allclose(convolved, direct_audio, atol=1e-5)
+
+
+@pytest.mark.parametrize(
+    ("start", "expected"),
+    [
+        (-2, [3, 4, 0, 0, 0, 0]),
+        (1, [0, 1, 2, 3, 4, 0]),
+        (3, [0, 0, 0, 1, 2, 3]),
+        (-4, [0, 0, 0, 0, 0, 0]),
+        (6, [0, 0, 0, 0, 0, 0]),
+    ],
+)
+def test_add_sound_clips_at_the_pattern_edges(start, expected):
+    pattern = np.zeros((6, 1), dtype=np.float32)
+    add_sound(pattern, np.arange(1, 5, dtype=np.float32)[:, np.newaxis], start)
+    np.testing.assert_array_equal(pattern[:, 0], expected)
+
+
+def test_add_sound_applies_a_gain_in_the_scratch_buffer():
+    pattern = np.ones((6, 1), dtype=np.float32)
+    sound = np.arange(1, 5, dtype=np.float32)[:, np.newaxis]
+    scratch = np.zeros_like(sound)
+    add_sound(pattern, sound, 3, gain=0.5, scratch=scratch)
+
+    np.testing.assert_array_equal(pattern[:, 0], [1, 1, 1, 1.5, 2, 2.5])
+    np.testing.assert_array_equal(scratch[:, 0], [0.5, 1, 1.5, 0])
+    np.testing.assert_array_equal(sound[:, 0], [1, 2, 3, 4])
+
+
+def test_sample_bank_applies_track_volumes(make_tracks):
+    tracks = make_tracks(([0], 100), ([0], 100, {"volume": 0.25}))
+    bank = SampleBank(tracks)
+
+    assert (bank.sample_rate, bank.n_channels) == (44100, 1)
+    for sound in bank.sounds:
+        assert sound.dtype == np.float32
+        assert sound.shape == (100, 1)
+    np.testing.assert_allclose(bank.sounds[1], read_float32(tracks[1].path)[1] * 0.25)
+
+
+def test_sample_bank_shares_the_sound_of_tracks_with_one_file(make_tracks):
+    track = make_tracks(([0], 100))[0]
+    bank = SampleBank([track, track._replace(timing=[5]), track._replace(volume=0.5)])
+
+    assert bank.sounds[0] is bank.sounds[1]
+    assert bank.sounds[2] is not bank.sounds[0]
+    assert all(source is bank.sources[0] for source in bank.sources)
+
+
+def test_preload_builds_the_arrays_of_a_backend(make_tracks):
+    bank = SampleBank(make_tracks(([0], 100), ([0], 200)))
+    bank.preload("numba")
+    assert "flat_sources" in vars(bank)
+    assert "sounds" not in vars(bank)
+    bank.preload()
+    assert "sounds" in vars(bank)
+
+
+def test_selected_banks_share_sounds(make_tracks):
+    bank = SampleBank(make_tracks(([0], 100), ([0], 200), ([0], 300)))
+    selected = bank.select([2, 0])
+
+    assert selected.sources[0] is bank.sources[2]
+    assert selected.sources[1] is bank.sources[0]
+    assert selected.volumes == [bank.volumes[2], bank.volumes[0]]
+
+
+def test_resolve_mix_backend(monkeypatch):
+    assert resolve_mix_backend("numpy") == "numpy"
+    with pytest.raises(ValueError):
+        resolve_mix_backend("cuda")
+
+    monkeypatch.setattr(mixing, "numba", None)
+    assert resolve_mix_backend("auto") == "numpy"
+    with pytest.raises(ImportError):
+        resolve_mix_backend("numba")
+
+
+@requires_numba
+@pytest.mark.parametrize("n_channels", [1, 2])
+def test_mix_events_matches_direct(n_channels):
+    sounds = [noise(300, n_channels), noise(700, n_channels, seed=1)]
+    pattern = np.zeros((2000, n_channels), dtype=np.float32)
+    mix_events(
+        pattern, [(sounds[0], STARTS, 0.5), (sounds[1], STARTS[::2], VELOCITY[::2])]
+    )
+
+    expected = direct(sounds[0] * np.float32(0.5), STARTS)
+    expected += direct(sounds[1], STARTS[::2], VELOCITY[::2])
+    np.testing.assert_allclose(pattern, expected, atol=1e-6)
+
+
+@requires_numba
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sequence_backends_agree(make_tracks, workers):
+    tracks = make_tracks(
+        (list(range(0, 96, 3)), 4000, {"volume": 0.7}),
+        ([5, 50], 9000, {"attack": 0.005}),
+        n_channels=2,
+    )
+    config = Config(bpm=200, repeat=2)
+    results = [
+        sequence(tracks, config, mix_mode=mode, mix_backend=backend, workers=workers)[0]
+        for mode, backend in [
+            ("direct", "numpy"),
+            ("convolve", "numpy"),
+            ("auto", "numba"),
+        ]
+    ]
+    for audio in results:
+        np.testing.assert_allclose(audio, reference_sequence(tracks, config), atol=1e-5)
+
+
+def test_concatenate_sounds_stores_each_array_once():
+    a, b = noise(3), noise(5, seed=1)
+    samples, offsets = concatenate_sounds([a, b, a])
+
+    assert offsets == [0, 3, 0]
+    np.testing.assert_array_equal(samples, np.concatenate([a, b]))
+    assert concatenate_sounds([a, a])[0] is a
+
+
+@requires_numba
+def test_mix_events_with_preconcatenated_sounds():
+    sounds = [noise(300), noise(700, seed=1)]
+    samples, offsets = concatenate_sounds(sounds)
+    tracks = [(sounds[0], STARTS, 1.0), (sounds[1], STARTS, 0.5)]
+
+    pattern = np.zeros((2000, 1), dtype=np.float32)
+    mix_events(pattern, tracks, samples=samples, offsets=offsets)
+    expected = np.zeros((2000, 1), dtype=np.float32)
+    mix_events(expected, tracks)
+    np.testing.assert_array_equal(pattern, expected)
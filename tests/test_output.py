@@ -0,0 +1,224 @@
+import sys
+import threading
+import types
+from typing import ClassVar
+
+import numpy as np
+import pytest
+import scipy.io.wavfile as wav
+from conftest import ramp, write_sound
+
+from cadence.api.config import Config
+from cadence.api.functions import play, play_sound_file, render_loop, sequence, stop
+from cadence.api.output import (
+    CallbackStop,
+    NullBackend,
+    SounddeviceBackend,
+    WavFileBackend,
+    get_output_backend,
+    make_output_backend,
+    set_output_backend,
+)
+
+
+@pytest.fixture
+def tracks(make_tracks):
+    return make_tracks(([0, 17, 45], 20000), ([0, 24], 3000), n_channels=2)
+
+
+def test_play_on_the_null_backend(tracks):
+    backend = NullBackend(blocksize=512)
+    play(tracks, Config(repeat=2), backend=backend)
+    assert backend.frames_played == len(sequence(tracks, Config(repeat=2))[0])
+
+
+@pytest.mark.parametrize("gain", [False, True])
+def test_play_to_a_wav_file(tmp_path, tracks, gain):
+    config = Config(repeat=2)
+    audio, _ = sequence(tracks, config)
+    backend = WavFileBackend(tmp_path / "out.wav")
+
+    gain = render_loop(tracks, config)[0].gain if gain else None
+    play(tracks, config, backend=backend, gain=gain)
+
+    sample_rate, data = wav.read(tmp_path / "out.wav")
+    assert sample_rate == 44100
+    np.testing.assert_allclose(data, audio, atol=1e-5)
+
+
+def test_play_sound_file(tmp_path):
+    path = write_sound(tmp_path / "a.wav", ramp(5000, 0.5))
+    backend = WavFileBackend(tmp_path / "out.wav")
+    play_sound_file(path, backend=backend)
+
+    _, data = wav.read(tmp_path / "out.wav")
+    np.testing.assert_allclose(data, ramp(5000), atol=1e-6)  # Normalized
+
+
+def test_stop_ends_playback(tracks):
+    backend = NullBackend(realtime=True)
+    play(tracks, Config(repeat=100), wait=False, backend=backend)
+    stop()
+    # The stream may take a block to notice; it never plays the whole sequence
+    threading.Event().wait(0.2)
+    assert backend.frames_played < 44100
+
+
+def test_callback_streams_run_until_callback_stop():
+    backend = NullBackend(blocksize=100)
+    blocks = []
+    finished = threading.Event()
+
+    def callback(outdata, frames, time_info, status):
+        outdata.fill(len(blocks))
+        blocks.append(time_info.currentTime)
+        if len(blocks) == 5:
+            raise CallbackStop
+
+    stream = backend.open_stream(
+        1000, 1, callback=callback, finished_callback=finished.set
+    )
+    stream.start()
+    assert finished.wait(5)
+    stream.close()
+
+    assert backend.frames_played == 500
+    assert blocks == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4])
+
+
+def test_the_wav_backend_writes_callback_streams(tmp_path):
+    backend = WavFileBackend(tmp_path / "out.wav", blocksize=10, sample_format="int16")
+    count = []
+
+    def callback(outdata, frames, time_info, status):
+        count.append(1)
+        outdata.fill(0.5)
+        if len(count) == 3:
+            raise CallbackStop
+
+    stream = backend.open_stream(8000, 2, callback=callback)
+    stream.start()
+    stream._thread.join(5)
+    stream.close()
+
+    sample_rate, data = wav.read(tmp_path / "out.wav")
+    assert sample_rate == 8000
+    assert data.shape == (30, 2)
+    assert np.all(data == round(0.5 * (2**15 - 1)))
+
+
+def test_make_output_backend(tmp_path):
+    assert isinstance(make_output_backend("null"), NullBackend)
+    assert isinstance(make_output_backend("sounddevice"), SounddeviceBackend)
+    backend = make_output_backend("wav", file_path=tmp_path / "x.wav", blocksize=64)
+    assert isinstance(backend, WavFileBackend)
+    assert backend.blocksize == 64
+    with pytest.raises(ValueError):
+        make_output_backend("wav")
+    with pytest.raises(ValueError):
+        make_output_backend("alsa")
+
+
+def test_set_output_backend_closes_the_previous_one(monkeypatch):
+    monkeypatch.setattr("cadence.api.output._output_backend", None)
+    closed = []
+    first, second = NullBackend(), NullBackend()
+    first.close = lambda: closed.append(first)
+
+    set_output_backend(first)
+    assert get_output_backend() is first
+    set_output_backend(second)
+    assert get_output_backend() is second
+    assert closed == [first]
+
+
+class FakeOutputStream:
+    """Records how a sounddevice.OutputStream is used."""
+
+    opened: ClassVar[list] = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.blocksize = 512  # What a device may report instead of the request
+        self.active = False
+        self.closed = False
+        self.written = 0
+        self.calls = []
+        FakeOutputStream.opened.append(self)
+
+    def start(self):
+        self.active = True
+        self.calls.append("start")
+
+    def write(self, block):
+        self.written += len(block)
+
+    def stop(self):
+        self.active = False
+        self.calls.append("stop")
+
+    def abort(self):
+        self.active = False
+        self.calls.append("abort")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_sounddevice(monkeypatch):
+    FakeOutputStream.opened = []
+    module = types.SimpleNamespace(
+        OutputStream=FakeOutputStream, CallbackStop=Exception
+    )
+    monkeypatch.setitem(sys.modules, "sounddevice", module)
+    return FakeOutputStream.opened
+
+
+def test_sounddevice_streams_are_reused_between_playbacks(tracks, fake_sounddevice):
+    backend = SounddeviceBackend(blocksize=256, device=3)
+    play(tracks, backend=backend)
+    play(tracks, backend=backend)
+
+    assert len(fake_sounddevice) == 1
+    stream = fake_sounddevice[0]
+    assert stream.kwargs["device"] == 3
+    assert stream.kwargs["blocksize"] == 256
+    assert stream.written == 2 * len(sequence(tracks)[0])
+    assert stream.calls == ["start", "stop", "start", "stop"]
+    assert not stream.closed
+
+    backend.close()
+    assert stream.closed
+
+
+def test_play_waits_for_the_sounddevice_stream_to_drain(tracks, fake_sounddevice):
+    backend = SounddeviceBackend()
+    play(tracks, backend=backend)
+
+    # Stopped (not aborted) before play() returned, then kept for reuse
+    stream = fake_sounddevice[0]
+    assert stream.calls[-1] == "stop"
+    assert not stream.closed
+    backend.close()
+
+
+def test_sounddevice_streams_reopen_for_another_format(tracks, fake_sounddevice):
+    backend = SounddeviceBackend()
+    play(tracks, backend=backend)
+    play(tracks[1:], backend=backend)  # Same sounds, so the same format
+    stream = backend.open_stream(22050, 1)
+    backend.release(stream)
+
+    assert len(fake_sounddevice) == 2
+    assert fake_sounddevice[0].closed
+    backend.close()
+
+
+def test_sounddevice_streams_are_not_kept_when_not_persistent(tracks, fake_sounddevice):
+    backend = SounddeviceBackend(persistent=False)
+    play(tracks, backend=backend)
+    play(tracks, backend=backend)
+
+    assert len(fake_sounddevice) == 2
+    assert all(stream.closed for stream in fake_sounddevice)
@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+import pytest
+import scipy.io.wavfile as wav
+
+from cadence.api.config import Config
+from cadence.api.functions import render_loop, sequence
+from cadence.api.output import NullBackend, WavFileBackend
+from cadence.api.player import LoopPlayer
+
+# Half a second per pattern, so that realtime playback is quick
+CONFIG = Config(bpm=480, repeat=3)
+
+
+@pytest.fixture
+def tracks(make_tracks):
+    return make_tracks(([0, 17, 45], 6000), ([0, 24], 3000, {"attack": 0.005}))
+
+
+@pytest.fixture
+def other_tracks(make_tracks):
+    return make_tracks(([0, 30], 4000, {"attack": 0.003}))
+
+
+def play_to_file(tmp_path, tracks, config, edit=None):
+    """Play tracks to a WAV file in real time, optionally updating them."""
+    player = LoopPlayer(
+        blocksize=256, backend=WavFileBackend(tmp_path / "out.wav", realtime=True)
+    )
+    finished = threading.Event()
+    player.play(tracks, config, on_finished=finished.set)
+    if edit is not None:
+        player.update(*edit)
+    assert finished.wait(10)
+    player.stop()
+    return wav.read(tmp_path / "out.wav")[1].reshape(-1, 1)
+
+
+def padded(audio, n_frames):
+    out = np.zeros((n_frames, audio.shape[1]), dtype=np.float32)
+    out[: len(audio)] = audio
+    return out
+
+
+def test_plays_the_sequence(tmp_path, tracks):
+    audio, _ = sequence(tracks, CONFIG)
+    played = play_to_file(tmp_path, tracks, CONFIG)
+
+    assert len(played) >= len(audio)
+    np.testing.assert_allclose(played, padded(audio, len(played)), atol=1e-6)
+
+
+def test_update_swaps_at_a_pattern_boundary(tmp_path, tracks, other_tracks):
+    config = CONFIG._replace(repeat=4)
+    played = play_to_file(tmp_path, tracks, config, edit=(other_tracks, config))
+
+    # The edit is heard from one of the boundaries, with the tails of the
+    # old pattern ringing over the new one
+    old, _ = render_loop(tracks, config)
+    new, _ = render_loop(other_tracks, config)
+    candidates = []
+    for k in range(1, config.repeat):
+        expected = np.zeros_like(played)
+        old.add(0, expected, stop_repeat=k)
+        new.add(-k * old.length, expected, stop_repeat=config.repeat - k)
+        candidates.append(np.max(np.abs(expected - played)))
+    assert min(candidates) < 1e-6
+
+
+def test_stop(tracks):
+    player = LoopPlayer(backend=NullBackend(realtime=True))
+    finished = threading.Event()
+    player.play(tracks, CONFIG._replace(repeat=100), on_finished=finished.set)
+    assert player.playing
+
+    player.stop()
+    assert not player.playing
+    assert player.position() is None
+    assert not finished.wait(0.2)
+
+
+def test_position_follows_the_stream(tracks):
+    player = LoopPlayer(backend=NullBackend(realtime=True))
+    player.play(tracks, CONFIG._replace(repeat=100))
+    loop, _ = render_loop(tracks, CONFIG)
+    try:
+        positions = []
+        for _ in range(5):
+            threading.Event().wait(0.05)
+            position = player.position()
+            if position is not None:
+                positions.append(position)
+    finally:
+        player.stop()
+
+    assert len(positions) >= 3
+    frames = [position.frame for position in positions]
+    assert frames == sorted(frames) and frames[-1] > frames[0]
+    for position in positions:
+        assert position.pattern_length == loop.length
+        assert position.pattern_frame == position.frame % loop.length
+        assert position.sample_rate == 44100
+        assert position.beat_length == loop.beat_length == 5512
+
+
+def test_a_failed_update_keeps_the_pattern_playing(tmp_path, tracks):
+    player = LoopPlayer(backend=NullBackend(realtime=True))
+    player.play(tracks, CONFIG._replace(repeat=100))
+    missing = [tracks[0]._replace(path=str(tmp_path / "missing.wav"))]
+    try:
+        player.update(missing, CONFIG)
+        for _ in range(100):
+            if player.error is not None:
+                break
+            threading.Event().wait(0.01)
+        assert isinstance(player.error, FileNotFoundError)
+        assert player.playing
+
+        player.update(tracks, CONFIG)
+        for _ in range(100):
+            if player.error is None:
+                break
+            threading.Event().wait(0.01)
+        assert player.error is None
+    finally:
+        player.stop()
+
+
+def test_nothing_to_play():
+    finished = []
+    LoopPlayer(backend=NullBackend()).play([], on_finished=lambda: finished.append(1))
+    assert finished == [1]
@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+import pytest
+
+from cadence.api import prerender
+from cadence.api.config import Config
+from cadence.api.functions import render_loop
+from cadence.api.prerender import Prerenderer
+
+CONFIG = Config(bpm=480, repeat=2)
+
+
+@pytest.fixture
+def tracks(make_tracks):
+    return make_tracks(([0, 17, 45], 3000), ([0, 24], 2000))
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Record the tracks of every render the prerenderer starts."""
+    rendered = []
+
+    def _render_loop(tracks, config):
+        rendered.append(tracks)
+        return render_loop(tracks, config)
+
+    monkeypatch.setattr(prerender, "render_loop", _render_loop)
+    return rendered
+
+
+def wait_for(prerenderer, tracks, config, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while (loop := prerenderer.get(tracks, config)) is None:
+        assert time.monotonic() < deadline, "render not ready"
+        time.sleep(0.01)
+    return loop
+
+
+def test_renders_the_request(tracks):
+    prerenderer = Prerenderer(delay=0.01)
+    assert prerenderer.get(tracks, CONFIG) is None
+    prerenderer.request(tracks, CONFIG)
+    loop = wait_for(prerenderer, tracks, CONFIG)
+
+    expected, _ = render_loop(tracks, CONFIG)
+    np.testing.assert_array_equal(loop.dry, expected.dry)
+    assert loop.gain == expected.gain
+
+
+def test_waits_for_the_delay(tracks, renders):
+    prerenderer = Prerenderer(delay=0.2)
+    prerenderer.request(tracks, CONFIG)
+    time.sleep(0.1)
+    assert renders == []
+    wait_for(prerenderer, tracks, CONFIG)
+
+
+def test_a_burst_of_requests_renders_the_last_one(tracks, renders):
+    prerenderer = Prerenderer(delay=0.1)
+    edits = [tracks[:1], tracks[1:], tracks]
+    for edit in edits:
+        prerenderer.request(edit, CONFIG)
+    wait_for(prerenderer, tracks, CONFIG)
+
+    assert renders == [tracks]
+    assert prerenderer.get(edits[0], CONFIG) is None
+
+
+def test_get_matches_tracks_and_config(tracks):
+    prerenderer = Prerenderer(delay=0.01)
+    prerenderer.request(tracks, CONFIG._asdict())
+    wait_for(prerenderer, tracks, CONFIG)
+
+    assert prerenderer.get(list(tracks), CONFIG._asdict()) is not None
+    assert prerenderer.get(tracks, CONFIG._replace(bpm=240)) is None
+    assert prerenderer.get(tracks[::-1], CONFIG) is None
+    moved = [tracks[0]._replace(timing=[0, 18, 45]), tracks[1]]
+    assert prerenderer.get(moved, CONFIG) is None
+
+
+def test_a_failed_render_does_not_stop_the_worker(tracks, tmp_path):
+    prerenderer = Prerenderer(delay=0.01)
+    missing = [tracks[0]._replace(path=str(tmp_path / "missing.wav"))]
+    prerenderer.request(missing, CONFIG)
+    time.sleep(0.2)
+    assert prerenderer.get(missing, CONFIG) is None
+    assert isinstance(prerenderer.error, FileNotFoundError)
+
+    prerenderer.request(tracks, CONFIG)
+    wait_for(prerenderer, tracks, CONFIG)
+    assert prerenderer.error is None
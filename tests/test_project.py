@@ -0,0 +1,132 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from cadence.api.cache import file_digest
+from cadence.api.config import Config
+from cadence.api.functions import (
+    load_arrangement,
+    load_project,
+    save_project,
+    sequence,
+)
+from cadence.api.song import Arrangement, Pattern
+from cadence.api.store import PROJECT_CACHE_DIR, sample_digest
+
+
+@pytest.fixture
+def tracks(make_tracks):
+    return make_tracks(([0, 12], 1000), ([6], 2000, {"volume": 0.5}), ([3], 3000))
+
+
+def test_round_trip(tmp_path, tracks):
+    config = Config(bpm=90, measures=2, repeat=3)
+    path = tmp_path / "song.cadence"
+    saved = save_project(path, tracks, config)
+    loaded, loaded_config = load_project(path)
+
+    assert loaded_config == config
+    assert [track._replace(path=None) for track in loaded] == [
+        track._replace(path=None) for track in tracks
+    ]
+    assert [track.path for track in loaded] == [track.path for track in saved]
+    for track, original in zip(loaded, tracks):
+        assert file_digest(track.path) == file_digest(original.path)
+    np.testing.assert_array_equal(
+        sequence(loaded, config)[0], sequence(tracks, config)[0]
+    )
+
+
+def test_arrangement_round_trip(tmp_path, tracks):
+    arrangement = Arrangement(
+        {"a": Pattern(tracks[:1]), "b": Pattern(tracks[1:], measures=2)},
+        ["a", "b", "a"],
+    )
+    path = tmp_path / "song.cadence"
+    save_project(path, tracks[:1], arrangement=arrangement)
+    loaded = load_arrangement(path)
+
+    assert loaded.order == arrangement.order
+    assert loaded.patterns["b"].measures == 2
+    assert [track.timing for track in loaded.patterns["b"].tracks] == [
+        track.timing for track in tracks[1:]
+    ]
+
+
+def test_existing_projects_are_not_overwritten_by_default(tmp_path, tracks):
+    path = tmp_path / "song.cadence"
+    save_project(path, tracks)
+    with pytest.raises(AssertionError):
+        save_project(path, tracks)
+
+
+def test_only_projects_are_overwritten(tmp_path, tracks):
+    path = tmp_path / "documents.cadence"
+    path.mkdir()
+    with pytest.raises(AssertionError):
+        save_project(path, tracks, overwrite=True)
+
+
+def test_overwrite_only_copies_new_sounds(tmp_path, tracks):
+    path = tmp_path / "song.cadence"
+    first = save_project(path, tracks[:2])
+    before = {track.path: _stat(track.path) for track in first}
+
+    second = save_project(path, tracks, overwrite=True)
+
+    for track in second[:2]:
+        assert _stat(track.path) == before[track.path]
+    assert len(list((path / "sounds").iterdir())) == 3
+
+
+def test_overwrite_removes_unused_sounds_and_their_cache_files(tmp_path, tracks):
+    path = tmp_path / "song.cadence"
+    saved = save_project(path, tracks)
+    unused = saved[2].path
+    digest = file_digest(unused)
+    cache_path = path / PROJECT_CACHE_DIR
+    (cache_path / f"{digest}-44100-2.npy").write_bytes(b"")
+    (cache_path / f"{digest}.stat").write_text("[]")
+    # A converted sample of a verified sound, kept
+    sample_digest(saved[0].path)
+    (cache_path / f"{file_digest(saved[0].path)}-44100-2.npy").write_bytes(b"")
+
+    save_project(path, tracks[:2], overwrite=True)
+
+    assert sorted(p.name for p in (path / "sounds").iterdir()) == sorted(
+        f"{file_digest(track.path)}.wav" for track in tracks[:2]
+    )
+    names = {p.name for p in cache_path.iterdir()}
+    assert f"{file_digest(saved[0].path)}-44100-2.npy" in names
+    assert not any(name.startswith(digest) for name in names)
+
+
+def test_overwrite_keeps_files_it_does_not_own(tmp_path, tracks):
+    path = tmp_path / "song.cadence"
+    saved = save_project(path, tracks)
+    sounds_path = path / "sounds"
+    digest = "0" * 32
+    kept = [
+        sounds_path / "README.txt",
+        sounds_path / "my kick.wav",
+        sounds_path / f"{digest}.txt",
+        sounds_path / f".{digest}.wav.tmp",
+        path / PROJECT_CACHE_DIR / "notes.npy",
+    ]
+    for file_path in kept:
+        file_path.write_bytes(b"keep")
+    (sounds_path / f"{'1' * 32}.wav").mkdir()
+    (sounds_path / f"{'2' * 32}.wav").symlink_to(tracks[0].path)
+    kept += [sounds_path / f"{'1' * 32}.wav", sounds_path / f"{'2' * 32}.wav"]
+
+    save_project(path, [], overwrite=True)
+
+    for file_path in kept:
+        assert file_path.exists() or file_path.is_symlink()
+    assert not any(Path(track.path).exists() for track in saved)
+
+
+def _stat(file_path):
+    stat = Path(file_path).stat()
+    return stat.st_ino, stat.st_mtime_ns
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+from conftest import noise, ramp, write_sound
+
+from cadence.api.config import Config
+from cadence.api.functions import sequence
+from cadence.api.samples import (
+    SampleBank,
+    conform,
+    read_conformed,
+    read_float32,
+    read_format,
+    to_float32,
+)
+from cadence.api.track import Track
+
+
+def sine(n_frames, sample_rate, frequency=440.0):
+    t = np.arange(n_frames) / sample_rate
+    return np.sin(2 * np.pi * frequency * t).astype(np.float32)[:, np.newaxis]
+
+
+def test_to_float32_scales_integer_formats():
+    np.testing.assert_array_equal(
+        to_float32(np.array([0, 128, 255], dtype=np.uint8)), [-1.0, 0.0, 127 / 128]
+    )
+    np.testing.assert_array_equal(
+        to_float32(np.array([-(2**15), 0, 2**14], dtype=np.int16)), [-1.0, 0.0, 0.5]
+    )
+    np.testing.assert_array_equal(
+        to_float32(np.array([-(2**31), 2**30], dtype=np.int32)), [-1.0, 0.5]
+    )
+    data = np.array([0.25, -0.5], dtype=np.float32)
+    np.testing.assert_array_equal(to_float32(data), data)
+
+
+def test_read_format_reads_the_header(tmp_path):
+    path = write_sound(tmp_path / "a.wav", noise(100, n_channels=2), 22050)
+    assert read_format(path) == (22050, 2)
+
+
+def test_read_format_rejects_other_files(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"not a wav file at all")
+    with pytest.raises(ValueError):
+        read_format(path)
+
+
+def test_conform_upmixes_mono():
+    data = noise(100)
+    stereo = conform(data, 44100, 44100, 2)
+    assert stereo.shape == (100, 2)
+    np.testing.assert_array_equal(stereo[:, 0], data[:, 0])
+    np.testing.assert_array_equal(stereo[:, 1], data[:, 0])
+
+
+def test_conform_does_not_downmix():
+    with pytest.raises(ValueError):
+        conform(noise(100, n_channels=2), 44100, 44100, 1)
+
+
+@pytest.mark.parametrize("sample_rate", [22050, 48000])
+def test_conform_resamples(sample_rate):
+    data = sine(sample_rate, sample_rate)  # One second
+    resampled = conform(data, sample_rate, 44100, 1)
+
+    assert resampled.dtype == np.float32
+    assert resampled.shape == (44100, 1)
+    # Away from the edges, the filter keeps the sine intact
+    np.testing.assert_allclose(
+        resampled[1000:-1000], sine(44100, 44100)[1000:-1000], atol=1e-3
+    )
+
+
+def test_read_conformed_serves_matching_files_as_read(tmp_path):
+    path = write_sound(tmp_path / "a.wav", noise(100))
+    assert read_conformed(path, 44100, 1) is read_float32(path)[1]
+
+
+def test_read_conformed_converts_once(tmp_path):
+    path = write_sound(tmp_path / "a.wav", noise(100), 22050)
+    converted = read_conformed(path, 44100, 2)
+
+    assert converted.shape == (200, 2)
+    assert not converted.flags.writeable
+    np.testing.assert_array_equal(
+        converted, conform(read_float32(path)[1], 22050, 44100, 2)
+    )
+    assert read_conformed(path, 44100, 2) is converted
+
+
+def test_read_conformed_sees_edits(tmp_path):
+    path = write_sound(tmp_path / "a.wav", noise(100), 22050)
+    read_conformed(path, 44100, 1)
+    write_sound(path, ramp(100), 22050, bump=True)
+
+    np.testing.assert_array_equal(
+        read_conformed(path, 44100, 1),
+        conform(ramp(100)[:, np.newaxis], 22050, 44100, 1),
+    )
+
+
+def test_bank_uses_the_highest_rate_and_stereo_if_any(tmp_path):
+    tracks = [
+        Track("a", str(write_sound(tmp_path / "a.wav", noise(100), 22050)), [0]),
+        Track(
+            "b", str(write_sound(tmp_path / "b.wav", noise(100, 2, seed=1), 32000)), [0]
+        ),
+    ]
+    bank = SampleBank(tracks)
+    assert (bank.sample_rate, bank.n_channels) == (32000, 2)
+    assert all(sound.shape[1] == 2 for sound in bank.sounds)
+
+
+def test_sequence_mixes_sounds_of_different_formats(tmp_path):
+    low_rate = write_sound(tmp_path / "low.wav", noise(3000), 22050)
+    stereo = write_sound(tmp_path / "stereo.wav", noise(5000, 2, seed=1))
+    # The same sound, converted by hand
+    converted = conform(read_float32(low_rate)[1], 22050, 44100, 2)
+    by_hand = write_sound(tmp_path / "by_hand.wav", converted)
+
+    config = Config(repeat=2)
+    audio, sample_rate = sequence(
+        [Track("low", str(low_rate), [0, 20]), Track("stereo", str(stereo), [8])],
+        config,
+    )
+    expected, _ = sequence(
+        [Track("low", str(by_hand), [0, 20]), Track("stereo", str(stereo), [8])],
+        config,
+    )
+    assert sample_rate == 44100
+    np.testing.assert_allclose(audio, expected, atol=1e-7)
@@ -0,0 +1,184 @@
+import numpy as np
+import pytest
+from conftest import reference_sequence
+
+from cadence.api.config import Config
+from cadence.api.events import EventTable
+from cadence.api.functions import (
+    render_loop,
+    render_window,
+    sequence,
+    sequence_blocks,
+)
+
+
+def test_empty_sequence():
+    audio, sample_rate = sequence([])
+    assert len(audio) == 0
+    assert sample_rate == 44100
+
+
+def test_matches_a_brute_force_mix(make_tracks):
+    tracks = make_tracks(([0, 12, 30], 3000), ([6, 18], 5000, {"volume": 0.5}))
+    config = Config(bpm=150)
+
+    audio, sample_rate = sequence(tracks, config)
+
+    assert sample_rate == 44100
+    np.testing.assert_allclose(audio, reference_sequence(tracks, config), atol=1e-6)
+
+
+@pytest.mark.parametrize("repeat", [1, 3])
+def test_repeats_match_a_tiled_pattern_when_nothing_rings_past_it(make_tracks, repeat):
+    # Sounds that end inside the pattern, as the pattern used to be tiled
+    tracks = make_tracks(([0, 12], 2000), ([24], 2000))
+    pattern, _ = sequence(tracks, Config())
+
+    audio, _ = sequence(tracks, Config(repeat=repeat))
+    np.testing.assert_allclose(audio, np.tile(pattern, (repeat, 1)), atol=1e-6)
+
+
+def test_tails_ring_into_the_next_repeat_and_after_the_last(make_tracks):
+    # The hit near the end of the pattern rings well past it
+    tracks = make_tracks(([0, 45], 20000))
+    config = Config(bpm=240, repeat=4)
+    loop, _ = render_loop(tracks, config)
+    audio, _ = sequence(tracks, config)
+
+    assert loop.tail > 0
+    assert len(audio) == loop.length * 4 + loop.tail
+    np.testing.assert_allclose(audio, reference_sequence(tracks, config), atol=1e-6)
+
+
+def test_attack_moves_hits_earlier_and_cuts_off_the_first(make_tracks):
+    tracks = make_tracks(([0, 24], 3000, {"attack": 0.01}), ([12], 3000))
+    config = Config(repeat=2)
+
+    audio, _ = sequence(tracks, config)
+    np.testing.assert_allclose(audio, reference_sequence(tracks, config), atol=1e-6)
+
+
+def test_velocities_scale_hits(make_tracks):
+    timing = EventTable([0, 12, 30], velocity=[1.0, 0.25, 0.5])
+    tracks = make_tracks((timing, 3000), ([6], 5000, {"volume": 0.5}))
+    config = Config(repeat=2)
+
+    audio, _ = sequence(tracks, config)
+    np.testing.assert_allclose(audio, reference_sequence(tracks, config), atol=1e-6)
+
+
+def test_stereo(make_tracks):
+    tracks = make_tracks(([0, 7], 3000), ([3], 4000), n_channels=2)
+    audio, _ = sequence(tracks, Config(repeat=2))
+
+    assert audio.shape[1] == 2
+    np.testing.assert_allclose(
+        audio, reference_sequence(tracks, Config(repeat=2)), atol=1e-6
+    )
+
+
+def test_peak_is_master_volume(make_tracks):
+    tracks = make_tracks(([0, 1, 2], 3000))
+    audio, _ = sequence(tracks, Config(repeat=5))
+    assert np.max(np.abs(audio)) == pytest.approx(1.0)
+
+
+@pytest.fixture
+def long_tracks(make_tracks):
+    # A tail that rings into the next repeat, and an attack before the start
+    return make_tracks(([0, 17, 45], 20000), ([0, 24], 3000, {"attack": 0.01}))
+
+
+@pytest.mark.parametrize("block_size", [1, 1000, 4096, 10**6])
+def test_blocks_cover_the_sequence(long_tracks, block_size):
+    config = Config(bpm=240, repeat=3)
+    blocks, sample_rate = sequence_blocks(long_tracks, config, block_size=block_size)
+    blocks = list(blocks)
+
+    assert sample_rate == 44100
+    assert all(len(block) == block_size for block in blocks[:-1])
+    assert 0 < len(blocks[-1]) <= block_size
+    np.testing.assert_array_equal(
+        np.concatenate(blocks), sequence(long_tracks, config)[0]
+    )
+
+
+@pytest.mark.parametrize("block_size", [1000, 4096])
+def test_blocks_with_a_gain_are_mixed_as_they_are_consumed(long_tracks, block_size):
+    config = Config(bpm=240, repeat=3)
+    loop, _ = render_loop(long_tracks, config)
+
+    blocks, _ = sequence_blocks(
+        long_tracks, config, block_size=block_size, gain=loop.gain
+    )
+    audio = np.concatenate(list(blocks))
+    np.testing.assert_allclose(audio, sequence(long_tracks, config)[0], atol=1e-6)
+
+
+def test_empty_blocks():
+    for gain in (None, 1.0):
+        blocks, sample_rate = sequence_blocks([], gain=gain)
+        assert list(blocks) == []
+        assert sample_rate == 44100
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+@pytest.mark.parametrize("stems", [True, False])
+def test_parallel_renders_match_a_serial_one(long_tracks, backend, stems):
+    config = Config(bpm=240, repeat=3)
+    serial, _ = render_loop(long_tracks, config, stems=stems)
+    parallel, _ = render_loop(
+        long_tracks, config, workers=3, backend=backend, stems=stems
+    )
+    np.testing.assert_allclose(parallel.dry, serial.dry, atol=1e-6)
+
+
+def test_repeats_are_expanded_in_parallel_exactly(long_tracks):
+    config = Config(bpm=240, repeat=7)
+    np.testing.assert_array_equal(
+        sequence(long_tracks, config, workers=3)[0], sequence(long_tracks, config)[0]
+    )
+
+
+@pytest.mark.parametrize("measures", [1, 2, 5])
+def test_measures_set_the_pattern_length(make_tracks, measures):
+    # Hits at and after the end of the first two measures (96 ticks)
+    tracks = make_tracks(([0, 50, 95, 96, 150], 3000))
+    config = Config(measures=measures, repeat=2)
+    loop, _ = render_loop(tracks, config)
+    audio, _ = sequence(tracks, config)
+
+    assert loop.length == measures * 4 * 22050
+    np.testing.assert_allclose(audio, reference_sequence(tracks, config), atol=1e-6)
+
+
+@pytest.mark.parametrize(
+    ("start", "stop"),
+    [
+        (0, 1000),
+        (-5000, 3000),  # Before the start
+        (22050 * 4 - 500, 22050 * 4 + 500),  # Across a repeat boundary
+        (22050 * 8 - 100, 22050 * 8 + 30000),  # Into the final tail
+        (10**6, 10**6 + 100),  # After the end
+        (1234, 1234),
+    ],
+)
+def test_render_window_matches_a_full_render(long_tracks, start, stop):
+    config = Config(bpm=120, repeat=2)
+    loop, _ = render_loop(long_tracks, config)
+    audio, _ = sequence(long_tracks, config)
+
+    window, sample_rate = render_window(
+        long_tracks, start, stop, config, gain=loop.gain
+    )
+
+    padded = np.zeros((10**6 + 100 + 5000, audio.shape[1]), dtype=np.float32)
+    padded[5000 : 5000 + len(audio)] = audio
+    assert sample_rate == 44100
+    assert window.shape == (stop - start, audio.shape[1])
+    np.testing.assert_allclose(window, padded[start + 5000 : stop + 5000], atol=1e-6)
+
+
+def test_render_window_rejects_reversed_windows(long_tracks):
+    with pytest.raises(AssertionError):
+        render_window(long_tracks, 100, 0)
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+import scipy.io.wavfile as wav
+from conftest import reference_hits, reference_mix
+
+from cadence.api import functions
+from cadence.api.config import Config
+from cadence.api.functions import save_song, sequence, sequence_song
+from cadence.api.song import Arrangement, Pattern
+from cadence.api.track import Track
+
+
+def reference_song(arrangement: Arrangement, config: Config) -> np.ndarray:
+    """Mix a song hit by hit, placing each pattern after the previous one."""
+    hits = []
+    offset = 0
+    samples_per_measure = config.beats_per_measure * int((60 / config.bpm) * 44100)
+    for name in arrangement.order * config.repeat:
+        pattern = arrangement.patterns[name]
+        if not pattern.tracks:
+            offset += (pattern.measures or 1) * samples_per_measure
+            continue
+        pattern_hits, length = reference_hits(
+            pattern.tracks, config._replace(measures=pattern.measures, repeat=1)
+        )
+        hits += [(start + offset, sound) for start, sound in pattern_hits]
+        offset += length
+    return reference_mix(hits, offset)
+
+
+@pytest.fixture
+def arrangement(make_tracks):
+    kick, snare, crash = make_tracks(
+        ([0, 24, 48], 3000),
+        ([12, 36], 4000, {"attack": 0.01}),
+        ([0], 30000, {"volume": 0.5}),
+    )
+    return Arrangement(
+        patterns={
+            "verse": Pattern([kick, snare]),
+            "fill": Pattern([snare._replace(timing=[0, 3, 6, 9])], measures=1),
+            "chorus": Pattern([kick, snare, crash], measures=2),
+            "break": Pattern([], measures=1),
+        },
+        order=["verse", "fill", "chorus", "break", "verse", "chorus"],
+    )
+
+
+@pytest.mark.parametrize("repeat", [1, 2])
+def test_song_matches_a_brute_force_mix(arrangement, repeat):
+    config = Config(bpm=180, repeat=repeat)
+    audio, sample_rate = sequence_song(arrangement, config)
+
+    assert sample_rate == 44100
+    np.testing.assert_allclose(audio, reference_song(arrangement, config), atol=1e-6)
+
+
+def test_a_song_of_one_pattern_is_its_sequence(arrangement):
+    pattern = arrangement.patterns["chorus"]
+    config = Config(measures=pattern.measures, repeat=3)
+    song = Arrangement({"chorus": pattern}, ["chorus"])
+
+    np.testing.assert_allclose(
+        sequence_song(song, config._replace(measures=None))[0],
+        sequence(pattern.tracks, config)[0],
+        atol=1e-6,
+    )
+
+
+def test_each_distinct_pattern_is_rendered_once(arrangement, monkeypatch):
+    rendered = []
+    render_loop = functions.render_loop
+
+    def _render_loop(tracks, *args, **kwargs):
+        rendered.append(tracks)
+        return render_loop(tracks, *args, **kwargs)
+
+    monkeypatch.setattr(functions, "render_loop", _render_loop)
+    sequence_song(arrangement, Config(repeat=3))
+    assert len(rendered) == len(arrangement.patterns)
+
+
+def test_undefined_patterns_are_rejected(arrangement):
+    with pytest.raises(ValueError):
+        sequence_song(arrangement._replace(order=["verse", "bridge"]))
+
+
+def test_save_song_matches_sequence_song(tmp_path, arrangement):
+    config = Config(bpm=180)
+    stats = save_song(tmp_path / "song.wav", arrangement, config, block_size=1000)
+    _, data = wav.read(tmp_path / "song.wav")
+
+    audio, _ = sequence_song(arrangement, config)
+    assert stats.n_frames == len(audio)
+    np.testing.assert_allclose(data.reshape(audio.shape), audio, atol=1e-6)
+
+
+def test_defaults_are_not_shared():
+    a, b = Pattern(), Pattern()
+    a.tracks.append(Track("kick"))
+    assert b.tracks == []
+    assert Pattern(measures=2)._replace(measures=None).tracks == []
+
+    a, b = Arrangement(), Arrangement()
+    a.patterns["a"] = Pattern()
+    a.order.append("a")
+    assert (b.patterns, b.order) == ({}, [])
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from conftest import SOUNDS_PATH
+
+from cadence.api import stems
+from cadence.api.config import Config
+from cadence.api.functions import render_loop
+from cadence.api.stems import stem_cache
+from cadence.api.track import Track
+
+CONFIG = Config(bpm=140, measures=4)
+
+
+@pytest.fixture(autouse=True)
+def clear_stem_cache():
+    stem_cache.invalidate()
+    stems._latest_keys.clear()
+    yield
+    stem_cache.invalidate()
+    stems._latest_keys.clear()
+
+
+@pytest.fixture
+def tracks():
+    return [
+        Track("kick", str(SOUNDS_PATH / "kick1.wav"), list(range(0, 64, 8))),
+        Track("hihat", str(SOUNDS_PATH / "hihat_closed.wav"), list(range(0, 64, 2))),
+        Track("crash", str(SOUNDS_PATH / "crash.wav"), [0], volume=0.5),
+    ]
+
+
+def render(tracks, use_stems):
+    loop, _ = render_loop(tracks, CONFIG, normalize=False, stems=use_stems)
+    return loop.dry
+
+
+def edit(track, add=(), remove=(), velocity=1.0):
+    timing = track.timing
+    for tick in remove:
+        timing = timing.remove(tick)
+    for tick in add:
+        timing = timing.insert(tick, velocity)
+    return track._replace(timing=timing)
+
+
+@pytest.fixture
+def mixed_frames(monkeypatch):
+    """Count the frames that render_stem() mixes."""
+    counts = []
+    mix_tracks = stems.mix_tracks
+
+    def _mix_tracks(out, *args, **kwargs):
+        counts.append(len(out))
+        return mix_tracks(out, *args, **kwargs)
+
+    monkeypatch.setattr(stems, "mix_tracks", _mix_tracks)
+    return counts
+
+
+def test_stems_match_a_full_render(tracks):
+    np.testing.assert_allclose(render(tracks, True), render(tracks, False), atol=1e-6)
+
+
+def test_patched_stems_match_a_full_render(tracks):
+    render(tracks, True)
+    edits = [
+        {"add": [3, 35]},
+        {"remove": [16]},
+        {"add": [61], "velocity": 0.5},
+        {"remove": [3], "add": [5]},
+    ]
+    for changes in edits:
+        tracks[1] = edit(tracks[1], **changes)
+        np.testing.assert_allclose(
+            render(tracks, True), render(tracks, False), atol=1e-6
+        )
+
+
+def test_an_edit_only_mixes_the_frames_it_reaches(tracks, mixed_frames):
+    render(tracks, True)
+    full = sum(mixed_frames)
+
+    mixed_frames.clear()
+    tracks[1] = edit(tracks[1], add=[33])
+    render(tracks, True)
+    assert 0 < sum(mixed_frames) < full / 10
+
+
+def test_moving_the_first_and_last_hits_resizes_the_stem(tracks):
+    render(tracks, True)
+    tracks[0] = edit(tracks[0], remove=[0, 56], add=[60])
+    np.testing.assert_allclose(render(tracks, True), render(tracks, False), atol=1e-6)
+
+
+def test_unchanged_stems_are_not_mixed_again(tracks, mixed_frames):
+    render(tracks, True)
+    mixed_frames.clear()
+    render(tracks, True)
+    assert mixed_frames == []
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_parallel_stems_match_a_full_render(tracks, backend):
+    loop, _ = render_loop(
+        tracks, CONFIG, normalize=False, workers=2, backend=backend, stems=True
+    )
+    np.testing.assert_allclose(loop.dry, render(tracks, False), atol=1e-6)
+
+
+def test_lineages_are_bounded(monkeypatch):
+    monkeypatch.setattr(stems, "STEM_LINEAGES_MAX", 3)
+    for i in range(10):
+        stems._set_latest_key(("lineage", i), ("key", i))
+    assert list(stems._latest_keys) == [("lineage", i) for i in (7, 8, 9)]
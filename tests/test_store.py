@@ -0,0 +1,186 @@
+import numpy as np
+import pytest
+from conftest import ramp, write_sound
+
+from cadence.api.cache import file_digest, sample_cache
+from cadence.api.functions import load_project, save_project
+from cadence.api.samples import read_conformed
+from cadence.api.store import (
+    PROJECT_CACHE_DIR,
+    copy_file,
+    project_cache_path,
+    sample_digest,
+    store_sample,
+)
+from cadence.api.track import Track
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A project directory with sounds/ and cache/ directories."""
+    (tmp_path / "project" / "sounds").mkdir(parents=True)
+    (tmp_path / "project" / PROJECT_CACHE_DIR).mkdir()
+    return tmp_path / "project"
+
+
+@pytest.fixture
+def sounds_path(tmp_path):
+    (tmp_path / "sounds").mkdir()
+    return tmp_path / "sounds"
+
+
+def test_copy_file_copies(tmp_path):
+    source = write_sound(tmp_path / "a.wav", ramp(100))
+    copy = tmp_path / "b.wav"
+    copy_file(source, copy)
+
+    assert copy.read_bytes() == source.read_bytes()
+    assert copy.stat().st_ino != source.stat().st_ino
+    write_sound(source, ramp(100)[::-1].copy())
+    assert copy.read_bytes() != source.read_bytes()
+
+
+def test_copy_file_links(tmp_path):
+    source = write_sound(tmp_path / "a.wav", ramp(100))
+    copy = tmp_path / "b.wav"
+    copy_file(source, copy, link=True)
+
+    assert copy.read_bytes() == source.read_bytes()
+    if copy.stat().st_ino != source.stat().st_ino:
+        pytest.skip("Hardlinks are not supported here")
+    assert source.stat().st_nlink == 2
+
+
+def test_copy_file_replaces_dst_and_leaves_no_temporary_file(tmp_path):
+    source = write_sound(tmp_path / "a.wav", ramp(100))
+    copy = write_sound(tmp_path / "b.wav", ramp(50))
+    copy_file(source, copy)
+
+    assert copy.read_bytes() == source.read_bytes()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.wav", "b.wav"]
+
+
+def test_copy_file_keeps_dst_if_the_copy_fails(tmp_path):
+    copy = write_sound(tmp_path / "b.wav", ramp(50))
+    contents = copy.read_bytes()
+    with pytest.raises(FileNotFoundError):
+        copy_file(tmp_path / "missing.wav", copy)
+
+    assert copy.read_bytes() == contents
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.wav"]
+
+
+def test_store_sample_names_samples_by_digest(tmp_path, sounds_path):
+    source = write_sound(tmp_path / "kick.wav", ramp(100))
+    stored = store_sample(sounds_path, source)
+
+    assert stored.name == file_digest(source) + ".wav"
+    assert stored.read_bytes() == source.read_bytes()
+    assert store_sample(sounds_path, stored) == stored
+
+
+def test_a_stored_sample_that_no_longer_matches_its_name_is_replaced(tmp_path, project):
+    source = write_sound(tmp_path / "a.wav", ramp(100))
+    stored = store_sample(project / "sounds", source)
+    write_sound(stored, ramp(100, 0.5), bump=True)
+
+    assert store_sample(project / "sounds", source) == stored
+    assert file_digest(stored) == stored.stem
+
+
+def test_identical_samples_are_stored_once(tmp_path, sounds_path):
+    a = write_sound(tmp_path / "a.wav", ramp(100))
+    b = write_sound(tmp_path / "b.wav", ramp(100))
+    assert store_sample(sounds_path, a) == store_sample(sounds_path, b)
+    assert len(list(sounds_path.iterdir())) == 1
+
+
+def test_save_project_stores_each_sound_once(tmp_path):
+    a = write_sound(tmp_path / "a.wav", ramp(100))
+    b = write_sound(tmp_path / "b.wav", ramp(100))
+    tracks = [Track("a", str(a), [0]), Track("b", str(b), [6]), Track("c", str(a), [3])]
+    save_project(tmp_path / "song.cadence", tracks)
+
+    loaded, _ = load_project(tmp_path / "song.cadence")
+    assert len({track.path for track in loaded}) == 1
+    assert len(list((tmp_path / "song.cadence" / "sounds").iterdir())) == 1
+    assert [track.name for track in loaded] == ["a", "b", "c"]
+
+
+def test_converted_samples_are_kept_in_the_project_cache(tmp_path, project):
+    stored = store_sample(
+        project / "sounds", write_sound(tmp_path / "a.wav", ramp(100))
+    )
+    converted = read_conformed(stored, 48000, 2)
+    npy_path = project_cache_path(stored, 48000, 2)
+    assert npy_path.parent == project / PROJECT_CACHE_DIR
+    np.testing.assert_array_equal(np.load(npy_path), converted)
+
+    # As if in a new process: the converted sample is memory-mapped
+    sample_cache.invalidate()
+    again = read_conformed(stored, 48000, 2)
+    assert isinstance(again, np.memmap)
+    np.testing.assert_array_equal(again, converted)
+
+
+def test_samples_outside_a_project_have_no_cache_path(tmp_path):
+    path = write_sound(tmp_path / "a.wav", ramp(100))
+    assert project_cache_path(path, 44100, 1) is None
+
+
+def test_verified_samples_get_a_stat_record(tmp_path, project):
+    stored = store_sample(
+        project / "sounds", write_sound(tmp_path / "a.wav", ramp(100))
+    )
+    assert sample_digest(stored) == stored.stem
+    assert (project / PROJECT_CACHE_DIR / f"{stored.stem}.stat").exists()
+
+
+def test_digest_shaped_names_are_not_trusted(tmp_path, project):
+    # A file named like a stored sample, whose contents don't match the name
+    digest = file_digest(write_sound(tmp_path / "a.wav", ramp(100)))
+    impostor = write_sound(project / "sounds" / f"{digest}.wav", ramp(100, 0.5))
+
+    assert sample_digest(impostor) == file_digest(impostor) != digest
+    assert project_cache_path(impostor, 44100, 1) is None
+
+
+def test_edits_to_a_hardlinked_source_are_seen(tmp_path, project):
+    source = write_sound(tmp_path / "a.wav", ramp(100))
+    stored = store_sample(project / "sounds", source, link=True)
+    if stored.stat().st_ino != source.stat().st_ino:
+        pytest.skip("Hardlinks are not supported here")
+    assert sample_digest(stored) == stored.stem
+
+    write_sound(source, ramp(100)[::-1].copy(), bump=True)
+
+    assert sample_digest(stored) == file_digest(source) != stored.stem
+    assert project_cache_path(stored, 48000, 2) is None
+
+
+def test_converted_samples_follow_edits_to_a_hardlinked_source(tmp_path, project):
+    source = write_sound(tmp_path / "a.wav", ramp(100))
+    stored = store_sample(project / "sounds", source, link=True)
+    if stored.stat().st_ino != source.stat().st_ino:
+        pytest.skip("Hardlinks are not supported here")
+
+    # Converting to another format saves a .npy copy in the project cache
+    before = read_conformed(stored, 44100, 2)
+    assert project_cache_path(stored, 44100, 2).exists()
+    np.testing.assert_allclose(before[:, 0], ramp(100))
+
+    # As if in a new process, after the source was edited
+    write_sound(source, ramp(100)[::-1].copy(), bump=True)
+    sample_cache.invalidate()
+    after = read_conformed(stored, 44100, 2)
+    np.testing.assert_allclose(after[:, 0], ramp(100)[::-1])
+
+
+def test_converted_samples_without_a_stat_record_are_dropped(tmp_path, project):
+    stored = store_sample(
+        project / "sounds", write_sound(tmp_path / "a.wav", ramp(100))
+    )
+    legacy = project / PROJECT_CACHE_DIR / f"{stored.stem}-44100-2.npy"
+    np.save(legacy, np.zeros((100, 2), dtype=np.float32))
+
+    np.testing.assert_allclose(read_conformed(stored, 44100, 2)[:, 0], ramp(100))
@@ -0,0 +1,233 @@
+import itertools
+
+import pytest
+
+pytest.importorskip("customtkinter")
+
+from cadence.api.constants import TIMING_UNITS_PER_BEAT
+from cadence.api.events import EventTable
+from cadence.api.player import PlaybackPosition
+from cadence.api.track import Track
+from cadence.ui import callbacks
+from cadence.ui.grid import (
+    BEAT_WIDTH,
+    TRACK_ROW_HEIGHT,
+    StepGrid,
+    _block_cells,
+    cell_at,
+    cell_rect,
+)
+from cadence.ui.state import State, app_state
+from cadence.ui.ui_constants import DIVS_PER_BEAT_UPPER
+from cadence.ui.utils import get_button_info, update_grid_from_tracks
+
+N_TRACKS, N_BEATS = 3, 8
+
+
+def all_cells():
+    return [
+        cell
+        for track, beat in itertools.product(range(N_TRACKS), range(N_BEATS))
+        for cell in _block_cells(track, beat)
+    ]
+
+
+def test_cells_do_not_overlap():
+    rects = [cell_rect(cell) for cell in all_cells()]
+    for (ax0, ay0, ax1, ay1), (bx0, by0, bx1, by1) in itertools.combinations(rects, 2):
+        assert ax1 <= bx0 or bx1 <= ax0 or ay1 <= by0 or by1 <= ay0
+
+
+def test_cell_at_finds_the_cell_under_a_point():
+    for cell in all_cells():
+        x0, y0, x1, y1 = cell_rect(cell)
+        for x, y in [(x0, y0), ((x0 + x1) / 2, (y0 + y1) / 2), (x1 - 0.5, y1 - 0.5)]:
+            assert cell_at(x, y, N_TRACKS, N_BEATS) == cell
+
+
+def test_cell_at_counts_padding_as_the_cell():
+    x0, y0, _, _ = cell_rect((1, 2, 0, 0))
+    assert cell_at(x0 - 0.5, y0 - 0.5, N_TRACKS, N_BEATS) == (1, 2, 0, 0)
+
+
+@pytest.mark.parametrize(
+    "x, y",
+    [
+        (-1, 10),
+        (10, -1),
+        (N_BEATS * BEAT_WIDTH, 10),
+        (10, N_TRACKS * TRACK_ROW_HEIGHT),
+    ],
+)
+def test_cell_at_is_none_outside_the_grid(x, y):
+    assert cell_at(x, y, N_TRACKS, N_BEATS) is None
+
+
+class RecordingGrid(StepGrid):
+    """A StepGrid without a Tk canvas, recording the cells it redraws."""
+
+    def __init__(self, n_tracks: int, n_beats: int):
+        self.n_tracks = n_tracks
+        self.n_beats = n_beats
+        self.enabled = set()
+        self._pending_cells = set()
+        self._cells_pending = False
+        self.idle_calls = []
+        self.redrawn = []
+
+    def after_idle(self, func):
+        self.idle_calls.append(func)
+
+    def run_idle(self):
+        calls, self.idle_calls = self.idle_calls, []
+        for func in calls:
+            func()
+
+    def _redraw_cell(self, cell):
+        self.redrawn.append(cell)
+
+    def _update_scrollregion(self):
+        pass
+
+    def schedule_redraw(self):
+        pass
+
+    def set_playhead(self, step):
+        self.playhead = step
+
+
+def test_set_enabled_redraws_only_changed_cells_once_idle():
+    grid = RecordingGrid(N_TRACKS, N_BEATS)
+    grid.set_enabled({(0, 0, 0, 0), (1, 2, 1, 1)})
+    grid.run_idle()
+    grid.redrawn.clear()
+
+    grid.set_enabled({(0, 0, 0, 0), (2, 3, 0, 2)})
+    grid.set_enabled({(0, 0, 0, 0), (2, 3, 0, 2), (0, 1, 0, 3)})
+    assert grid.redrawn == []
+    assert len(grid.idle_calls) == 1
+
+    grid.run_idle()
+    assert sorted(grid.redrawn) == [(0, 1, 0, 3), (1, 2, 1, 1), (2, 3, 0, 2)]
+    assert grid.enabled == {(0, 0, 0, 0), (2, 3, 0, 2), (0, 1, 0, 3)}
+
+    grid.redrawn.clear()
+    grid.set_enabled(set(grid.enabled))
+    assert grid.idle_calls == []
+
+
+def test_update_grid_from_tracks_widens_the_grid():
+    grid = RecordingGrid(N_TRACKS, 4)
+    tracks = [Track(timing=[0, 6]), Track(timing=[4 * TIMING_UNITS_PER_BEAT + 4])]
+    update_grid_from_tracks(grid, tracks)
+
+    assert grid.n_beats == 8
+    assert grid.enabled == {
+        (i, *get_button_info(t)) for i, track in enumerate(tracks) for t in track.timing
+    }
+
+
+@pytest.fixture
+def state():
+    state = State()
+    yield state
+    state.close()
+
+
+def test_toggle_cell_keeps_timings_sorted(state):
+    state.tracks = [Track(timing=[0, TIMING_UNITS_PER_BEAT])]
+    for cell in [(0, 2, 0, 1), (0, 0, 1, 2), (0, 1, 0, 0)]:
+        state.toggle_cell(cell, True)
+    state.toggle_cell((0, 0, 0, 0), False)
+
+    ticks = list(state.tracks[0].timing)
+    assert ticks == sorted(ticks)
+    assert {(0, *get_button_info(t)) for t in ticks} == {
+        (0, 2, 0, 1),
+        (0, 0, 1, 2),
+        (0, 1, 0, 0),
+    }
+    assert isinstance(state.tracks[0].timing, EventTable)
+
+
+def test_toggle_cell_adds_missing_tracks(state):
+    state.toggle_cell((2, 1, 0, 0), True)
+    assert len(state.tracks) == 3
+    assert [len(track.timing) for track in state.tracks] == [0, 0, 1]
+
+
+@pytest.mark.parametrize(
+    "pattern_frame, step",
+    [
+        (0, (0, 0)),
+        (22049, (0, DIVS_PER_BEAT_UPPER - 1)),
+        (22050, (1, 0)),
+        (22050 * 2 + 22050 * 3 // (2 * DIVS_PER_BEAT_UPPER), (2, 1)),
+        (None, None),
+    ],
+)
+def test_the_playhead_follows_the_player(state, monkeypatch, pattern_frame, step):
+    # 120 bpm at 44100 Hz: 22050 frames per beat
+    position = PlaybackPosition(123456, pattern_frame, 4 * 4 * 22050, 44100, 22050)
+    monkeypatch.setattr(state.player, "position", lambda: position)
+    # An edited tempo is only heard from the next pattern boundary
+    state.config = state.config._replace(bpm=90)
+    state.grid = RecordingGrid(N_TRACKS, N_BEATS)
+    state.update_playhead()
+    assert state.grid.playhead == step
+
+
+def test_no_playhead_when_stopped(state):
+    state.grid = RecordingGrid(N_TRACKS, N_BEATS)
+    state.update_playhead()
+    assert state.grid.playhead is None
+
+
+def test_stop_leaves_previews_and_close_ends_them(state, monkeypatch):
+    calls = []
+    monkeypatch.setattr(state.audition, "stop", lambda: calls.append("stop"))
+    monkeypatch.setattr(state.audition, "close", lambda: calls.append("close"))
+
+    state.stop()
+    assert calls == []
+    state.close()
+    assert calls == ["close"]
+
+
+class RecordingButton:
+    """A play button without Tk, keeping the after() calls pending."""
+
+    def __init__(self):
+        self.enabled = False
+        self.jobs = {}
+        self._ids = itertools.count()
+
+    def configure(self, **kwargs):
+        pass
+
+    def after(self, ms, func):
+        job = next(self._ids)
+        self.jobs[job] = func
+        return job
+
+    def after_cancel(self, job):
+        del self.jobs[job]
+
+
+def test_play_keeps_a_single_playhead_loop(monkeypatch):
+    monkeypatch.setattr(app_state, "play", lambda on_finished: None)
+    monkeypatch.setattr(app_state, "grid", RecordingGrid(N_TRACKS, N_BEATS))
+    monkeypatch.setattr(app_state, "playhead_job", None)
+    button = RecordingButton()
+
+    callbacks.on_play(button)
+    callbacks.on_play(button)
+    assert len(button.jobs) == 1
+
+    # Each poll schedules the next one, until playback stops
+    button.jobs.popitem()[1]()
+    assert len(button.jobs) == 1
+    button.enabled = False
+    button.jobs.popitem()[1]()
+    assert button.jobs == {}
+    assert app_state.playhead_job is None
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+import scipy.io.wavfile as wav
+from conftest import noise
+
+from cadence.api import wavfile
+from cadence.api.config import Config
+from cadence.api.functions import render_loop, save_sound, sequence
+from cadence.api.wavfile import WavWriter, write_wav_blocks
+
+# Full-scale value of each integer format, and how scipy returns its samples
+FULL_SCALE = {"int16": 2**15 - 1, "int24": 2**23 - 1}
+SCIPY_SHIFT = {"int16": 0, "int24": 8}
+
+
+def read_back(file_path, sample_format):
+    """Read a WAV file with scipy as float64 in [-1.0, 1.0]."""
+    sample_rate, data = wav.read(file_path)
+    data = data.reshape(len(data), -1)
+    if sample_format == "float32":
+        assert data.dtype == np.float32
+        return sample_rate, data.astype(np.float64)
+    data = data.astype(np.int64) >> SCIPY_SHIFT[sample_format]
+    return sample_rate, data / FULL_SCALE[sample_format]
+
+
+def blocks_of(audio, block_size):
+    return [audio[i : i + block_size] for i in range(0, len(audio), block_size)]
+
+
+@pytest.mark.parametrize("sample_format", ["float32", "int16", "int24"])
+@pytest.mark.parametrize(("n_frames", "n_channels"), [(1001, 1), (1000, 2)])
+def test_round_trip(tmp_path, sample_format, n_frames, n_channels):
+    audio = noise(n_frames, n_channels) * np.float32(0.9)
+    path = tmp_path / "out.wav"
+
+    stats = write_wav_blocks(
+        path, blocks_of(audio, 256), 48000, sample_format=sample_format
+    )
+    sample_rate, data = read_back(path, sample_format)
+
+    assert sample_rate == 48000
+    assert data.shape == audio.shape
+    assert stats.n_frames == n_frames
+    assert stats.audio_seconds == pytest.approx(n_frames / 48000)
+    assert stats.bytes_written == path.stat().st_size
+    if sample_format == "float32":
+        np.testing.assert_array_equal(data, audio)
+    else:
+        lsb = 1 / FULL_SCALE[sample_format]
+        np.testing.assert_allclose(data, audio, atol=0.5 * lsb + 1e-12)
+
+
+@pytest.mark.parametrize("sample_format", ["int16", "int24"])
+def test_integer_formats_clip(tmp_path, sample_format):
+    path = tmp_path / "out.wav"
+    audio = np.array([[2.0], [-2.0], [1.0], [-1.0]], dtype=np.float32)
+    with WavWriter(path, 44100, 1, sample_format) as writer:
+        writer.write(audio)
+
+    _, data = read_back(path, sample_format)
+    np.testing.assert_allclose(
+        data[:, 0], [1.0, -1.0 - 1 / FULL_SCALE[sample_format], 1.0, -1.0]
+    )
+
+
+def test_dither_stays_within_one_lsb_and_averages_out(tmp_path):
+    path = tmp_path / "out.wav"
+    audio = np.full((20000, 1), 0.3, dtype=np.float32)
+    with WavWriter(path, 44100, 1, "int16", dither=True) as writer:
+        writer.write(audio)
+
+    _, data = read_back(path, "int16")
+    error = (data - audio) * FULL_SCALE["int16"]
+    assert np.max(np.abs(error)) <= 1.5
+    assert len(np.unique(data)) > 1
+    assert abs(np.mean(error)) < 0.05
+
+
+def test_empty_export(tmp_path):
+    path = tmp_path / "out.wav"
+    stats = write_wav_blocks(path, [], 44100)
+
+    _, data = wav.read(path)
+    assert len(data) == 0
+    assert stats.n_frames == 0
+    assert stats.bytes_written == path.stat().st_size
+
+
+def test_unknown_sample_format(tmp_path):
+    with pytest.raises(ValueError):
+        WavWriter(tmp_path / "out.wav", 44100, 1, "int8")
+    assert not (tmp_path / "out.wav").exists()
+
+
+def test_the_file_is_closed_if_the_header_cannot_be_written(tmp_path, monkeypatch):
+    opened = []
+
+    def _open(*args):
+        opened.append(open(*args))  # noqa: SIM115
+        return opened[-1]
+
+    def _header(self):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(wavfile, "open", _open, raising=False)
+    monkeypatch.setattr(WavWriter, "_header", _header)
+    with pytest.raises(OSError):
+        WavWriter(tmp_path / "out.wav", 44100, 1)
+    assert opened[0].closed
+
+
+@pytest.mark.parametrize("normalize", [True, False])
+def test_save_sound_matches_sequence(tmp_path, make_tracks, normalize):
+    tracks = make_tracks(([0, 17, 45], 20000), ([0, 24], 3000, {"attack": 0.01}))
+    config = Config(bpm=240, repeat=3)
+    gain = None if normalize else render_loop(tracks, config)[0].gain
+
+    stats = save_sound(tmp_path / "out.wav", tracks, config, block_size=1000, gain=gain)
+    _, data = read_back(tmp_path / "out.wav", "float32")
+
+    audio, _ = sequence(tracks, config)
+    assert stats.n_frames == len(audio)
+    np.testing.assert_allclose(data, audio, atol=1e-6)